@@ -85,6 +85,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # 要約ジョブのワーカーが複数プロセスから書き込むので、ロック待ちを長めにする
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -131,3 +133,120 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+# ---- 要約モデルのロード設定 ----
+# ワーカーあたりのモデル常駐メモリ上限（MB）。超える場合は LRU で解放する。0 なら無制限。
+SUMMARIZER_MEMORY_BUDGET_MB = int(os.environ.get("SUMMARIZER_MEMORY_BUDGET_MB", "0"))
+# 起動時に先読みする言語（例: "en,ja"）。空ならすべて初回リクエスト時にロードする。
+SUMMARIZER_WARMUP = [lang.strip() for lang in os.environ.get("SUMMARIZER_WARMUP", "").split(",") if lang.strip()]
+# BART の長文 map 段で 1 回の generate にまとめるチャンク数
+SUMMARIZER_BART_BATCH_SIZE = int(os.environ.get("SUMMARIZER_BART_BATCH_SIZE", "4"))
+# BART の長文 reduce 段: 1 回にまとめる部分要約の最大数（0 で無制限）と、段階的にまとめる最大段数
+SUMMARIZER_REDUCE_FAN_IN = int(os.environ.get("SUMMARIZER_REDUCE_FAN_IN", "8"))
+SUMMARIZER_REDUCE_MAX_DEPTH = int(os.environ.get("SUMMARIZER_REDUCE_MAX_DEPTH", "4"))
+# BART: 窓（約 1000 トークン）の何倍までの入力を、抽出で重要な文に絞って 1 回で要約するか（0 で無効）
+SUMMARIZER_EXTRACTIVE_MAX_RATIO = float(os.environ.get("SUMMARIZER_EXTRACTIVE_MAX_RATIO", "3"))
+# mt5 に渡す最大トークン数（超える入力は抽出で重要な文に絞る）
+SUMMARIZER_MT5_MAX_INPUT_TOKENS = int(os.environ.get("SUMMARIZER_MT5_MAX_INPUT_TOKENS", "512"))
+# 日本語（mt5）で 1 回の generate にまとめる最大件数
+SUMMARIZER_MT5_BATCH_SIZE = int(os.environ.get("SUMMARIZER_MT5_BATCH_SIZE", "8"))
+# リクエスト横断のマイクロバッチ: 最大件数（1 以下で無効）と最大待ち時間（ミリ秒）
+SUMMARIZER_MICROBATCH_MAX_SIZE = int(os.environ.get("SUMMARIZER_MICROBATCH_MAX_SIZE", "8"))
+SUMMARIZER_MICROBATCH_MAX_WAIT_MS = float(os.environ.get("SUMMARIZER_MICROBATCH_MAX_WAIT_MS", "10"))
+# マイクロバッチの結果を待つ最大秒数（0 で無制限）
+SUMMARIZER_MICROBATCH_TIMEOUT_S = float(os.environ.get("SUMMARIZER_MICROBATCH_TIMEOUT_S", "120"))
+# 要約キャッシュ: プロセス内 LRU の件数と、再起動後も残る SQLite ファイル（空文字で永続キャッシュ無効）、
+# 有効期限（秒）・SQLite の件数上限
+SUMMARIZER_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_CACHE_MAX_ENTRIES", "1024"))
+SUMMARIZER_CACHE_PATH = os.environ.get("SUMMARIZER_CACHE_PATH", str(BASE_DIR / "summary_cache.sqlite3"))
+SUMMARIZER_CACHE_TTL = int(os.environ.get("SUMMARIZER_CACHE_TTL", str(60 * 60 * 24 * 30)))
+SUMMARIZER_CACHE_STORE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_CACHE_STORE_MAX_ENTRIES", "100000"))
+# 長文の分割要約のチャンクごとの要約キャッシュ（同じ SQLite ファイルの別テーブル）: プロセス内 LRU 件数と SQLite の件数上限
+SUMMARIZER_CHUNK_CACHE_MEMORY_ENTRIES = int(os.environ.get("SUMMARIZER_CHUNK_CACHE_MEMORY_ENTRIES", "2048"))
+SUMMARIZER_CHUNK_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_CHUNK_CACHE_MAX_ENTRIES", "50000"))
+# 非同期エンドポイント: 推論の同時実行数と、外部 HTTP（記事取得・DeepL）の最大接続数
+SUMMARIZER_INFERENCE_WORKERS = int(os.environ.get("SUMMARIZER_INFERENCE_WORKERS", "2"))
+SUMMARIZER_HTTP_MAX_CONNECTIONS = int(os.environ.get("SUMMARIZER_HTTP_MAX_CONNECTIONS", "100"))
+# 一括要約: 1 リクエストあたりの最大件数と、記事取得・翻訳の並列数
+SUMMARIZER_BULK_MAX_ITEMS = int(os.environ.get("SUMMARIZER_BULK_MAX_ITEMS", "100"))
+SUMMARIZER_BULK_WORKERS = int(os.environ.get("SUMMARIZER_BULK_WORKERS", "8"))
+# 記事抽出: キャッシュ（LRU 件数・SQLite ファイル・有効期限（秒）・SQLite の件数上限）、再検証までの秒数、
+# ダウンロードの上限サイズ・時間
+SUMMARIZER_ARTICLE_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_ARTICLE_CACHE_MAX_ENTRIES", "512"))
+SUMMARIZER_ARTICLE_CACHE_PATH = os.environ.get("SUMMARIZER_ARTICLE_CACHE_PATH", str(BASE_DIR / "article_cache.sqlite3"))
+SUMMARIZER_ARTICLE_CACHE_TTL = int(os.environ.get("SUMMARIZER_ARTICLE_CACHE_TTL", str(60 * 60 * 24 * 7)))
+SUMMARIZER_ARTICLE_CACHE_STORE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_ARTICLE_CACHE_STORE_MAX_ENTRIES", "20000"))
+SUMMARIZER_ARTICLE_FRESH_SECONDS = int(os.environ.get("SUMMARIZER_ARTICLE_FRESH_SECONDS", "300"))
+SUMMARIZER_ARTICLE_MAX_BYTES = int(os.environ.get("SUMMARIZER_ARTICLE_MAX_BYTES", str(5 * 1024 * 1024)))
+SUMMARIZER_ARTICLE_TIMEOUT = float(os.environ.get("SUMMARIZER_ARTICLE_TIMEOUT", "10"))
+# DeepL: 共有セッションの同時接続数と、翻訳キャッシュ（プロセス内 LRU 件数・全ワーカー共有の SQLite ファイル・
+# 有効期限（秒）・SQLite の件数上限）。SQLite の値は zlib で圧縮する（パスを空文字にすると永続キャッシュ無効）
+SUMMARIZER_DEEPL_POOL_SIZE = int(os.environ.get("SUMMARIZER_DEEPL_POOL_SIZE", "10"))
+SUMMARIZER_TRANSLATION_CACHE_MEMORY_ENTRIES = int(os.environ.get("SUMMARIZER_TRANSLATION_CACHE_MEMORY_ENTRIES", "1024"))
+SUMMARIZER_TRANSLATION_CACHE_PATH = os.environ.get("SUMMARIZER_TRANSLATION_CACHE_PATH", str(BASE_DIR / "translation_cache.sqlite3"))
+SUMMARIZER_TRANSLATION_CACHE_TTL = int(os.environ.get("SUMMARIZER_TRANSLATION_CACHE_TTL", str(60 * 60 * 24)))
+SUMMARIZER_TRANSLATION_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_TRANSLATION_CACHE_MAX_ENTRIES", "100000"))
+# DeepL: 長文を分ける segment の最大文字数（0 で分けない）と、1 リクエストにまとめる文字数の目安
+SUMMARIZER_DEEPL_SEGMENT_CHARS = int(os.environ.get("SUMMARIZER_DEEPL_SEGMENT_CHARS", "1500"))
+SUMMARIZER_DEEPL_BATCH_CHARS = int(os.environ.get("SUMMARIZER_DEEPL_BATCH_CHARS", "5000"))
+# DeepL: プロセス全体の呼び出しペース（0 で無制限）と、再試行の待ち時間の上限（秒）
+SUMMARIZER_DEEPL_REQUESTS_PER_SECOND = float(os.environ.get("SUMMARIZER_DEEPL_REQUESTS_PER_SECOND", "10"))
+SUMMARIZER_DEEPL_CHARS_PER_SECOND = float(os.environ.get("SUMMARIZER_DEEPL_CHARS_PER_SECOND", "0"))
+SUMMARIZER_DEEPL_MAX_BACKOFF = float(os.environ.get("SUMMARIZER_DEEPL_MAX_BACKOFF", "30"))
+# 近似重複（転載記事）の検出: 推定 Jaccard 類似度のしきい値（0 で無効）と、覚えておく記事数
+# 既定は無効。一部だけ更新された記事（ライブブログ等）もしきい値を超えると前回の要約が返るため、使う場合に 0.85 程度を指定する
+SUMMARIZER_NEAR_DUP_THRESHOLD = float(os.environ.get("SUMMARIZER_NEAR_DUP_THRESHOLD", "0"))
+SUMMARIZER_NEAR_DUP_MAX_ENTRIES = int(os.environ.get("SUMMARIZER_NEAR_DUP_MAX_ENTRIES", "10000"))
+# 言語ごとの要約バックエンド（torch / int8 / onnx / stub）。例: "en=onnx,ja=int8"。未指定の言語は torch。
+SUMMARIZER_BACKENDS = dict(
+    item.strip().split("=", 1) for item in os.environ.get("SUMMARIZER_BACKENDS", "").split(",") if "=" in item
+)
+# 長文モデル（英語は LED）に切り替える入力トークン数の範囲。例: "en=2500-16000"。空（既定）なら常に既定モデル。
+# 範囲は benchmarks/led_vs_bart.py の結果（LED 1 回の方が BART の分割要約より速く、ROUGE が同等以上の区間）から決める
+SUMMARIZER_LONG_DOC_TOKENS = {
+    lang.strip(): tuple(int(n) for n in bounds.split("-", 1))
+    for lang, bounds in (
+        item.split("=", 1) for item in os.environ.get("SUMMARIZER_LONG_DOC_TOKENS", "").split(",") if "=" in item
+    )
+}
+# assisted decoding の下書きモデル（言語ごと）。例: "en=sshleifer/distilbart-cnn-12-6"。空なら通常のビームサーチ。
+# 本体と語彙が同じモデルを指定する。読み込めない場合は自動的にビームサーチに戻る
+SUMMARIZER_DRAFT_MODELS = dict(
+    item.strip().split("=", 1) for item in os.environ.get("SUMMARIZER_DRAFT_MODELS", "").split(",") if "=" in item
+)
+# stub バックエンド（負荷試験・CI 用の代替サマライザー）が generate の代わりに待つ時間（ミリ秒）
+SUMMARIZER_STUB_LATENCY_MS = float(os.environ.get("SUMMARIZER_STUB_LATENCY_MS", "50"))
+# onnx バックエンドの成果物（scripts/build_optimized_models.py の出力先）
+SUMMARIZER_ONNX_DIR = os.environ.get("SUMMARIZER_ONNX_DIR", str(BASE_DIR / "artifacts" / "onnx"))
+# 推論の実行場所: "local"（Web ワーカー内）/ "pool"（manage.py inference_server のワーカープロセス）
+SUMMARIZER_INFERENCE_MODE = os.environ.get("SUMMARIZER_INFERENCE_MODE", "local")
+SUMMARIZER_INFERENCE_SOCKET_DIR = os.environ.get("SUMMARIZER_INFERENCE_SOCKET_DIR", "/tmp/news-summarizer")
+SUMMARIZER_INFERENCE_POOL_WORKERS = int(os.environ.get("SUMMARIZER_INFERENCE_POOL_WORKERS", "2"))
+SUMMARIZER_INFERENCE_THREADS = int(os.environ.get("SUMMARIZER_INFERENCE_THREADS", "2"))
+SUMMARIZER_INFERENCE_AUTHKEY = os.environ.get("SUMMARIZER_INFERENCE_AUTHKEY", "")   # 空なら SECRET_KEY を使う
+# 推論ワーカーに依頼した要約を待つ最大秒数（0 で無制限）。超えたら接続を捨ててエラーにする（再送しない）
+SUMMARIZER_INFERENCE_TIMEOUT_S = float(os.environ.get("SUMMARIZER_INFERENCE_TIMEOUT_S", "300"))
+# 要約ジョブ（POST /summarizer/jobs/）: manage.py summary_worker のプロセス数、キューが空のときの確認間隔（秒）、
+# 実行中ジョブのリース秒数（この間ワーカーから延長が無ければ落ちたとみなして再実行）、最大試行回数
+SUMMARIZER_JOB_WORKERS = int(os.environ.get("SUMMARIZER_JOB_WORKERS", "2"))
+SUMMARIZER_JOB_POLL_SECONDS = float(os.environ.get("SUMMARIZER_JOB_POLL_SECONDS", "1.0"))
+SUMMARIZER_JOB_LEASE_SECONDS = float(os.environ.get("SUMMARIZER_JOB_LEASE_SECONDS", "120"))
+SUMMARIZER_JOB_MAX_ATTEMPTS = int(os.environ.get("SUMMARIZER_JOB_MAX_ATTEMPTS", "3"))
+
+# ---- ログ ----
+# 要約処理のログレベル（DEBUG にするとチャンクごとの生成パラメータ等も出力する）
+SUMMARIZER_LOG_LEVEL = os.environ.get("SUMMARIZER_LOG_LEVEL", "INFO").upper()
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        "summarizer": {"handlers": ["console"], "level": SUMMARIZER_LOG_LEVEL, "propagate": False},
+    },
+}
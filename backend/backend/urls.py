@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from summarizer.views import metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("summarizer/", include("summarizer.urls")),
+    path("metrics", metrics),
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# 設定された言語のモデルだけ先読みする（manage.py の各コマンドではロードしない）
+from summarizer.services.summarizers import warmup  # noqa: E402
+
+warmup()
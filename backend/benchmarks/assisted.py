@@ -0,0 +1,102 @@
+# backend/benchmarks/assisted.py
+# 役割: assisted decoding（下書きモデル）の速度と品質を、既定のビームサーチ・下書きなしの貪欲法と比べる
+#       品質は既定（num_beams=4）の出力を参照要約とした ROUGE で見る
+#
+# 使い方（backend/ で実行）:
+#   python benchmarks/assisted.py --draft en=sshleifer/distilbart-cnn-12-6 --runs 3 \
+#       --out benchmarks/results/assisted
+#   （ja は本体と語彙が同じ mT5 系の小さいモデルを --draft ja=... で指定する）
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from common import load_samples, percentile, rouge, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from summarizer.services.summarizers import _BACKENDS  # noqa: E402
+from summarizer.services.summarizers.generation import load_draft_model  # noqa: E402
+
+DEFAULT_DRAFTS = {"en": "sshleifer/distilbart-cnn-12-6"}
+
+
+def run(summarizer, samples: dict, lang: str, mode: str, runs: int) -> tuple[dict, list[float]]:
+    outputs, latencies = {}, []
+    for name, text in samples.items():
+        summarizer.summarize(text, mode=mode, lang_code=lang)   # ウォームアップ
+        for _ in range(runs):
+            t = time.perf_counter()
+            outputs[name] = summarizer.summarize(text, mode=mode, lang_code=lang)
+            latencies.append((time.perf_counter() - t) * 1000)
+    return outputs, latencies
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--draft", nargs="+", default=[f"{k}={v}" for k, v in DEFAULT_DRAFTS.items()],
+                    help="言語=下書きモデル（例: en=sshleifer/distilbart-cnn-12-6）")
+    ap.add_argument("--mode", default="medium")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--out", default="benchmarks/results/assisted", help="出力先（.json と .md を作る）")
+    args = ap.parse_args()
+
+    results = []
+    for lang, draft_id in (d.split("=", 1) for d in args.draft):
+        samples = load_samples(lang)
+        summarizer = _BACKENDS[lang]["torch"].load_class()()
+        summarizer.draft_model = None
+        beam_kwargs = dict(summarizer.generation_kwargs)
+
+        settings.SUMMARIZER_DRAFT_MODELS = {lang: draft_id}
+        draft = load_draft_model(lang, summarizer.summarizer.model)
+        if draft is None:
+            results.append({"lang": lang, "draft": draft_id, "error": "draft model unavailable"})
+            continue
+
+        configs = {
+            "beam": (None, beam_kwargs),
+            "greedy": (None, dict(beam_kwargs, num_beams=1)),
+            "assisted": (draft, beam_kwargs),
+        }
+        reference = None
+        for name, (draft_model, gen_kwargs) in configs.items():
+            print(f"[{lang}/{name}] running ...")
+            summarizer.draft_model = draft_model
+            summarizer.generation_kwargs = gen_kwargs
+            outputs, latencies = run(summarizer, samples, lang, args.mode, args.runs)
+            reference = reference or outputs
+            scores = [rouge(reference[k], v, lang) for k, v in outputs.items()]
+            results.append({
+                "lang": lang,
+                "config": name,
+                "draft": draft_id if draft_model is not None else None,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "rouge": {k: round(sum(s[k] for s in scores) / len(scores), 4) for k in scores[0]},
+            })
+
+    base = {r["lang"]: r["p50_ms"] for r in results if r.get("config") == "beam"}
+    lines = ["| lang | config | p50 (ms) | p95 (ms) | speedup vs beam | ROUGE-1 | ROUGE-2 | ROUGE-L |",
+             "| --- | --- | --- | --- | --- | --- | --- | --- |"]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['lang']} | {r['draft']} | error: {r['error']} | | | | | |")
+            continue
+        speedup = base[r["lang"]] / r["p50_ms"] if r["p50_ms"] else 0
+        rg = r["rouge"]
+        lines.append(f"| {r['lang']} | {r['config']} | {r['p50_ms']} | {r['p95_ms']} | {speedup:.2f}x | "
+                     f"{rg['rouge1']} | {rg['rouge2']} | {rg['rougeL']} |")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.with_suffix(".json").write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    out.with_suffix(".md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# backend/benchmarks/chunking.py
+# 役割: BART の summarize() のうち、生成以外の前処理コスト（トークナイズ・分割・抽出・reduce）のベンチマーク
+#       旧: ベースラインの実装（encode/decode の繰り返し + pipeline 内での再トークナイズ）
+#       新: 現在の BartSummarizer.summarize()（run_local の needs_chunking() 判定を含む）
+#       どちらもモデルの generate だけを固定の要約文を返す代替に置き換え、それ以外は実際のコードを通す
+#
+# 使い方（backend/ で実行。モデル本体は読み込まず、トークナイザーだけを使う）:
+#   python benchmarks/chunking.py --repeat 1 2 4 16 --runs 20 --out benchmarks/results/chunking
+#   （--tokenizer で同じ BPE のローカルのトークナイザーを指定できる。既定は BartSummarizer.model_id）
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from common import load_samples, setup_django
+
+setup_django()
+
+import torch  # noqa: E402
+from transformers import AutoTokenizer  # noqa: E402
+
+from summarizer.services import chunk_cache  # noqa: E402
+from summarizer.services.summarizers.en.bart_summarizer import BartSummarizer  # noqa: E402
+from summarizer.services.utils import clean_summary, dynamic_params  # noqa: E402
+
+SUMMARY_TOKENS = 60   # 代替の generate が返す要約の長さ（トークン数）
+
+
+class CountingTokenizer:
+    """入力側のトークナイズ（encode / decode / __call__）の呼び出し回数と処理トークン数を数えるラッパー"""
+
+    def __init__(self, tok):
+        self._tok = tok
+        self.calls = 0
+        self.tokens = 0
+
+    def __getattr__(self, name):
+        # pad / build_inputs_with_special_tokens / batch_decode 等は数えずにそのまま使う
+        return getattr(self._tok, name)
+
+    def _count(self, n):
+        self.calls += 1
+        self.tokens += n
+
+    def encode(self, text, **kw):
+        ids = self._tok.encode(text, **kw)
+        self._count(len(ids))
+        return ids
+
+    def decode(self, ids, **kw):
+        self._count(len(ids))
+        return self._tok.decode(ids, **kw)
+
+    def __call__(self, text, **kw):
+        enc = self._tok(text, **kw)
+        ids = enc["input_ids"]
+        if isinstance(ids, torch.Tensor):
+            self._count(int(ids.numel()))
+        else:
+            self._count(len(ids) if ids and isinstance(ids[0], int) else sum(map(len, ids)))
+        return enc
+
+
+class FakeModel:
+    """generate() の代わりに、どの行にも同じ要約（summary_ids）を返す"""
+    device = "cpu"
+
+    def __init__(self, summary_ids: list[int]):
+        self.summary_ids = summary_ids
+        self.calls = 0
+
+    def generate(self, input_ids, **kw):
+        self.calls += 1
+        return torch.tensor([self.summary_ids] * input_ids.shape[0])
+
+
+class LegacyPipeline:
+    """旧実装の transformers.pipeline の代替: 入力をトークナイズし、固定の要約文を返す"""
+
+    def __init__(self, tokenizer, summary_ids: list[int]):
+        self.tokenizer = tokenizer
+        self.summary_text = tokenizer._tok.decode(summary_ids, skip_special_tokens=True)
+        self.calls = 0
+
+    def __call__(self, text, truncation=True, **params):
+        self.calls += 1
+        self.tokenizer(text, truncation=truncation, max_length=self.tokenizer.model_max_length, return_tensors="pt")
+        return [{"summary_text": self.summary_text}]
+
+
+class LegacyBart:
+    """ベースラインの BartSummarizer.summarize()（分割・チャンク要約・結合して再要約）"""
+
+    def __init__(self, pipe):
+        self.summarizer = pipe
+        self.max_input_tokens = 1000
+        self.window_chars = 80
+
+    def _smart_split(self, text: str):
+        tok = self.summarizer.tokenizer
+        tokens = tok.encode(text, add_special_tokens=False)
+        chunks = []
+        start = 0
+        while start < len(tokens):
+            end = min(start + self.max_input_tokens, len(tokens))
+            sub_text = tok.decode(tokens[start:end])
+            cut_idx = sub_text.rfind(".")
+            if cut_idx == -1 or (len(sub_text) - cut_idx) > self.window_chars:
+                cut_idx = sub_text.rfind(",")
+            if cut_idx == -1 or (len(sub_text) - cut_idx) > self.window_chars:
+                cut_idx = len(sub_text)
+            chunk = sub_text[: cut_idx + 1]
+            chunks.append(chunk)
+            start = start + len(tok.encode(chunk, add_special_tokens=False))
+        return chunks
+
+    def _summarize_chunk(self, text: str, mode: str, lang: str):
+        n_in = len(self.summarizer.tokenizer.encode(text, add_special_tokens=False))
+        params = dynamic_params(n_in, mode, lang_code=lang, text=text)
+        out = self.summarizer(text, do_sample=False, num_beams=4, truncation=True, repetition_penalty=1.1, **params)
+        return clean_summary(out[0]["summary_text"])
+
+    def summarize(self, text: str, mode: str = "medium", lang_code: str = "en") -> str:
+        n_in = len(self.summarizer.tokenizer.encode(text, add_special_tokens=False))
+        if n_in <= self.max_input_tokens:
+            return self._summarize_chunk(text, mode, lang_code)
+        chunks = self._smart_split(text)
+        partial_summaries = [self._summarize_chunk(ch, mode, lang_code) for ch in chunks]
+        return self._summarize_chunk(" ".join(partial_summaries), "short", lang_code)
+
+
+def new_path(bart: BartSummarizer, text: str) -> str:
+    """run_local() と同じ順序: マイクロバッチを通すかの判定 → summarize()"""
+    bart.needs_chunking(text)
+    return bart.summarize(text)
+
+
+def bench(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, nargs="+", default=[1, 2, 4, 16],
+                    help="サンプル本文を何回連結して長文にするか")
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--tokenizer", default=BartSummarizer.model_id)
+    ap.add_argument("--out", default="benchmarks/results/chunking", help="出力先（.json と .md を作る）")
+    args = ap.parse_args()
+
+    base_tok = AutoTokenizer.from_pretrained(args.tokenizer)
+    samples = list(load_samples("en").values())
+    summary_ids = base_tok(samples[0], max_length=SUMMARY_TOKENS, truncation=True)["input_ids"]
+
+    results = []
+    # チャンク要約のキャッシュは毎回外れる（初めて要約する記事）として測る
+    with mock.patch.object(chunk_cache, "lookup", return_value=None), \
+            mock.patch.object(chunk_cache, "store"):
+        for rep in args.repeat:
+            text = "\n\n".join(samples * rep)
+            n_tokens = len(base_tok.encode(text, add_special_tokens=False))
+
+            old_tok = CountingTokenizer(base_tok)
+            old_pipe = LegacyPipeline(old_tok, summary_ids)
+            legacy = LegacyBart(old_pipe)
+
+            new_tok = CountingTokenizer(base_tok)
+            model = FakeModel(summary_ids)
+            # モデルは読み込まず、トークナイザーと代替の generate だけを持つパイプラインで本物の __init__ を通す
+            with mock.patch.object(BartSummarizer, "_build_pipeline",
+                                   return_value=SimpleNamespace(tokenizer=new_tok, model=model)):
+                bart = BartSummarizer()
+            bart.draft_model = None
+
+            # 1 回分の呼び出し回数を数えてから時間を測る
+            legacy.summarize(text)
+            new_path(bart, text)
+            row = {
+                "repeat": rep, "tokens": n_tokens,
+                "path": ("single" if n_tokens <= bart.max_input_tokens else
+                         "extractive" if n_tokens <= bart.extractive_max_ratio * bart.max_input_tokens else
+                         "chunked"),
+                "old_generate_calls": old_pipe.calls, "new_generate_calls": model.calls,
+                "old_tokenize_calls": old_tok.calls, "new_tokenize_calls": new_tok.calls,
+                "old_tokenized": old_tok.tokens, "new_tokenized": new_tok.tokens,
+            }
+            old_ms = bench(lambda: legacy.summarize(text), args.runs)
+            new_ms = bench(lambda: new_path(bart, text), args.runs)
+            row.update({"old_ms": round(old_ms, 2), "new_ms": round(new_ms, 2), "speedup": round(old_ms / new_ms, 1)})
+            results.append(row)
+
+    lines = [f"tokenizer: {args.tokenizer} / runs: {args.runs}（中央値。generate は代替で 0 ms とみなす）", "",
+             "| repeat | tokens | new path | old (ms) | new (ms) | speedup | old generate | new generate | "
+             "old tokenize calls | new tokenize calls | old tokenized | new tokenized |",
+             "| --- | --- | --- | --- | --- | --- | --- | --- | --- | --- | --- | --- |"]
+    for r in results:
+        lines.append(f"| {r['repeat']} | {r['tokens']} | {r['path']} | {r['old_ms']} | {r['new_ms']} | "
+                     f"{r['speedup']}x | {r['old_generate_calls']} | {r['new_generate_calls']} | "
+                     f"{r['old_tokenize_calls']} | {r['new_tokenize_calls']} | "
+                     f"{r['old_tokenized']} | {r['new_tokenized']} |")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.with_suffix(".json").write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    out.with_suffix(".md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
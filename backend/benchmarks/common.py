@@ -0,0 +1,91 @@
+# backend/benchmarks/common.py
+# 役割: ベンチマーク用スクリプトの共通処理（Django 初期化、サンプル読み込み、統計、ROUGE）
+
+import os
+import resource
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SAMPLES_DIR = BACKEND_DIR.parent / "news_samples"
+
+
+def setup_django() -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+def load_samples(lang: str) -> dict[str, str]:
+    """news_samples/<lang>/*.txt を {ファイル名: 本文} で返す"""
+    return {p.name: p.read_text(encoding="utf-8").strip()
+            for p in sorted((SAMPLES_DIR / lang).glob("*.txt"))}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = (len(s) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def rss_mb() -> float:
+    """このプロセスの現在の常駐メモリ（MB）。/proc が無い環境では 0"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def peak_rss_mb() -> float:
+    """このプロセスの最大常駐メモリ（MB）"""
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / 1024 if sys.platform != "darwin" else kb / (1024 * 1024)
+
+
+def _units(text: str, lang: str) -> list[str]:
+    # 日本語は分かち書きが無いので文字単位、それ以外は空白区切りの単語単位で比較する
+    return [c for c in text if not c.isspace()] if lang in {"ja", "zh"} else text.lower().split()
+
+
+def _f1(overlap: int, n_ref: int, n_hyp: int) -> float:
+    if not overlap or not n_ref or not n_hyp:
+        return 0.0
+    p, r = overlap / n_hyp, overlap / n_ref
+    return 2 * p * r / (p + r)
+
+
+def _ngrams(units: list[str], n: int) -> dict:
+    counts: dict = {}
+    for i in range(len(units) - n + 1):
+        g = tuple(units[i:i + n])
+        counts[g] = counts.get(g, 0) + 1
+    return counts
+
+
+def _lcs(a: list[str], b: list[str]) -> int:
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+def rouge(reference: str, hypothesis: str, lang: str) -> dict:
+    """ROUGE-1 / ROUGE-2 / ROUGE-L の F 値（外部パッケージなしの簡易実装）"""
+    ref, hyp = _units(reference, lang), _units(hypothesis, lang)
+    out = {}
+    for n in (1, 2):
+        r, h = _ngrams(ref, n), _ngrams(hyp, n)
+        overlap = sum(min(c, h.get(g, 0)) for g, c in r.items())
+        out[f"rouge{n}"] = _f1(overlap, sum(r.values()), sum(h.values()))
+    out["rougeL"] = _f1(_lcs(ref, hyp), len(ref), len(hyp))
+    return out
@@ -0,0 +1,111 @@
+# backend/benchmarks/compare_backends.py
+# 役割: 要約バックエンド（torch / int8 / onnx）の比較レポートを作る
+#       レイテンシ（p50/p95）、常駐メモリ、既定バックエンド（torch）の出力に対する ROUGE
+#       常駐メモリはロード前後の現在値の差（rss）と最大値の差（peak）。int8 の peak には量子化前の fp32 モデルが含まれる
+#
+# 使い方（backend/ で実行。onnx は scripts/build_optimized_models.py を先に実行しておく）:
+#   python benchmarks/compare_backends.py --runs 3 --out benchmarks/results/backends
+# 計測を汚さないよう、バックエンドごとに別プロセスで実行する。
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from common import load_samples, peak_rss_mb, percentile, rouge, rss_mb, setup_django
+
+BACKENDS = ["torch", "int8", "onnx"]
+LANGS = ["en", "ja"]
+
+
+def run_worker(lang: str, backend: str, mode: str, runs: int) -> dict:
+    """1 つのバックエンドを読み込み、全サンプルを runs 回ずつ要約する（子プロセス側）"""
+    setup_django()
+    from summarizer.services.summarizers import _BACKENDS
+
+    rss_before, peak_before = rss_mb(), peak_rss_mb()
+    t0 = time.perf_counter()
+    summarizer = _BACKENDS[lang][backend].load_class()()
+    load_s = time.perf_counter() - t0
+
+    latencies, outputs = [], {}
+    for name, text in load_samples(lang).items():
+        summarizer.summarize(text, mode=mode, lang_code=lang)   # ウォームアップ
+        for _ in range(runs):
+            t = time.perf_counter()
+            outputs[name] = summarizer.summarize(text, mode=mode, lang_code=lang)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "lang": lang,
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "rss_mb": round(rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb() - peak_before, 1),
+        "memory_mb": round(summarizer.memory_mb(), 1),   # レジストリがメモリ予算の計算に使う値（重みのバイト数）
+        "outputs": outputs,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", choices=LANGS, nargs="+", default=LANGS)
+    ap.add_argument("--backend", choices=BACKENDS, nargs="+", default=BACKENDS)
+    ap.add_argument("--mode", default="medium")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--out", default="benchmarks/results/backends", help="出力先（.json と .md を作る）")
+    ap.add_argument("--worker", nargs=2, metavar=("LANG", "BACKEND"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(*args.worker, args.mode, args.runs), ensure_ascii=False))
+        return
+
+    results = []
+    for lang in args.lang:
+        backends = ["torch"] + [b for b in args.backend if b != "torch"]   # torch を基準として先に実行
+        for backend in backends:
+            print(f"[{lang}/{backend}] running ...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", lang, backend,
+                 "--mode", args.mode, "--runs", str(args.runs)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(proc.stderr[-2000:], file=sys.stderr)
+                results.append({"lang": lang, "backend": backend, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    # ROUGE は同じ言語の torch 出力を参照要約として計算する
+    refs = {r["lang"]: r["outputs"] for r in results if r.get("backend") == "torch" and "outputs" in r}
+    for r in results:
+        if "outputs" not in r or r["lang"] not in refs:
+            continue
+        scores = [rouge(refs[r["lang"]][name], out, r["lang"]) for name, out in r["outputs"].items()]
+        r["rouge"] = {k: round(sum(s[k] for s in scores) / len(scores), 4) for k in scores[0]}
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.with_suffix(".json").write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    lines = ["| lang | backend | load (s) | p50 (ms) | p95 (ms) | RSS (MB) | peak RSS (MB) | memory_mb() | "
+             "ROUGE-1 | ROUGE-2 | ROUGE-L |",
+             "| --- | --- | --- | --- | --- | --- | --- | --- | --- | --- | --- |"]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['lang']} | {r['backend']} | error: {' '.join(r['error'])} | | | | | | | | |")
+            continue
+        rg = r.get("rouge", {})
+        lines.append(f"| {r['lang']} | {r['backend']} | {r['load_s']} | {r['p50_ms']} | {r['p95_ms']} | "
+                     f"{r['rss_mb']} | {r['peak_rss_mb']} | {r['memory_mb']} | {rg.get('rouge1', '-')} | {rg.get('rouge2', '-')} | {rg.get('rougeL', '-')} |")
+    out.with_suffix(".md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# backend/benchmarks/led_vs_bart.py
+# 役割: 入力長ごとに BART（分割 map-reduce）と LED（1 回で要約）のレイテンシ・generate 回数を比べ、
+#       SUMMARIZER_LONG_DOC_TOKENS に設定する切り替え範囲を提案する
+#
+# 使い方（backend/ で実行）:
+#   python benchmarks/led_vs_bart.py --tokens 800 1500 2500 4000 8000 16000 --runs 2 \
+#       --out benchmarks/results/led_vs_bart
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from common import load_samples, percentile, rouge, setup_django
+
+setup_django()
+
+from summarizer.services import summarizers  # noqa: E402
+from summarizer.services.summarizers.en.bart_summarizer import BartSummarizer  # noqa: E402
+from summarizer.services.summarizers.en.led_summarizer import LedSummarizer  # noqa: E402
+
+
+def make_input(tokenizer, samples: list[str], n_tokens: int) -> str:
+    """サンプル本文を連結し、先頭から n_tokens トークン分を切り出す"""
+    text = "\n\n".join(samples)
+    while len(tokenizer.encode(text, add_special_tokens=False)) < n_tokens:
+        text = text + "\n\n" + text
+    enc = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    return text[:enc["offset_mapping"][n_tokens - 1][1]]
+
+
+def count_generate_calls(model, fn) -> int:
+    """fn() の間に model.generate が呼ばれた回数"""
+    calls = 0
+    orig = model.generate
+
+    def counting(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return orig(*args, **kwargs)
+
+    model.generate = counting
+    try:
+        fn()
+    finally:
+        del model.generate
+    return calls
+
+
+def bench(fn, runs: int) -> list[float]:
+    fn()   # ウォームアップ
+    out = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000)
+    return out
+
+
+def suggest_range(rows: list[dict], max_tokens: int) -> tuple[int, int] | None:
+    """LED の方が速い入力長が連続する区間の両端（無ければ None）。上限は LED の入力長まで"""
+    faster = [r["tokens"] for r in rows if r["led_p50_ms"] < r["bart_p50_ms"]]
+    if not faster:
+        return None
+    lo = min(faster)
+    hi = lo
+    for r in rows:
+        if r["tokens"] >= lo:
+            if r["led_p50_ms"] >= r["bart_p50_ms"]:
+                break
+            hi = r["tokens"]
+    return lo, min(hi, max_tokens)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, nargs="+", default=[800, 1500, 2500, 4000, 8000, 16000],
+                    help="比較する入力トークン数")
+    ap.add_argument("--mode", default="medium")
+    ap.add_argument("--runs", type=int, default=2)
+    ap.add_argument("--out", default="benchmarks/results/led_vs_bart", help="出力先（.json と .md を作る）")
+    args = ap.parse_args()
+
+    bart = BartSummarizer()
+    led = LedSummarizer()
+    samples = list(load_samples("en").values())
+
+    rows = []
+    for n in sorted(args.tokens):
+        text = make_input(led.tokenizer, samples, n)
+        run_bart = lambda: bart.summarize(text, mode=args.mode, lang_code="en")  # noqa: E731
+        run_led = lambda: led.summarize(text, mode=args.mode, lang_code="en")    # noqa: E731
+
+        bart_calls = count_generate_calls(bart.summarizer.model, run_bart)
+        led_calls = count_generate_calls(led.model, run_led)
+        bart_ms = bench(run_bart, args.runs)
+        led_ms = bench(run_led, args.runs)
+        row = {
+            "tokens": n,
+            "bart_calls": bart_calls,
+            "led_calls": led_calls,
+            "bart_p50_ms": round(percentile(bart_ms, 50), 1),
+            "led_p50_ms": round(percentile(led_ms, 50), 1),
+            # 参照要約が無いので、両者の出力の一致度を目安として出す
+            "rougeL_led_vs_bart": round(rouge(run_bart(), run_led(), "en")["rougeL"], 4),
+        }
+        print(row)
+        rows.append(row)
+
+    suggestion = suggest_range(rows, led.max_input_tokens)
+    lines = ["| tokens | BART calls | LED calls | BART p50 (ms) | LED p50 (ms) | ROUGE-L (LED vs BART) |",
+             "| --- | --- | --- | --- | --- | --- |"]
+    for r in rows:
+        lines.append(f"| {r['tokens']} | {r['bart_calls']} | {r['led_calls']} | {r['bart_p50_ms']} | "
+                     f"{r['led_p50_ms']} | {r['rougeL_led_vs_bart']} |")
+    if suggestion:
+        lines.append(f"\nSuggested: SUMMARIZER_LONG_DOC_TOKENS=en={suggestion[0]}-{suggestion[1]}")
+    else:
+        lines.append("\nLED was not faster at any measured length; leave SUMMARIZER_LONG_DOC_TOKENS empty.")
+    current = summarizers.long_doc_range("en")
+    lines.append(f"Current:   {current}")
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.with_suffix(".json").write_text(json.dumps({"rows": rows, "suggested": suggestion}, indent=2),
+                                        encoding="utf-8")
+    out.with_suffix(".md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+# backend/benchmarks/loadtest.py
+# 役割: バックエンド全体の負荷試験。DeepL と記事サイトをローカルの代替サーバーに置き換え、
+#       /summarizer/summarize/ に同時リクエストを送ってスループット・レイテンシ・エラー率・キュー長を測る
+#
+# 使い方（backend/ で実行。DeepL の API キー・実際のニュースサイトへのアクセスは不要）:
+#   python benchmarks/loadtest.py --stub-model --concurrency 16 --duration 30     # CI 向け（モデルを読み込まない）
+#   python benchmarks/loadtest.py --concurrency 4 --duration 120 --mix en=0.5,ja=0.3,ko=0.1,fr=0.1 \
+#       --url-ratio 0.5 --deepl-latency-ms 150 --deepl-error-rate 0.05 --out benchmarks/results/loadtest
+#   既に起動しているサーバーに対して実行する場合は --server http://127.0.0.1:8000 を付ける
+#   （そのサーバーは DEEPL_BASE を表示される代替サーバーの URL にして起動しておく。--deepl-port で固定できる）
+
+import argparse
+import json
+import os
+import random
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from common import BACKEND_DIR, load_samples, percentile
+from stubs import ArticleStub, DeepLStub
+
+# news_samples に無い言語の入力（ピボット翻訳の経路を通す）
+EXTRA_SAMPLES = {
+    "ko": "정부는 오늘 새로운 경제 대책을 발표했다. 물가 상승에 대응하기 위해 저소득층 지원을 확대하고, "
+          "중소기업의 에너지 비용 부담을 줄이는 방안이 포함됐다. 전문가들은 효과가 나타나기까지 시간이 걸릴 것이라고 전망했다.",
+    "fr": "Le gouvernement a présenté aujourd'hui un nouveau plan économique. Il prévoit d'étendre les aides aux "
+          "ménages modestes face à la hausse des prix et de réduire la facture énergétique des petites entreprises. "
+          "Les experts estiment que les effets ne seront visibles qu'après plusieurs mois.",
+    "de": "Die Regierung hat heute ein neues Wirtschaftspaket vorgestellt. Es sieht mehr Unterstützung für Haushalte "
+          "mit geringem Einkommen vor und soll die Energiekosten kleiner Unternehmen senken. Fachleute erwarten, "
+          "dass sich die Wirkung erst nach einigen Monaten zeigt.",
+    "zh": "政府今天公布了新的经济对策。为应对物价上涨，将扩大对低收入家庭的支持，并减轻中小企业的能源成本负担。"
+          "专家预计，效果需要一段时间才能显现。",
+}
+_QUEUE_RE = re.compile(r'^summarizer_batch_queue_depth\{[^}]*\} (\S+)$', re.M)
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        lang, _, weight = item.partition("=")
+        mix[lang.strip()] = float(weight or 1)
+    return mix
+
+
+def build_corpus(langs) -> dict[str, list[tuple[str, str]]]:
+    """言語 → [(記事名, 本文)]"""
+    corpus = {}
+    for lang in langs:
+        samples = load_samples(lang) if lang in {"en", "ja"} else {}
+        if not samples and lang in EXTRA_SAMPLES:
+            samples = {"sample.txt": EXTRA_SAMPLES[lang]}
+        if not samples:
+            raise SystemExit(f"サンプルの無い言語: {lang}（候補: en, ja, {', '.join(EXTRA_SAMPLES)}）")
+        corpus[lang] = [(f"{lang}/{Path(name).stem}", text) for name, text in samples.items()]
+    return corpus
+
+
+def server_env(args, deepl: DeepLStub, cache_dir: str) -> dict:
+    """負荷試験用に起動するサーバーの環境変数（DeepL は代替サーバー、キャッシュは一時ディレクトリ）"""
+    env = dict(os.environ)
+    env.update({
+        "DEEPL_BASE": deepl.base_url,
+        "DEEPL_API_KEY": env.get("DEEPL_API_KEY") or "loadtest",
+        "SUMMARIZER_CACHE_PATH": str(Path(cache_dir) / "summary_cache.sqlite3"),
+        "SUMMARIZER_TRANSLATION_CACHE_PATH": str(Path(cache_dir) / "translation_cache.sqlite3"),
+        "SUMMARIZER_ARTICLE_CACHE_PATH": str(Path(cache_dir) / "article_cache.sqlite3"),
+    })
+    if args.stub_model:
+        env.update({
+            "SUMMARIZER_BACKENDS": "en=stub,ja=stub",
+            "SUMMARIZER_LONG_DOC_TOKENS": "",
+            "SUMMARIZER_STUB_LATENCY_MS": str(args.stub_latency_ms),
+        })
+    if args.cold:
+        # 毎回の実コストを測る（要約・翻訳・記事のキャッシュと近似重複の再利用を無効にする）
+        env.update({
+            "SUMMARIZER_CACHE_PATH": "", "SUMMARIZER_CACHE_MAX_ENTRIES": "0",
+            "SUMMARIZER_TRANSLATION_CACHE_PATH": "", "SUMMARIZER_TRANSLATION_CACHE_MEMORY_ENTRIES": "0",
+            "SUMMARIZER_ARTICLE_CACHE_PATH": "", "SUMMARIZER_ARTICLE_CACHE_MAX_ENTRIES": "0",
+            "SUMMARIZER_CHUNK_CACHE_MEMORY_ENTRIES": "0", "SUMMARIZER_NEAR_DUP_THRESHOLD": "0",
+        })
+    return env
+
+
+def start_server(args, env: dict) -> subprocess.Popen:
+    if args.server_cmd:
+        cmd = shlex.split(args.server_cmd.format(port=args.port))
+    else:
+        cmd = [sys.executable, "manage.py", "runserver", f"127.0.0.1:{args.port}", "--noreload"]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL if not args.verbose else None,
+                            stderr=subprocess.STDOUT if not args.verbose else None)
+
+
+def wait_ready(base: str, proc: subprocess.Popen | None, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"サーバーが起動しなかった（終了コード {proc.returncode}）。--verbose で出力を確認する")
+        try:
+            with urllib.request.urlopen(f"{base}/metrics", timeout=2):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise SystemExit(f"{timeout} 秒以内にサーバーが応答しなかった: {base}")
+
+
+def post(url: str, payload: dict, timeout: float) -> tuple[int, float, str]:
+    """(ステータス, 秒, エラー内容) を返す。接続できなければステータス 0"""
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    t = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            r.read()
+            return r.status, time.perf_counter() - t, ""
+    except urllib.error.HTTPError as e:
+        return e.code, time.perf_counter() - t, e.read()[:200].decode(errors="replace")
+    except (urllib.error.URLError, OSError) as e:
+        return 0, time.perf_counter() - t, str(e)
+
+
+class QueueSampler:
+    """実行中に /metrics を定期的に読み、推論スケジューラのキュー長（全モデルの合計）を記録する"""
+
+    def __init__(self, base: str, interval: float):
+        self.base = base
+        self.interval = interval
+        self.samples: list[tuple[float, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._t0 = time.monotonic()
+
+    def _sample(self) -> None:
+        try:
+            with urllib.request.urlopen(f"{self.base}/metrics", timeout=5) as r:
+                text = r.read().decode()
+        except (urllib.error.URLError, OSError):
+            return
+        depth = sum(float(v) for v in _QUEUE_RE.findall(text))
+        self.samples.append((round(time.monotonic() - self._t0, 2), depth))
+
+    def _run(self):
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_load(args, base: str, corpus: dict, mix: dict, articles: ArticleStub) -> tuple[list[dict], float, list]:
+    """
+    concurrency 本のクライアントが、応答を受け取るたびに次のリクエストを送る（closed loop）。
+    --duration 秒経つか、--requests 件送ったら終わる。
+    """
+    url = f"{base}/summarizer/summarize/"
+    langs, weights = list(mix), list(mix.values())
+    results: list[dict] = []
+    lock = threading.Lock()
+    sent = 0
+    deadline = time.monotonic() + args.duration
+
+    def next_slot() -> int | None:
+        nonlocal sent
+        with lock:
+            if (args.requests and sent >= args.requests) or (not args.requests and time.monotonic() >= deadline):
+                return None
+            sent += 1
+            return sent
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        while (n := next_slot()) is not None:
+            lang = rng.choices(langs, weights)[0]
+            name, text = rng.choice(corpus[lang])
+            kind = "url" if rng.random() < args.url_ratio else "text"
+            payload = {"target_lang": args.target_lang, "length": args.length}
+            if kind == "url":
+                payload["url"] = articles.url(name, n if args.cold else None)
+            else:
+                payload["text"] = text
+            status, seconds, error = post(url, payload, args.timeout)
+            with lock:
+                results.append({"lang": lang, "kind": kind, "status": status, "seconds": seconds, "error": error})
+
+    t0 = time.perf_counter()
+    with QueueSampler(base, args.sample_interval) as sampler:
+        threads = [threading.Thread(target=client, args=(args.seed + i,)) for i in range(args.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return results, time.perf_counter() - t0, sampler.samples
+
+
+def latency_stats(seconds: list[float]) -> dict:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p90_ms": round(percentile(ms, 90), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "max_ms": round(max(ms), 1) if ms else 0,
+    }
+
+
+def summarize_results(results: list[dict], elapsed: float, queue: list, deepl: DeepLStub,
+                      articles: ArticleStub) -> dict:
+    ok = [r for r in results if r["status"] == 200]
+    by_lang = defaultdict(list)
+    for r in ok:
+        by_lang[r["lang"]].append(r["seconds"])
+    depths = [d for _, d in queue]
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0,
+        "errors_by_status": dict(Counter(str(r["status"]) for r in results if r["status"] != 200)),
+        "error_examples": list({r["error"] for r in results if r["error"]})[:5],
+        "latency": latency_stats([r["seconds"] for r in ok]),
+        "latency_by_lang": {lang: latency_stats(s) for lang, s in sorted(by_lang.items())},
+        "queue_depth": {
+            "max": max(depths, default=0),
+            "mean": round(sum(depths) / len(depths), 2) if depths else 0,
+            "samples": queue,
+        },
+        "deepl_stub": {"requests": deepl.requests, "characters": deepl.chars, "rejected_429": deepl.rejected},
+        "article_stub": {"requests": articles.requests},
+    }
+
+
+def render_markdown(report: dict) -> str:
+    s = report["summary"]
+    lines = [
+        f"concurrency={report['config']['concurrency']} mix={report['config']['mix']} "
+        f"stub_model={report['config']['stub_model']} cold={report['config']['cold']}",
+        "",
+        "| requests | elapsed (s) | throughput (req/s) | error rate | p50 (ms) | p90 (ms) | p99 (ms) | max queue | mean queue |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- | --- |",
+        f"| {s['requests']} | {s['elapsed_s']} | {s['throughput_rps']} | {s['error_rate']:.2%} | "
+        f"{s['latency']['p50_ms']} | {s['latency']['p90_ms']} | {s['latency']['p99_ms']} | "
+        f"{s['queue_depth']['max']:g} | {s['queue_depth']['mean']:g} |",
+        "",
+        "| lang | n | p50 (ms) | p90 (ms) | p99 (ms) |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for lang, st in s["latency_by_lang"].items():
+        lines.append(f"| {lang} | {st['n']} | {st['p50_ms']} | {st['p90_ms']} | {st['p99_ms']} |")
+    lines += ["", f"errors by status: {s['errors_by_status'] or '-'}",
+              f"DeepL stub: {s['deepl_stub']}", f"article stub: {s['article_stub']}"]
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=8, help="同時に送るリクエスト数")
+    ap.add_argument("--duration", type=float, default=30, help="計測する秒数（--requests 指定時は無視）")
+    ap.add_argument("--requests", type=int, default=0, help="送るリクエスト数（0 なら --duration で終わる）")
+    ap.add_argument("--mix", default="en=0.5,ja=0.3,ko=0.1,fr=0.1", help="入力言語の比率（例: en=0.5,ja=0.5）")
+    ap.add_argument("--target-lang", default="ja")
+    ap.add_argument("--length", default="medium")
+    ap.add_argument("--url-ratio", type=float, default=0.0, help="url（記事の代替サーバー経由）で送る割合")
+    ap.add_argument("--deepl-latency-ms", type=float, default=100)
+    ap.add_argument("--deepl-error-rate", type=float, default=0.0, help="DeepL 代替サーバーが 429 を返す割合")
+    ap.add_argument("--deepl-port", type=int, default=0, help="DeepL 代替サーバーのポート（0 なら空きポート）")
+    ap.add_argument("--article-latency-ms", type=float, default=20)
+    ap.add_argument("--stub-model", action="store_true", help="モデルの代わりに stub バックエンドを使う（CI 向け）")
+    ap.add_argument("--stub-latency-ms", type=float, default=50, help="stub バックエンドの generate 1 回の時間")
+    ap.add_argument("--cold", action="store_true", help="キャッシュ・近似重複の再利用を無効にして毎回の実コストを測る")
+    ap.add_argument("--server", help="既に起動しているサーバー（例: http://127.0.0.1:8000）。省略時はここで起動する")
+    ap.add_argument("--server-cmd", help="サーバーの起動コマンド（{port} を置換）。既定は manage.py runserver")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--warmup", type=int, default=1, help="計測前に言語ごとに送るリクエスト数（モデルの読み込み）")
+    ap.add_argument("--timeout", type=float, default=300, help="1 リクエストの制限時間（秒）")
+    ap.add_argument("--sample-interval", type=float, default=0.5, help="キュー長を読む間隔（秒）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--verbose", action="store_true", help="サーバーの出力を表示する")
+    ap.add_argument("--out", default="benchmarks/results/loadtest", help="出力先（.json と .md を作る）")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    corpus = build_corpus(mix)
+    en_text = corpus.get("en", build_corpus(["en"])["en"])[0][1]
+    ja_text = corpus.get("ja", build_corpus(["ja"])["ja"])[0][1]
+    # ピボット翻訳は要約言語の本文を返す（ko → ja、その他 → en）
+    deepl = DeepLStub(latency_ms=args.deepl_latency_ms, error_rate=args.deepl_error_rate,
+                      canned={"en": en_text, "ja": ja_text}, port=args.deepl_port).start()
+    articles = ArticleStub({name: (lang, text) for lang, items in corpus.items() for name, text in items},
+                           latency_ms=args.article_latency_ms).start()
+    print(f"DeepL stub: {deepl.base_url}  article stub: {articles.base_url}")
+
+    proc = None
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as cache_dir:
+        base = (args.server or f"http://127.0.0.1:{args.port}").rstrip("/")
+        try:
+            if not args.server:
+                proc = start_server(args, server_env(args, deepl, cache_dir))
+            wait_ready(base, proc, timeout=120)
+
+            for lang, items in corpus.items():
+                for name, text in items[:args.warmup]:
+                    status, seconds, error = post(f"{base}/summarizer/summarize/",
+                                                  {"text": text, "target_lang": args.target_lang,
+                                                   "length": args.length}, args.timeout)
+                    print(f"warmup {name}: {status} {seconds:.2f}s {error}")
+
+            print(f"running: concurrency={args.concurrency} "
+                  + (f"requests={args.requests}" if args.requests else f"duration={args.duration}s"))
+            results, elapsed, queue = run_load(args, base, corpus, mix, articles)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+            deepl.stop()
+            articles.stop()
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in {"out", "verbose"}},
+        "summary": summarize_results(results, elapsed, queue, deepl, articles),
+    }
+    md = render_markdown(report)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.with_suffix(".json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    out.with_suffix(".md").write_text(md + "\n", encoding="utf-8")
+    print(md)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# backend/benchmarks/stages.py
+# 役割: 要約パイプラインの工程別ベンチマーク（回帰検出用の JSON を出力）
+#       言語検出 / ピボット翻訳 / トークナイズ / 分割 / 生成 / 最終翻訳 / 後処理 を個別に計測する
+#
+# 使い方（backend/ で実行。DeepL はローカルの代替サーバーに置き換えるので API キーは不要）:
+#   python benchmarks/stages.py --runs 5 --out benchmarks/results/stages.json
+#   python benchmarks/stages.py --baseline benchmarks/results/stages.json --threshold 0.15
+# --baseline を渡すと p50 が threshold を超えて悪化した工程を表示し、終了コード 1 で終わる。
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from common import load_samples, peak_rss_mb, percentile, setup_django
+from stubs import DeepLStub
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from summarizer.services import router, translation  # noqa: E402
+from summarizer.services.summarizers import get_summarizer  # noqa: E402
+from summarizer.services.utils import clean_summary, infer_lang  # noqa: E402
+
+# ピボット翻訳の経路を通すための韓国語サンプル（代替サーバーは ja の本文を返す）
+KO_SAMPLE = (
+    "정부는 오늘 새로운 경제 대책을 발표했다. 물가 상승에 대응하기 위해 저소득층 지원을 확대하고, "
+    "중소기업의 에너지 비용 부담을 줄이는 방안이 포함됐다. 전문가들은 효과가 나타나기까지 시간이 걸릴 것이라고 전망했다."
+)
+
+
+class GenerateMeter:
+    """model.generate を包み、生成にかかった時間と生成トークン数を集計する"""
+
+    def __init__(self, model):
+        self.model = model
+        self.inner = model.generate
+        self.seconds = 0.0
+        self.tokens = 0
+
+    def __enter__(self):
+        def generate(*args, **kwargs):
+            t = time.perf_counter()
+            out = self.inner(*args, **kwargs)
+            self.seconds += time.perf_counter() - t
+            ids = out.sequences if hasattr(out, "sequences") else out
+            # 先頭の decoder 開始トークンと、EOS 後に詰められた pad は生成トークンに数えない
+            pad = self.model.generation_config.pad_token_id
+            body = ids[:, 1:] if self.model.config.is_encoder_decoder else ids
+            self.tokens += int((body != pad).sum()) if pad is not None else int(body.numel())
+            return out
+
+        self.model.generate = generate
+        return self
+
+    def __exit__(self, *exc):
+        self.model.generate = self.inner
+
+
+def build_cases(long_repeat: int) -> list[dict]:
+    """news_samples（en / ja）と、それらを連結した長文、ピボットが必要な ko 入力"""
+    cases = []
+    for lang in ("en", "ja"):
+        samples = load_samples(lang)
+        for name, text in samples.items():
+            cases.append({"name": f"{lang}/{name}", "text": text})
+        cases.append({"name": f"{lang}/synthetic_long", "text": "\n\n".join(list(samples.values()) * long_repeat)})
+    cases.append({"name": "ko/pivot", "text": KO_SAMPLE})
+    return cases
+
+
+def run_case(case: dict, mode: str, target_lang: str) -> dict:
+    """1 件分の各工程の所要時間（ms）と生成トークン数"""
+    times = {}
+    translation.get_cache().memory.clear()   # 翻訳キャッシュを効かせず、毎回の実コストを測る
+
+    t = time.perf_counter()
+    detected = infer_lang(case["text"]) or "en"
+    times["detect"] = time.perf_counter() - t
+
+    pivot_lang = router.plan_route(detected)
+    text = case["text"]
+    if pivot_lang:
+        t = time.perf_counter()
+        text = translation.deepl_translate(text, src=detected, tgt=pivot_lang)
+        times["pivot_translate"] = time.perf_counter() - t
+    summary_src = pivot_lang or detected
+
+    summarizer = get_summarizer(summary_src)
+    tokenizer = summarizer.summarizer.tokenizer
+    t = time.perf_counter()
+    if hasattr(summarizer, "_tokenize"):
+        ids, offsets = summarizer._tokenize(text)
+    else:
+        ids = tokenizer.encode(text, add_special_tokens=False)
+    times["tokenize"] = time.perf_counter() - t
+
+    if hasattr(summarizer, "_smart_split") and len(ids) > summarizer.max_input_tokens:
+        t = time.perf_counter()
+        summarizer._smart_split(text, ids, offsets)
+        times["chunk"] = time.perf_counter() - t
+
+    with GenerateMeter(summarizer.summarizer.model) as meter:
+        t = time.perf_counter()
+        summary = summarizer.summarize(text, mode=mode, lang_code=summary_src)
+        times["summarize_total"] = time.perf_counter() - t
+    times["generate"] = meter.seconds
+
+    if target_lang != summary_src:
+        t = time.perf_counter()
+        translation.deepl_translate(summary, src=summary_src, tgt=target_lang)
+        times["final_translate"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    clean_summary(summary)
+    times["cleanup"] = time.perf_counter() - t
+
+    return {"ms": {k: v * 1000 for k, v in times.items()},
+            "generated_tokens": meter.tokens, "generate_s": meter.seconds, "input_tokens": len(ids)}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """p50 が baseline より threshold 以上遅くなった工程を列挙する"""
+    regressions = []
+    for case, stages in current["cases"].items():
+        for stage, stat in stages["stages"].items():
+            base = baseline.get("cases", {}).get(case, {}).get("stages", {}).get(stage)
+            if base and base["p50_ms"] > 0 and stat["p50_ms"] > base["p50_ms"] * (1 + threshold):
+                regressions.append(f"{case} / {stage}: {base['p50_ms']:.2f} → {stat['p50_ms']:.2f} ms "
+                                   f"(+{(stat['p50_ms'] / base['p50_ms'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--mode", default="medium")
+    ap.add_argument("--target-lang", default="ja")
+    ap.add_argument("--long-repeat", type=int, default=6, help="合成長文でサンプルを何回連結するか")
+    ap.add_argument("--deepl-latency-ms", type=float, default=0)
+    ap.add_argument("--out", default="benchmarks/results/stages.json")
+    ap.add_argument("--baseline", help="比較対象の JSON（以前の --out）")
+    ap.add_argument("--threshold", type=float, default=0.15, help="悪化とみなす p50 の増加率")
+    args = ap.parse_args()
+    # --out と同じファイルを baseline にしても比較できるよう、先に読んでおく
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+
+    ja_text = next(iter(load_samples("ja").values()))
+    stub = DeepLStub(latency_ms=args.deepl_latency_ms, canned={"ja": ja_text}).start()
+    translation.DEEPL_BASE = stub.base_url
+    translation.DEEPL_API_KEY = translation.DEEPL_API_KEY or "benchmark"
+    settings.SUMMARIZER_TRANSLATION_CACHE_PATH = ""   # 永続キャッシュは使わない（プロセス内分は毎回消す）
+
+    report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "runs": args.runs,
+              "mode": args.mode, "target_lang": args.target_lang, "cases": {}}
+    try:
+        for case in build_cases(args.long_repeat):
+            run_case(case, args.mode, args.target_lang)   # ウォームアップ（モデルのロードを含む）
+            samples = defaultdict(list)
+            gen_tokens = gen_seconds = 0
+            for _ in range(args.runs):
+                r = run_case(case, args.mode, args.target_lang)
+                for stage, ms in r["ms"].items():
+                    samples[stage].append(ms)
+                gen_tokens += r["generated_tokens"]
+                gen_seconds += r["generate_s"]
+
+            report["cases"][case["name"]] = {
+                "input_tokens": r["input_tokens"],
+                "stages": {stage: {"p50_ms": round(percentile(v, 50), 3), "p95_ms": round(percentile(v, 95), 3)}
+                           for stage, v in samples.items()},
+                "generated_tokens_per_s": round(gen_tokens / gen_seconds, 1) if gen_seconds else 0,
+            }
+            stages = report["cases"][case["name"]]["stages"]
+            print(f"{case['name']:<24} " + "  ".join(f"{k}={v['p50_ms']:.1f}ms" for k, v in stages.items()))
+    finally:
+        stub.stop()
+
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"peak RSS: {report['peak_rss_mb']} MB -> {out}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
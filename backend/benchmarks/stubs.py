@@ -0,0 +1,158 @@
+# backend/benchmarks/stubs.py
+# 役割: ベンチマーク・負荷試験用のローカル代替サーバー
+#       DeepLStub   … DeepL /v2/translate 互換
+#       ArticleStub … 記事 HTML の配信（newspaper の記事抽出を実際のニュースサイト無しで通す）
+
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class DeepLStub:
+    """
+    DeepL /v2/translate の代わりに応答するローカルサーバー。
+      - latency_ms: 1 リクエストあたりの応答遅延
+      - error_rate: この割合で 429（Retry-After 付き）を返す
+      - canned: 翻訳先言語 → 返す本文（無ければ入力をそのまま返す）
+    """
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0.0, canned: dict | None = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.canned = {k.upper(): v for k, v in (canned or {}).items()}
+        self.requests = 0
+        self.chars = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self) -> "DeepLStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                form = parse_qs(body)
+                texts = form.get("text", [])
+                tgt = (form.get("target_lang") or ["EN"])[0].upper()
+
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+                if stub.error_rate and random.random() < stub.error_rate:
+                    with stub._lock:
+                        stub.rejected += 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.end_headers()
+                    return
+
+                with stub._lock:
+                    stub.requests += 1
+                    stub.chars += sum(len(t) for t in texts)
+                out = [{"detected_source_language": (form.get("source_lang") or ["EN"])[0],
+                        "text": stub.canned.get(tgt, t)} for t in texts]
+                payload = json.dumps({"translations": out}, ensure_ascii=False).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+class ArticleStub:
+    """
+    記事 HTML を返すローカルサーバー。GET /articles/<名前>.html で pages[名前] を返す。
+      - pages: 名前 → (言語, 本文)。本文の段落（空行区切り）を <p> にする
+      - latency_ms: 1 リクエストあたりの応答遅延
+      - ?v=N を付けると末尾に「更新」段落を足した版を返す（同じ URL の記事が更新された状況を作る）
+    """
+
+    def __init__(self, pages: dict[str, tuple[str, str]], latency_ms: float = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.pages = pages
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, name: str, version: int | None = None) -> str:
+        return f"{self.base_url}/articles/{name}.html" + (f"?v={version}" if version is not None else "")
+
+    def start(self) -> "ArticleStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def render(lang: str, text: str, version: str | None = None) -> str:
+        paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()] or [text]
+        if version:
+            paragraphs.append(f"Update {version}." if lang not in {"ja", "zh"} else f"更新 {version}。")
+        title = html.escape(paragraphs[0][:60])
+        body = "\n".join(f"<p>{html.escape(p)}</p>" for p in paragraphs)
+        return (f'<!DOCTYPE html><html lang="{lang}"><head><meta charset="utf-8"><title>{title}</title></head>'
+                f"<body><article><h1>{title}</h1>\n{body}\n</article></body></html>")
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                name = path.removeprefix("/articles/").removesuffix(".html")
+                page = stub.pages.get(name)
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+                with stub._lock:
+                    stub.requests += 1
+                if page is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                version = parse_qs(query).get("v", [None])[0]
+                payload = stub.render(*page, version).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
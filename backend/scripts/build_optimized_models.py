@@ -0,0 +1,84 @@
+# backend/scripts/build_optimized_models.py
+# 役割: ONNX Runtime 用の成果物（int8 量子化済み encoder / decoder / decoder_with_past）をオフラインで作成する
+#
+# 使い方（backend/ で実行。optimum[onnxruntime] が必要）:
+#   python scripts/build_optimized_models.py                 # 英語・日本語の両方
+#   python scripts/build_optimized_models.py --lang en --arch avx2
+# 出力先は settings.SUMMARIZER_ONNX_DIR（既定: backend/artifacts/onnx/<モデル名>/）。
+# 作成後、SUMMARIZER_BACKENDS="en=onnx,ja=onnx" で切り替える。
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer  # noqa: E402
+from optimum.onnxruntime.configuration import AutoQuantizationConfig  # noqa: E402
+from transformers import AutoTokenizer  # noqa: E402
+
+from summarizer.services.summarizers.en.bart_summarizer import BartSummarizer  # noqa: E402
+from summarizer.services.summarizers.ja.mt5_summarizer import Mt5Summarizer  # noqa: E402
+from summarizer.services.summarizers.optimized import onnx_artifact_dir  # noqa: E402
+
+MODELS = {"en": BartSummarizer.model_id, "ja": Mt5Summarizer.model_id}
+
+
+def quantization_config(arch: str):
+    """CPU の命令セットに合わせた動的量子化設定（重みのみ int8、活性化は実行時に量子化）"""
+    factory = {
+        "avx2": AutoQuantizationConfig.avx2,
+        "avx512": AutoQuantizationConfig.avx512,
+        "avx512_vnni": AutoQuantizationConfig.avx512_vnni,
+        "arm64": AutoQuantizationConfig.arm64,
+    }[arch]
+    return factory(is_static=False, per_channel=False)
+
+
+def build(model_name: str, arch: str) -> Path:
+    out_dir = onnx_artifact_dir(model_name)
+    with tempfile.TemporaryDirectory() as tmp:
+        # 1. fp32 の encoder / decoder / decoder_with_past をエクスポート
+        print(f"[export] {model_name}")
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+        model.save_pretrained(tmp)
+
+        # 2. 各 ONNX ファイルを int8 に動的量子化
+        out_dir.mkdir(parents=True, exist_ok=True)
+        qconfig = quantization_config(arch)
+        for onnx_file in sorted(Path(tmp).glob("*.onnx")):
+            print(f"[quantize] {onnx_file.name}")
+            quantizer = ORTQuantizer.from_pretrained(tmp, file_name=onnx_file.name)
+            quantizer.quantize(save_dir=out_dir, quantization_config=qconfig)
+
+        # 量子化後のファイル名（*_quantized.onnx）を読み込み側の既定名に戻す
+        for q in out_dir.glob("*_quantized.onnx"):
+            q.replace(out_dir / q.name.replace("_quantized", ""))
+        for extra in Path(tmp).glob("*.json"):
+            shutil.copy(extra, out_dir / extra.name)
+
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(out_dir)
+    print(f"[done] {out_dir}")
+    return out_dir
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lang", choices=sorted(MODELS), nargs="+", default=sorted(MODELS))
+    ap.add_argument("--arch", choices=["avx2", "avx512", "avx512_vnni", "arm64"], default="avx2")
+    args = ap.parse_args()
+    for lang in args.lang:
+        build(MODELS[lang], args.arch)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import SummaryJob
+
+
+@admin.register(SummaryJob)
+class SummaryJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "target_lang", "length", "attempts", "worker", "created_at", "finished_at")
+    list_filter = ("status", "length")
+    search_fields = ("id", "url")
+    readonly_fields = ("created_at", "started_at", "finished_at", "lease_expires_at")
@@ -0,0 +1,37 @@
+# summarizer/management/commands/inference_server.py
+# 役割: 推論ワーカープールを起動する（SUMMARIZER_INFERENCE_MODE=pool の Web ワーカーから使われる）
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from summarizer.services import inference_pool
+from summarizer.services.summarizers import preload_keys
+
+
+class Command(BaseCommand):
+    help = "モデルを 1 回だけ読み込み、fork した推論ワーカーをローカル UNIX ソケットで待ち受けさせる。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int,
+                            default=getattr(settings, "SUMMARIZER_INFERENCE_POOL_WORKERS", 2),
+                            help="推論ワーカープロセス数")
+        parser.add_argument("--threads", type=int,
+                            default=getattr(settings, "SUMMARIZER_INFERENCE_THREADS", 2),
+                            help="ワーカー 1 つあたりの torch スレッド数")
+        parser.add_argument("--langs", default=None,
+                            help="fork 前に読み込んでおくモデル（カンマ区切り。既定は en,ja と、"
+                                 "SUMMARIZER_LONG_DOC_TOKENS を設定した言語の長文モデル（en:long））")
+        parser.add_argument("--pin-cpus", action="store_true",
+                            help="ワーカーごとに別の CPU コアへ固定する（Linux のみ）")
+
+    def handle(self, *args, **opts):
+        if opts["langs"]:
+            langs = [lang.strip() for lang in opts["langs"].split(",") if lang.strip()]
+        else:
+            # 長文モデルも fork 前に読み込んでおく（fork 後に各ワーカーが別々に読み込むと重みを共有できない）
+            langs = preload_keys()
+        self.stdout.write(
+            f"Starting {opts['workers']} inference workers x {opts['threads']} threads "
+            f"on {inference_pool.socket_dir()} (models: {', '.join(langs)})"
+        )
+        inference_pool.serve(opts["workers"], opts["threads"], langs, pin_cpus=opts["pin_cpus"])
@@ -0,0 +1,85 @@
+# summarizer/management/commands/summary_worker.py
+# 役割: 要約ジョブ（SummaryJob）を処理するワーカープロセス群を起動する
+
+import logging
+import signal
+import time
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+logger = logging.getLogger("summarizer.services.jobs")
+
+
+def _work(poll_seconds: float) -> None:
+    """1 プロセス分のループ: ジョブを取得して実行し、無ければ poll_seconds 待つ"""
+    from summarizer.services import jobs
+
+    worker = jobs.worker_id()
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True   # 実行中のジョブは最後まで終わらせる
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("summary worker %s started", worker)
+    while not stopping:
+        job = jobs.claim(worker)
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+        logger.info("job %s claimed by %s (attempt %d)", job.pk, worker, job.attempts)
+        jobs.run(job, worker)
+    logger.info("summary worker %s stopped", worker)
+
+
+class Command(BaseCommand):
+    help = "要約ジョブのキュー（POST /summarizer/jobs/）を処理するワーカープロセスを起動する。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int,
+                            default=getattr(settings, "SUMMARIZER_JOB_WORKERS", 2),
+                            help="ワーカープロセス数")
+        parser.add_argument("--poll-interval", type=float,
+                            default=getattr(settings, "SUMMARIZER_JOB_POLL_SECONDS", 1.0),
+                            help="キューが空のときの確認間隔（秒）")
+
+    def handle(self, *args, **opts):
+        from summarizer.services import jobs
+
+        jobs.enable_wal()
+        connections.close_all()   # fork 後の子プロセスに親の DB 接続を引き継がない
+
+        ctx = get_context("fork")
+
+        def spawn(i: int):
+            p = ctx.Process(target=_work, args=(opts["poll_interval"],), name=f"summary-worker-{i}")
+            p.start()
+            return p
+
+        self.stdout.write(f"Starting {opts['processes']} summary workers")
+        procs = [spawn(i) for i in range(opts["processes"])]
+        stopping = False
+
+        def stop(*_):
+            nonlocal stopping
+            stopping = True
+            for p in procs:
+                p.terminate()   # 子は SIGTERM で実行中のジョブを終えてから止まる
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while not stopping:
+            time.sleep(1)
+            for i, p in enumerate(procs):
+                if not p.is_alive() and not stopping:
+                    # 実行中だったジョブはリース切れ後に別のワーカーが再実行する
+                    logger.warning("summary worker %d exited (code=%s), restarting", i, p.exitcode)
+                    procs[i] = spawn(i)
+        for p in procs:
+            p.join()
+
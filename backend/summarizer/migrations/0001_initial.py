@@ -0,0 +1,41 @@
+import uuid
+
+from django.db import migrations, models
+
+import summarizer.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('text', models.TextField(blank=True)),
+                ('url', models.URLField(blank=True, max_length=2048)),
+                ('target_lang', models.JSONField(default=summarizer.models.default_target_lang)),
+                ('length', models.CharField(default='medium', max_length=16)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('timings', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('error_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=64)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='summaryjob_status_created_idx'), models.Index(fields=['status', 'lease_expires_at'], name='summaryjob_status_lease_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,53 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+def default_target_lang():
+    return "ja"
+
+
+class SummaryJob(models.Model):
+    """
+    非同期の要約ジョブ（POST /summarizer/jobs/ で登録し、manage.py summary_worker が処理する）。
+    実行中のジョブは lease_expires_at までにワーカーが延長し続ける。期限切れはワーカーが落ちたとみなして再実行する。
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+
+    # 入力（url 優先、無ければ text）
+    text = models.TextField(blank=True)
+    url = models.URLField(max_length=2048, blank=True)
+    target_lang = models.JSONField(default=default_target_lang)   # 言語コード 1 つ（"ja"）か、そのリスト（["ja", "en"]）。受け取った形のまま保存する
+    length = models.CharField(max_length=16, default="medium")
+
+    # 結果（route_and_summarize の戻り値）と、工程ごとの所要時間（秒）
+    result = models.JSONField(null=True, blank=True)
+    timings = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    error_status = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    # 実行管理
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="summaryjob_status_created_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="summaryjob_status_lease_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
@@ -1,15 +1,80 @@
 # backend/summarizer/news_summarizer_model.py
 # 役割: 既存コードとの互換レイヤー（実体は services/ 配下に委譲する）
 
-from .services.summarizers import get_summarizer
+from .services import batching, inference_pool, metrics
+from .services.extractive import EXTRACTIVE_MODE, extract_summary
+from .services import summary_cache
+from .services.summary_cache import cached_summary
+from .services.summarizers import get_summarizer, model_key
 from .services.utils import infer_lang
 
-def run_summary(text: str, mode: str = "medium", lang_code: str | None = None) -> str:
+def run_summary(text: str, mode: str = "medium", lang_code: str | None = None,
+                on_partial=None) -> str:
     """
     互換API:
       旧来の呼び出し元からは run_summary(text, mode, lang_code) を使い続けられる。
       実処理は services/summarizers 配下の各実装に委譲する。
+      on_partial(index, total, summary) を渡すと、長文の途中結果（チャンク要約）を通知する。
+      入力トークン数が長文モデルの範囲に入る場合は、分割要約の代わりに長文モデルで 1 回で要約する。
     """
     lang = (lang_code or infer_lang(text) or "en")
-    summarizer = get_summarizer(lang)
+    if mode == EXTRACTIVE_MODE:
+        return run_extractive(text, lang)
+    key = model_key(lang, text)
+    return cached_summary(text, mode, lang, lambda: _run_model(text, mode, lang, on_partial, key),
+                          model_key=key)
+
+
+def run_extractive(text: str, lang: str) -> str:
+    """"extractive" モード: モデルを使わず、重要な文を抜き出して返す（キャッシュ不要なほど速い）"""
+    with metrics.span("extractive", lang=lang):
+        return extract_summary(text, lang)
+
+
+def _run_model(text: str, mode: str, lang: str, on_partial=None, key: str | None = None) -> str:
+    if inference_pool.enabled():
+        # モデルは推論ワーカープロセス側にある（manage.py inference_server）
+        return inference_pool.remote_summarize(text, mode, lang, on_partial, key)
+    return run_local(text, mode, lang, on_partial, key)
+
+
+def run_local(text: str, mode: str, lang: str, on_partial=None, key: str | None = None) -> str:
+    """このプロセスに読み込んだモデルで要約する（推論ワーカーからも使う）"""
+    key = key or lang
+    if on_partial is not None:
+        # 途中結果を流すため、マイクロバッチを通さずこのスレッドで直接実行する
+        return get_summarizer(key).summarize(text, mode=mode, lang_code=lang, on_partial=on_partial)
+    summarizer = get_summarizer(key)
+    # 分割要約になる長文はマイクロバッチを通さない（同じモデルの推論スレッドを長く占有してしまう）
+    if batching.enabled() and not summarizer.needs_chunking(text):
+        # 同じモデル宛ての同時リクエストとまとめてバッチ推論する
+        return batching.get_batcher(lang, key).submit(text, mode)
     return summarizer.summarize(text, mode=mode, lang_code=lang)
+
+
+def run_summary_batch(items: list[tuple[str, str]], lang_code: str) -> list[str]:
+    """
+    同じ要約言語の (text, mode) をまとめて要約する（一括要約用）。
+    キャッシュ済みのものは除き、残りを使うモデルごとに 1 回の summarize_batch() に渡す。
+    """
+    keys = [None if mode == EXTRACTIVE_MODE else model_key(lang_code, text) for text, mode in items]
+    results = [run_extractive(text, lang_code) if key is None else summary_cache.lookup(text, mode, lang_code, key)
+               for (text, mode), key in zip(items, keys)]
+    misses: dict[str, list[int]] = {}
+    for i, r in enumerate(results):
+        if r is None:
+            misses.setdefault(keys[i], []).append(i)
+    for key, idxs in misses.items():
+        batch = [items[i] for i in idxs]
+        if inference_pool.enabled():
+            outs = inference_pool.remote_summarize_batch(batch, lang_code, key)
+        else:
+            outs = run_local_batch(batch, lang_code, key)
+        for i, out in zip(idxs, outs):
+            summary_cache.store(items[i][0], items[i][1], lang_code, out, key)
+            results[i] = out
+    return results
+
+
+def run_local_batch(items: list[tuple[str, str]], lang_code: str, key: str | None = None) -> list[str]:
+    return get_summarizer(key or lang_code).summarize_batch(items, lang_code=lang_code)
@@ -0,0 +1,136 @@
+# summarizer/services/batching.py
+# 役割: 同じモデル宛ての同時リクエストを短時間ためて 1 回のバッチ推論にまとめるスケジューラ
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from . import metrics
+from .summarizers import get_registry, get_summarizer, lang_of, resolve_lang
+
+
+class MicroBatcher:
+    """
+    1 つのサマライザー（モデルキー "en" / "en:long" 等）専用の推論スレッド。
+      - 最初のリクエストが届いてから max_wait_ms 以内、または max_batch 件たまった時点で
+        summarize_batch() を 1 回呼び、結果を各呼び出し元に返す
+    """
+
+    def __init__(self, key: str, model_id: str, max_batch: int, max_wait_ms: float):
+        self.key = key
+        self.lang = lang_of(key)
+        self.model_id = model_id
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[tuple[str, str, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._n_items = 0
+        self._n_batches = 0
+        self._thread = threading.Thread(target=self._loop, name=f"microbatch-{key}", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, mode: str, timeout: float | None = None) -> str:
+        """
+        バッチ推論に加えて結果を待つ。timeout 秒（省略時は SUMMARIZER_MICROBATCH_TIMEOUT_S）以内に
+        推論が始まらない・終わらない場合は TimeoutError（まだキューにあれば取り消して推論しない）。
+        """
+        if timeout is None:
+            timeout = getattr(settings, "SUMMARIZER_MICROBATCH_TIMEOUT_S", 120) or None
+        fut: Future = Future()
+        self._queue.put((text, mode, fut))
+        try:
+            return fut.result(timeout=timeout)
+        except FutureTimeoutError:
+            fut.cancel()
+            raise TimeoutError(f"マイクロバッチの推論が {timeout} 秒以内に終わらなかった（{self.key}）") from None
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            # 待ちきれずに取り消された（submit がタイムアウトした）リクエストは推論しない
+            batch = [item for item in self._collect() if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._n_items += len(batch)
+                self._n_batches += 1
+            try:
+                # レジストリから毎回取得する（LRU で解放された場合は再ロードされる）
+                summarizer = get_summarizer(self.key)
+                outs = summarizer.summarize_batch([(t, m) for t, m, _ in batch], lang_code=self.lang)
+            except Exception as e:
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, _, fut), out in zip(batch, outs):
+                fut.set_result(out)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model_id": self.model_id,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._n_batches,
+                "items": self._n_items,
+                "avg_batch_size": round(self._n_items / self._n_batches, 2) if self._n_batches else 0,
+                "batch_size_hist": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            }
+
+
+_BATCHERS: dict[tuple[str, str], MicroBatcher] = {}   # (モデルキー, モデル ID) → スケジューラ
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return getattr(settings, "SUMMARIZER_MICROBATCH_MAX_SIZE", 8) > 1
+
+
+def get_batcher(lang: str, model_key: str | None = None) -> MicroBatcher:
+    model_key = model_key or resolve_lang(lang)
+    key = (model_key, get_registry().model_id(model_key))
+    with _LOCK:
+        if key not in _BATCHERS:
+            _BATCHERS[key] = MicroBatcher(
+                model_key, key[1],
+                max_batch=getattr(settings, "SUMMARIZER_MICROBATCH_MAX_SIZE", 8),
+                max_wait_ms=getattr(settings, "SUMMARIZER_MICROBATCH_MAX_WAIT_MS", 10),
+            )
+        return _BATCHERS[key]
+
+
+def batcher_stats() -> dict:
+    with _LOCK:
+        return {f"{key}:{model_id}": b.stats() for (key, model_id), b in _BATCHERS.items()}
+
+
+def collect_metrics() -> list:
+    """metrics.register_collector 用: スケジューラごとのキュー長とバッチ数"""
+    rows = []
+    for key, st in batcher_stats().items():
+        labels = {"scheduler": key}
+        rows.append(("summarizer_batch_queue_depth", "gauge", labels, st["queue_depth"]))
+        rows.append(("summarizer_batches_total", "counter", labels, st["batches"]))
+        rows.append(("summarizer_batched_items_total", "counter", labels, st["items"]))
+    return rows
+
+
+metrics.register_collector(collect_metrics)
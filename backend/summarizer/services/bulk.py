@@ -0,0 +1,134 @@
+# summarizer/services/bulk.py
+# 役割: 複数記事の一括要約（URL 取得は並列、要約は言語ごとに準備が済んだものからまとめてバッチ推論）
+
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .extraction import extract_article_text
+from .context import RequestContext
+from .router import final_summary, parse_target_lang, prepare_for_summary
+from .translation import TranslationError
+from summarizer.news_summarizer_model import run_summary, run_summary_batch
+
+
+class ItemError(Exception):
+    """1 件分の失敗（他の記事の処理は続ける）"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def _error_line(index: int, item: dict, e: Exception) -> dict:
+    if isinstance(e, ItemError):
+        message, status = str(e), e.status
+    elif isinstance(e, TranslationError):
+        message, status = f"翻訳失敗: {str(e)}", 502
+    else:
+        message, status = str(e), 500
+    return {"index": index, "id": item.get("id"), "error": message, "status": status}
+
+
+def _prepare(item: dict) -> RequestContext:
+    """本文の取得（url 優先）と、言語検出・ピボット翻訳"""
+    if item.get("url"):
+        try:
+            raw = extract_article_text(item["url"])
+        except Exception as e:
+            raise ItemError(f"記事抽出に失敗: {str(e)}", 400)
+    else:
+        raw = (item.get("text") or "").strip()
+    if not raw:
+        raise ItemError("Missing 'text' or 'url'", 400)
+    return prepare_for_summary(raw)
+
+
+def summarize_many(items: list[dict], target_lang: str | list[str] = "ja", length_mode: str = "medium"):
+    """
+    items: [{"text" | "url", "target_lang"?, "length"?, "id"?}, ...]（target_lang はリストも可）
+    完了した順に 1 件ずつ結果（または失敗）の dict を yield する。
+      1. 本文取得とピボット翻訳を並列に実行
+      2. 準備が済んだ記事を要約言語ごとに run_summary_batch() に出す。その言語のバッチが実行中なら、
+         終わるまでに準備が済んだ記事をまとめて次のバッチにする（遅い URL が他の記事を待たせない）
+      3. バッチが失敗したら 1 件ずつ run_summary() でやり直し、失敗した記事だけをエラーにする
+      4. 要約が出来たものから最終翻訳し、終わった順に返す
+    """
+    targets = [parse_target_lang(it.get("target_lang") or target_lang) for it in items]
+    modes = [(it.get("length") or length_mode).lower() for it in items]
+    routes: dict[int, RequestContext] = {}
+    ready: dict[str, list[int]] = defaultdict(list)   # 要約言語 → 準備が済み、まだバッチに出していない記事
+    running: set[str] = set()                          # バッチを実行中の要約言語
+
+    with ThreadPoolExecutor(max_workers=getattr(settings, "SUMMARIZER_BULK_WORKERS", 8)) as pool:
+        pending = {pool.submit(_prepare, it): ("prepare", i) for i, it in enumerate(items)}
+
+        def dispatch(lang: str) -> None:
+            idxs = ready.pop(lang)
+            running.add(lang)
+            batch = [(routes[i].text, modes[i]) for i in idxs]
+            pending[pool.submit(run_summary_batch, batch, lang)] = ("summarize", (lang, idxs))
+
+        def translate(i: int, summary: str) -> None:
+            pending[pool.submit(final_summary, summary, routes[i].summary_src, targets[i])] = ("translate", i)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind, ref = pending.pop(fut)
+
+                if kind == "prepare":
+                    try:
+                        routes[ref] = fut.result()
+                    except Exception as e:
+                        yield _error_line(ref, items[ref], e)
+                        continue
+                    lang = routes[ref].summary_src
+                    ready[lang].append(ref)
+                    if lang not in running:
+                        dispatch(lang)
+
+                elif kind == "summarize":
+                    lang, idxs = ref
+                    running.discard(lang)
+                    if ready.get(lang):
+                        dispatch(lang)
+                    try:
+                        summaries = fut.result()
+                    except Exception as e:
+                        if len(idxs) == 1:
+                            yield _error_line(idxs[0], items[idxs[0]], e)
+                            continue
+                        # どの記事で失敗したか分からないので、1 件ずつやり直す
+                        for i in idxs:
+                            pending[pool.submit(run_summary, routes[i].text, modes[i], lang)] = ("single", i)
+                        continue
+                    for i, summary in zip(idxs, summaries):
+                        translate(i, summary)
+
+                elif kind == "single":
+                    try:
+                        summary = fut.result()
+                    except Exception as e:
+                        yield _error_line(ref, items[ref], e)
+                        continue
+                    translate(ref, summary)
+
+                else:
+                    i = ref
+                    try:
+                        final = fut.result()
+                    except Exception as e:
+                        yield _error_line(i, items[i], e)
+                        continue
+                    yield {
+                        "index": i,
+                        "id": items[i].get("id"),
+                        "detected_lang": routes[i].detected,
+                        "pivoted": routes[i].pivoted,
+                        "summary_src_lang": routes[i].summary_src,
+                        "target_lang": targets[i],
+                        "length": modes[i],
+                        **final,
+                    }
@@ -0,0 +1,67 @@
+# summarizer/services/chunk_cache.py
+# 役割: 長文の分割要約で、チャンク（と reduce の窓）ごとの要約を本文ハッシュ + 生成パラメータで覚えておく
+#       更新され続ける記事（ライブブログ等）を再要約するとき、変わっていないチャンクは generate しない
+
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+
+from . import metrics
+from .store import LRUCache, SqliteStore, TieredCache
+
+CHUNK_CACHE_VERSION = 1   # チャンク要約の後処理を変えてキャッシュを無効化したい場合に上げる
+
+_cache = None
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def chunk_key(text: str, params: dict, lang: str, model_id: str, generation_kwargs: dict,
+              draft: str | None = None) -> str:
+    """チャンク本文 + 言語 + そのチャンクの生成パラメータ（min/max_new_tokens 等）+ モデルから決まるキー"""
+    signature = {
+        "v": CHUNK_CACHE_VERSION,
+        "text": hashlib.sha256(text.encode()).hexdigest(),
+        "lang": lang,
+        "params": params,
+        "model": model_id,
+        "generation": generation_kwargs,
+        "draft": draft,
+    }
+    blob = json.dumps(signature, sort_keys=True, ensure_ascii=False, default=str)
+    return "chunk:" + hashlib.sha256(blob.encode()).hexdigest()
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        path = getattr(settings, "SUMMARIZER_CACHE_PATH", None)
+        _cache = TieredCache(
+            LRUCache(getattr(settings, "SUMMARIZER_CHUNK_CACHE_MEMORY_ENTRIES", 2048)),
+            SqliteStore(path, "chunk_summaries",
+                        max_entries=getattr(settings, "SUMMARIZER_CHUNK_CACHE_MAX_ENTRIES", 50000))
+            if path else None,
+        )
+    return _cache
+
+
+def lookup(key: str) -> str | None:
+    hit = get_cache().get(key)
+    with _stats_lock:
+        _stats["hits" if hit is not None else "misses"] += 1
+    metrics.inc("summarizer_cache_requests_total", cache="chunk", result="hit" if hit is not None else "miss")
+    return hit
+
+
+def store(key: str, summary: str) -> None:
+    get_cache().set(key, summary)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats)
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0
+    return out
@@ -0,0 +1,65 @@
+# summarizer/services/concurrency.py
+# 役割: 同じキーの重い処理を同時に 1 回だけ実行する（single-flight）ための部品
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    同じキーで実行中の処理があれば、新たに実行せずその結果を待って共有する。
+    完了後はキーを解放するので、結果の保持はキャッシュ側の責務とする。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        """キーの Future と、自分が実行役（leader）かどうか"""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+        return fut, leader
+
+    def do(self, key: str, fn):
+        fut, leader = self._join(key)
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def ado(self, key: str, fn):
+        """
+        do() の非同期版。fn は coroutine を返す関数。
+        同期版とキーを共有するので、スレッドとコルーチンのどちらが先に始めた処理にも相乗りする。
+        """
+        fut, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(fut)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
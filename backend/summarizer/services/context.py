@@ -0,0 +1,36 @@
+# summarizer/services/context.py
+# 役割: 1 リクエスト分の入力と、一度だけ求めた派生情報（検出言語・翻訳ルート）をまとめて持ち回る
+
+from dataclasses import dataclass
+
+
+@dataclass
+class RequestContext:
+    """
+    router が最初に 1 回だけ言語を検出して作り、以降の工程（ピボット翻訳・要約・最終翻訳）で使い回す。
+      detected   … 入力本文の言語
+      pivot_lang … 要約前に翻訳する言語（翻訳不要なら None）
+      text       … 要約に渡す本文（ピボット翻訳後。翻訳前は raw_text と同じ）
+    """
+    raw_text: str
+    detected: str
+    pivot_lang: str | None = None
+    target_lang: str | list[str] = ""
+    length_mode: str = "medium"
+    text: str = ""
+
+    def __post_init__(self):
+        if not self.text:
+            self.text = self.raw_text
+
+    @property
+    def pivoted(self) -> bool:
+        return self.pivot_lang is not None
+
+    @property
+    def summary_src(self) -> str:
+        """要約モデルに渡す言語（en / ja）"""
+        return self.pivot_lang or self.detected
+
+    def route(self) -> dict:
+        return {"detected": self.detected, "pivoted": self.pivoted, "summary_src": self.summary_src}
@@ -0,0 +1,192 @@
+# summarizer/services/dedup.py
+# 役割: 転載記事（本文がわずかに違うだけの記事）を MinHash + LSH で見つけ、過去の要約結果を使い回す
+#       完全一致のキャッシュ（summary_cache）では拾えない近似重複を、route_and_summarize の手前で捕まえる
+
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .summary_cache import normalize_text
+
+SHINGLE_CHARS = 5      # 文字 n-gram の長さ（分かち書きの無い言語にもそのまま使える）
+MIN_SHINGLES = 50      # これより短い本文は推定が不安定なので対象外
+NUM_PERM = 128
+SIGNATURE_CHUNK = 1024   # 一度にハッシュする shingle 数（一時配列は NUM_PERM × これ だけで済む）
+_PRIME = (1 << 31) - 1
+
+
+def _shingles(text: str) -> np.ndarray:
+    s = normalize_text(text).lower()
+    grams = {s[i:i + SHINGLE_CHARS] for i in range(len(s) - SHINGLE_CHARS + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def _band_rows(threshold: float, num_perm: int) -> int:
+    """
+    LSH の 1 バンドあたりの行数。候補になる類似度の目安 (1/b)^(1/r) が
+    threshold より少し低くなる最大の r を選ぶ（取りこぼしを抑え、最終判定は推定 Jaccard で行う）。
+    """
+    best = 1
+    for r in (1, 2, 4, 8, 16, 32):
+        if num_perm % r == 0 and (r / num_perm) ** (1 / r) <= threshold - 0.05:
+            best = r
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    本文の MinHash シグネチャを LSH バケットに登録し、推定 Jaccard 類似度が threshold 以上の記事を探す。
+    記事ごとに (長さモード, 出力言語) → 要約結果 を保持し、max_entries を超えたら古い記事から捨てる。
+    """
+
+    def __init__(self, threshold: float, max_entries: int = 10000, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.rows = _band_rows(threshold, num_perm)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[int, tuple[np.ndarray, dict]]" = OrderedDict()
+        self._buckets: dict[tuple, set[int]] = {}
+        self._next_id = 0
+
+    def signature(self, text: str) -> np.ndarray | None:
+        hashes = _shingles(text)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        # 全 shingle 分の (NUM_PERM × shingle 数) 行列は作らず、SIGNATURE_CHUNK 個ずつの最小値を畳み込む
+        sig = np.full(len(self._a), np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(hashes), SIGNATURE_CHUNK):
+            part = hashes[start:start + SIGNATURE_CHUNK]
+            np.minimum(sig, ((np.outer(self._a, part) + self._b[:, None]) % _PRIME).min(axis=1), out=sig)
+        return sig
+
+    def _bands(self, sig: np.ndarray) -> list[tuple]:
+        return [(i, sig[i:i + self.rows].tobytes()) for i in range(0, len(sig), self.rows)]
+
+    def query(self, sig: np.ndarray) -> tuple[int | None, float]:
+        """最も似ている登録済み記事の ID と推定類似度（threshold 未満なら ID は None）"""
+        with self._lock:
+            candidates = set()
+            for band in self._bands(sig):
+                candidates |= self._buckets.get(band, set())
+            best, best_sim = None, 0.0
+            for doc_id in candidates:
+                sim = float(np.mean(self._docs[doc_id][0] == sig))
+                if sim > best_sim:
+                    best, best_sim = doc_id, sim
+        return (best, best_sim) if best_sim >= self.threshold else (None, best_sim)
+
+    def get(self, doc_id: int, variant: tuple) -> dict | None:
+        with self._lock:
+            entry = self._docs.get(doc_id)
+            if entry is None:
+                return None
+            self._docs.move_to_end(doc_id)
+            return entry[1].get(variant)
+
+    def put(self, sig: np.ndarray, doc_id: int | None, variant: tuple, result: dict) -> None:
+        """
+        doc_id（近似重複として見つかった記事）があればそこに、無ければ新しい記事として登録する。
+        doc_id の記事と本文が違う（シグネチャが一致しない）場合は、古い本文の要約を捨てて新しい本文で登録し直す
+        （更新され続ける記事が、いつまでも最初の版の本文と比べられないようにする）。
+        """
+        with self._lock:
+            if doc_id in self._docs and not np.array_equal(self._docs[doc_id][0], sig):
+                self._remove(doc_id)
+            if doc_id is None or doc_id not in self._docs:
+                doc_id = self._next_id
+                self._next_id += 1
+                self._docs[doc_id] = (sig, {})
+                for band in self._bands(sig):
+                    self._buckets.setdefault(band, set()).add(doc_id)
+            self._docs[doc_id][1][variant] = result
+            self._docs.move_to_end(doc_id)
+            while len(self._docs) > self.max_entries:
+                self._remove(next(iter(self._docs)))
+
+    def _remove(self, doc_id: int) -> None:
+        old_sig, _ = self._docs.pop(doc_id)
+        for band in self._bands(old_sig):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+class Probe:
+    """lookup() の結果。ミス時は remember() にそのまま渡すと、シグネチャを計算し直さずに登録できる"""
+
+    def __init__(self, sig, doc_id, similarity: float, variant: tuple):
+        self.sig = sig
+        self.doc_id = doc_id
+        self.similarity = similarity
+        self.variant = variant
+
+
+_index = None
+_index_lock = threading.Lock()
+_stats = {"lookups": 0, "hits": 0, "near_hits": 0, "skipped": 0}
+_stats_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return getattr(settings, "SUMMARIZER_NEAR_DUP_THRESHOLD", 0) > 0
+
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(
+                threshold=getattr(settings, "SUMMARIZER_NEAR_DUP_THRESHOLD", 0),
+                max_entries=getattr(settings, "SUMMARIZER_NEAR_DUP_MAX_ENTRIES", 10000),
+            )
+        return _index
+
+
+def _count(**deltas) -> None:
+    with _stats_lock:
+        for k, v in deltas.items():
+            _stats[k] += v
+
+
+def lookup(raw_text: str, length_mode: str, target_lang: str | list[str]) -> tuple[dict | None, Probe | None]:
+    """
+    近似重複の記事に同じ (長さモード, 出力言語) の要約があれば (結果, probe) を返す。
+    無ければ (None, probe)。本文が短すぎて判定しない場合は (None, None)。
+    """
+    index = get_index()
+    sig = index.signature(raw_text)
+    if sig is None:
+        _count(skipped=1)
+        return None, None
+    variant = (length_mode, tuple(target_lang) if isinstance(target_lang, list) else target_lang)
+    doc_id, similarity = index.query(sig)
+    hit = index.get(doc_id, variant) if doc_id is not None else None
+
+    _count(lookups=1, hits=int(hit is not None), near_hits=int(hit is not None and similarity < 1.0))
+    metrics.inc("summarizer_cache_requests_total", cache="near_duplicate", result="hit" if hit else "miss")
+    return hit, Probe(sig, doc_id, similarity, variant)
+
+
+def remember(probe: Probe | None, result: dict) -> None:
+    if probe is not None:
+        get_index().put(probe.sig, probe.doc_id, probe.variant, result)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        out = dict(_stats)
+    out["hit_ratio"] = round(out["hits"] / out["lookups"], 4) if out["lookups"] else 0
+    out["entries"] = len(_index) if _index is not None else 0
+    return out
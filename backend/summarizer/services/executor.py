@@ -0,0 +1,26 @@
+# summarizer/services/executor.py
+# 役割: 非同期ビューからモデル推論を呼ぶための上限付きスレッドプール
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """同時に走る推論の数を SUMMARIZER_INFERENCE_WORKERS 本に制限する"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "SUMMARIZER_INFERENCE_WORKERS", 2),
+            thread_name_prefix="inference",
+        )
+    return _executor
+
+
+async def run_inference(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,218 @@
+# summarizer/services/extraction.py
+# 役割: URL から記事本文を抽出する（newspaper.Article のラッパー）
+#       URL 単位でキャッシュし、期限切れ後は ETag / Last-Modified で再検証する
+
+import asyncio
+import codecs
+import json
+import re
+import time
+
+import requests
+from django.conf import settings
+from newspaper import Article
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+
+from . import metrics
+from .concurrency import SingleFlight
+from .http import get_async_client
+from .store import LRUCache, SqliteStore, TieredCache
+
+USER_AGENT = "news-summarizer/1.0"
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+META_SCAN_BYTES = 4096   # <meta charset> を探す先頭のバイト数
+DETECT_BYTES = 64 * 1024  # charset の指定が無いとき、文字コードの推定に使う先頭のバイト数
+
+
+class ExtractionError(Exception): pass
+
+
+_cache = None
+_session = None
+_flight = SingleFlight()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        path = _setting("SUMMARIZER_ARTICLE_CACHE_PATH", None)
+        ttl = _setting("SUMMARIZER_ARTICLE_CACHE_TTL", 60 * 60 * 24 * 7)
+        _cache = TieredCache(
+            LRUCache(_setting("SUMMARIZER_ARTICLE_CACHE_MAX_ENTRIES", 512), ttl=ttl),
+            SqliteStore(path, "articles", ttl=ttl,
+                        max_entries=_setting("SUMMARIZER_ARTICLE_CACHE_STORE_MAX_ENTRIES", 20000))
+            if path else None,
+        )
+    return _cache
+
+
+def get_session() -> requests.Session:
+    """ホストごとに接続をプールして使い回す共有セッション"""
+    global _session
+    if _session is None:
+        pool = _setting("SUMMARIZER_HTTP_MAX_CONNECTIONS", 100)
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _session.headers["User-Agent"] = USER_AGENT
+    return _session
+
+
+def _parse_html(url: str, html: str) -> str:
+    art = Article(url)
+    art.download(input_html=html)
+    art.parse()
+    return (art.text or "").strip()
+
+
+def _load(url: str) -> dict | None:
+    raw = get_cache().get(f"article:{url}")
+    return json.loads(raw) if raw else None
+
+
+def _save(url: str, entry: dict) -> None:
+    get_cache().set(f"article:{url}", json.dumps(entry, ensure_ascii=False))
+
+
+def _is_fresh(entry: dict) -> bool:
+    return time.time() - entry["fetched_at"] < _setting("SUMMARIZER_ARTICLE_FRESH_SECONDS", 300)
+
+
+def _conditional_headers(entry: dict | None) -> dict:
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _new_entry(url: str, headers, html: str) -> dict:
+    return {
+        "text": _parse_html(url, html),
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+    }
+
+
+def _revalidated(url: str, entry: dict) -> str:
+    """304 Not Modified: 本文はそのまま、取得時刻だけ更新する"""
+    metrics.inc("summarizer_cache_requests_total", cache="article", result="revalidated")
+    entry["fetched_at"] = time.time()
+    _save(url, entry)
+    return entry["text"]
+
+
+def _known(encoding: str | None) -> str | None:
+    try:
+        return codecs.lookup(encoding).name if encoding else None
+    except LookupError:
+        return None
+
+
+def _charset(content_type: str | None, body: bytes) -> str:
+    """
+    本文の文字コード: Content-Type の charset → HTML の <meta charset> → バイト列からの推定 → UTF-8 の順に決める。
+    （requests は text/html で charset が無いと ISO-8859-1 とみなすので、r.encoding は使わない）
+    """
+    m = _HEADER_CHARSET_RE.search(content_type or "")
+    encoding = _known(m.group(1)) if m else None
+    if encoding is None:
+        m = _META_CHARSET_RE.search(body[:META_SCAN_BYTES])
+        encoding = _known(m.group(1).decode("ascii")) if m else None
+    if encoding is None and chardet is not None:
+        encoding = _known(chardet.detect(body[:DETECT_BYTES]).get("encoding"))
+    return encoding or "utf-8"
+
+
+def _decode(body: bytes, content_type: str | None) -> str:
+    return body.decode(_charset(content_type, body), errors="replace")
+
+
+def _download(url: str, entry: dict | None) -> str:
+    max_bytes = _setting("SUMMARIZER_ARTICLE_MAX_BYTES", 5 * 1024 * 1024)
+    timeout = _setting("SUMMARIZER_ARTICLE_TIMEOUT", 10)
+    deadline = time.monotonic() + timeout
+
+    with get_session().get(url, headers=_conditional_headers(entry), timeout=timeout, stream=True) as r:
+        if r.status_code == 304 and entry:
+            return _revalidated(url, entry)
+        if r.status_code != 200:
+            raise ExtractionError(f"HTTP {r.status_code}")
+
+        body = bytearray()
+        for part in r.iter_content(64 * 1024):
+            body.extend(part)
+            if len(body) > max_bytes:
+                raise ExtractionError(f"記事サイズが上限（{max_bytes} bytes）を超えた。")
+            if time.monotonic() > deadline:
+                raise ExtractionError(f"記事取得が {timeout} 秒以内に終わらなかった。")
+        html = _decode(bytes(body), r.headers.get("Content-Type"))
+        new = _new_entry(str(r.url), r.headers, html)
+
+    _save(url, new)
+    return new["text"]
+
+
+def extract_article_text(url: str) -> str:
+    """
+    URL の本文を返す（同期版）。
+      - 取得から SUMMARIZER_ARTICLE_FRESH_SECONDS 以内ならキャッシュをそのまま返す
+      - それ以降は条件付きリクエストで再検証し、更新が無ければキャッシュを使う
+      - 同じ URL の同時リクエストはダウンロードを 1 回にまとめる
+    """
+    with metrics.span("extract"):
+        entry = _load(url)
+        if entry and _is_fresh(entry):
+            metrics.inc("summarizer_cache_requests_total", cache="article", result="hit")
+            return entry["text"]
+        metrics.inc("summarizer_cache_requests_total", cache="article", result="miss")
+        return _flight.do(url, lambda: _download(url, entry))
+
+
+async def _adownload(url: str, entry: dict | None) -> str:
+    max_bytes = _setting("SUMMARIZER_ARTICLE_MAX_BYTES", 5 * 1024 * 1024)
+    timeout = _setting("SUMMARIZER_ARTICLE_TIMEOUT", 10)
+
+    async def fetch():
+        async with get_async_client().stream("GET", url, headers=_conditional_headers(entry)) as r:
+            if r.status_code == 304 and entry:
+                return await asyncio.to_thread(_revalidated, url, entry)
+            if r.status_code != 200:
+                raise ExtractionError(f"HTTP {r.status_code}")
+            body = bytearray()
+            async for part in r.aiter_bytes():
+                body.extend(part)
+                if len(body) > max_bytes:
+                    raise ExtractionError(f"記事サイズが上限（{max_bytes} bytes）を超えた。")
+            html = _decode(bytes(body), r.headers.get("Content-Type"))
+            new = await asyncio.to_thread(_new_entry, str(r.url), r.headers, html)
+        await asyncio.to_thread(_save, url, new)
+        return new["text"]
+
+    try:
+        return await asyncio.wait_for(fetch(), timeout)
+    except asyncio.TimeoutError:
+        raise ExtractionError(f"記事取得が {timeout} 秒以内に終わらなかった。")
+
+
+async def aextract_article_text(url: str) -> str:
+    """
+    extract_article_text() の非同期版。キャッシュと single-flight は同期版と共有し、
+    ダウンロードは共有 AsyncClient、HTML の解析と SQLite キャッシュの読み書きはスレッドで行う。
+    """
+    with metrics.span("extract"):
+        entry = await asyncio.to_thread(_load, url)
+        if entry and _is_fresh(entry):
+            metrics.inc("summarizer_cache_requests_total", cache="article", result="hit")
+            return entry["text"]
+        metrics.inc("summarizer_cache_requests_total", cache="article", result="miss")
+        return await _flight.ado(url, lambda: _adownload(url, entry))
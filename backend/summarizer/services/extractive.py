@@ -0,0 +1,140 @@
+# summarizer/services/extractive.py
+# 役割: 文単位の抽出型要約（TF-IDF + TextRank, NumPy でベクトル化）
+#       生成モデルの前段で入力を窓に収まるまで絞り込む用途と、モデルを使わない "extractive" モードで使う
+
+import re
+
+import numpy as np
+
+# 文の区切り: 日本語・中国語は 。！？ の直後（閉じ括弧の前は除く）、それ以外は .!? + 空白の直後。改行も区切りとみなす
+_CJK_SENT_RE = re.compile(r"(?<=[。！？!?])(?![」』）)\]])\s*|\n+")
+_LATIN_SENT_RE = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"'”’)\]]))\s+(?=[\"'“‘(\[]?[A-Z0-9])|\n+")
+_WORD_RE = re.compile(r"[^\W_]+")
+_CJK_LANGS = {"ja", "zh"}
+# 直後で文を区切らない略語（末尾の "." を除き小文字で比較）。
+# これに加えて、1 文字の大文字（"John F. Kennedy"）と途中に "." を含む語（"U.S." "p.m." "e.g."）も略語とみなす
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "ft", "rev", "hon",
+    "gen", "gov", "sen", "rep", "pres", "lt", "col", "capt", "sgt", "cmdr", "adm",
+    "inc", "ltd", "co", "corp", "bros", "vs", "approx", "dept", "est", "fig", "no", "vol",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    "mme", "mlle", "hr", "fr",
+}
+
+EXTRACTIVE_MODE = "extractive"   # モデルを使わず抽出だけで返す長さモード
+DAMPING = 0.85
+# "extractive" モードで残す文の割合と、文数の下限・上限
+EXTRACTIVE_SENTENCES = {"ratio": 0.2, "min": 3, "max": 8}
+
+
+def _is_abbreviation(word: str) -> bool:
+    """word（区切り候補の直前の語）が略語の "." で終わっているか"""
+    word = word.lstrip("\"'“‘([")
+    if not word.endswith("."):
+        return False
+    stem = word[:-1]
+    return stem.lower() in _ABBREVIATIONS or (len(stem) == 1 and stem.isupper()) or "." in stem
+
+
+def _split_latin(text: str) -> list[str]:
+    """改行では必ず区切り、.!? + 空白では直前の語が略語でなければ区切る"""
+    pieces, start = [], 0
+    for m in _LATIN_SENT_RE.finditer(text):
+        if "\n" not in m.group():
+            before = text[max(start, m.start() - 32):m.start()].split()
+            if before and _is_abbreviation(before[-1]):
+                continue
+        pieces.append(text[start:m.start()])
+        start = m.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+def split_sentences(text: str, lang: str) -> list[str]:
+    pieces = _CJK_SENT_RE.split(text) if lang in _CJK_LANGS else _split_latin(text)
+    return [s.strip() for s in pieces if s and s.strip()]
+
+
+def _terms(sentence: str, lang: str) -> list[str]:
+    """日本語・中国語は分かち書きが無いので文字 bigram、それ以外は小文字の単語"""
+    if lang in _CJK_LANGS:
+        chars = [c for c in sentence if not c.isspace()]
+        return ["".join(p) for p in zip(chars, chars[1:])] or chars
+    return _WORD_RE.findall(sentence.lower())
+
+
+def score_sentences(sentences: list[str], lang: str, iterations: int = 30) -> np.ndarray:
+    """
+    各文の重要度を返す。
+    文の TF-IDF ベクトル同士のコサイン類似度を重みとするグラフで TextRank（べき乗法）を回す。
+    """
+    n = len(sentences)
+    if n <= 2:
+        return np.ones(n)
+
+    vocab: dict[str, int] = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for term in _terms(sentence, lang):
+            rows.append(i)
+            cols.append(vocab.setdefault(term, len(vocab)))
+    if not vocab:
+        return np.ones(n)
+
+    tf = np.zeros((n, len(vocab)), dtype=np.float32)
+    np.add.at(tf, (rows, cols), 1.0)
+    df = np.count_nonzero(tf, axis=0)
+    tfidf = np.log1p(tf) * (np.log((1 + n) / (1 + df)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf /= np.where(norms == 0, 1, norms)
+
+    sim = tfidf @ tfidf.T
+    np.fill_diagonal(sim, 0)
+    out_weight = sim.sum(axis=1, keepdims=True)
+    transition = np.divide(sim, out_weight, out=np.full_like(sim, 1 / n), where=out_weight > 0)
+
+    scores = np.full(n, 1 / n, dtype=np.float32)
+    for _ in range(iterations):
+        scores = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+    return scores
+
+
+def select(sentences: list[str], scores: np.ndarray, costs: list[int], budget: int) -> list[int]:
+    """スコアの高い順に、costs の合計が budget に収まるだけ文を選び、元の順序で返す"""
+    chosen, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        if used + costs[i] <= budget:
+            chosen.append(int(i))
+            used += costs[i]
+    return sorted(chosen)
+
+
+def _join(sentences: list[str], lang: str) -> str:
+    return ("" if lang in _CJK_LANGS else " ").join(sentences)
+
+
+def compress(text: str, lang: str, budget: int, count_tokens) -> str:
+    """
+    text を、重要な文だけを残して budget トークン以内に縮める（文の順序は保つ）。
+    count_tokens(list[str]) -> list[int] は各文のトークン数を返す関数（モデルのトークナイザー）。
+    """
+    sentences = split_sentences(text, lang)
+    if len(sentences) <= 1:
+        return text
+    costs = [n + 1 for n in count_tokens(sentences)]   # 結合時の区切りぶん
+    if sum(costs) <= budget:
+        return text
+    keep = select(sentences, score_sentences(sentences, lang), costs, budget)
+    return _join([sentences[i] for i in keep], lang) if keep else text
+
+
+def extract_summary(text: str, lang: str) -> str:
+    """モデルを使わない抽出型要約（"extractive" モード）。上位の文を元の順序で返す"""
+    sentences = split_sentences(text, lang)
+    if len(sentences) <= EXTRACTIVE_SENTENCES["min"]:
+        return _join(sentences, lang)
+    k = int(len(sentences) * EXTRACTIVE_SENTENCES["ratio"])
+    k = max(EXTRACTIVE_SENTENCES["min"], min(k, EXTRACTIVE_SENTENCES["max"]))
+    scores = score_sentences(sentences, lang)
+    keep = sorted(int(i) for i in np.argsort(-scores, kind="stable")[:k])
+    return _join([sentences[i] for i in keep], lang)
@@ -0,0 +1,28 @@
+# summarizer/services/http.py
+# 役割: 外部 HTTP（記事取得・DeepL）用のキープアライブ付き共有クライアント
+
+import asyncio
+
+import httpx
+from django.conf import settings
+
+_async_clients: dict[int, httpx.AsyncClient] = {}
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    イベントループごとに 1 つの AsyncClient を共有し、接続を使い回す。
+    接続数の上限は SUMMARIZER_HTTP_MAX_CONNECTIONS。
+    """
+    loop_id = id(asyncio.get_running_loop())
+    client = _async_clients.get(loop_id)
+    if client is None or client.is_closed:
+        max_conn = getattr(settings, "SUMMARIZER_HTTP_MAX_CONNECTIONS", 100)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_conn, max_keepalive_connections=max_conn),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            follow_redirects=True,
+            headers={"User-Agent": "news-summarizer/1.0"},
+        )
+        _async_clients[loop_id] = client
+    return client
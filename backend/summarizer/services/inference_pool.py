@@ -0,0 +1,230 @@
+# summarizer/services/inference_pool.py
+# 役割: モデル推論を専用のワーカープロセス群に任せる（Web ワーカーはモデルを持たない）
+#
+#   manage.py inference_server         … 親プロセスでモデルを読み込み、fork でワーカーを N 個起動
+#   SUMMARIZER_INFERENCE_MODE = "pool" … run_summary() はローカル UNIX ソケット経由でワーカーに依頼する
+#
+# 重みは親プロセスで 1 回だけ読み込み、fork 後の子プロセスとコピーオンライトで共有する。
+# fork 前に gc.freeze() しておき、子プロセスの GC がオブジェクトに触れてページがコピーされるのを防ぐ。
+# 推論中は重みに書き込まないので、ワーカーを増やしても常駐メモリはほぼ増えない。
+
+import gc
+import itertools
+import logging
+import os
+import threading
+import time
+from multiprocessing import get_context
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3     # ワーカーに接続できない・通信が切れたときに試す回数（毎回ソケット一覧を取り直す）
+RETRY_DELAY = 0.2    # 再試行までの待ち秒数（再起動中のワーカーが待ち受けを始めるまで）
+REFRESH_SECONDS = 30  # ソケット一覧を取り直す間隔（外したワーカーが再起動していれば戻す）
+
+
+class InferenceError(RuntimeError):
+    """ワーカー側で推論が失敗した"""
+
+
+def _authkey() -> bytes:
+    key = getattr(settings, "SUMMARIZER_INFERENCE_AUTHKEY", "") or settings.SECRET_KEY
+    return key.encode()
+
+
+def socket_dir() -> Path:
+    return Path(getattr(settings, "SUMMARIZER_INFERENCE_SOCKET_DIR", "/tmp/news-summarizer"))
+
+
+def _timeout() -> float | None:
+    """1 回の依頼の結果（途中結果を含む）を待つ最大秒数（0 なら無制限）"""
+    return getattr(settings, "SUMMARIZER_INFERENCE_TIMEOUT_S", 300) or None
+
+
+def enabled() -> bool:
+    return getattr(settings, "SUMMARIZER_INFERENCE_MODE", "local") == "pool"
+
+
+# ---- サーバー側（manage.py inference_server から使う） ----
+
+def _serve_conn(conn) -> None:
+    from summarizer.news_summarizer_model import run_local, run_local_batch
+
+    with conn:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                return
+            op = msg[0]
+            try:
+                if op == "summarize":
+                    _, text, mode, lang, key, stream = msg
+                    on_partial = (lambda i, total, s: conn.send(("partial", i, total, s))) if stream else None
+                    conn.send(("ok", run_local(text, mode, lang, on_partial, key)))
+                elif op == "summarize_batch":
+                    _, items, lang, key = msg
+                    conn.send(("ok", run_local_batch(items, lang, key)))
+                elif op == "ping":
+                    conn.send(("ok", os.getpid()))
+                else:
+                    conn.send(("error", f"unknown op: {op}"))
+            except Exception as e:
+                logger.exception("inference failed")
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def _worker_main(address: str, threads: int, cpus: list[int] | None) -> None:
+    import torch
+
+    torch.set_num_threads(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if os.path.exists(address):
+        os.unlink(address)
+
+    listener = Listener(address, family="AF_UNIX", authkey=_authkey())
+    logger.info("inference worker %d listening on %s (threads=%d, cpus=%s)", os.getpid(), address, threads, cpus)
+    while True:
+        conn = listener.accept()
+        # 接続ごとにスレッドで受ける（同じワーカー内ではマイクロバッチでまとめて推論される）
+        threading.Thread(target=_serve_conn, args=(conn,), daemon=True).start()
+
+
+def serve(workers: int, threads: int, langs: list[str], pin_cpus: bool = False) -> None:
+    """
+    親プロセスでモデルを読み込んでから fork し、ワーカーが落ちたら起動し直す。
+    （fork 前にスレッドを作らないよう、マイクロバッチのスレッドは各ワーカーで遅延生成される）
+    """
+    from .summarizers import warmup
+
+    warmup(langs)
+    gc.collect()
+    gc.freeze()   # 参照カウント以外の GC 走査でページがコピーされるのを防ぐ
+
+    sock_dir = socket_dir()
+    sock_dir.mkdir(parents=True, exist_ok=True)
+    # 前回の起動（ワーカー数が多かった場合など）で残ったソケットを消し、クライアントが接続しに行かないようにする
+    for stale in sock_dir.glob("worker-*.sock"):
+        stale.unlink(missing_ok=True)
+    ctx = get_context("fork")
+    n_cpus = os.cpu_count() or 1
+
+    def spawn(i: int):
+        cpus = [c % n_cpus for c in range(i * threads, (i + 1) * threads)] if pin_cpus else None
+        p = ctx.Process(target=_worker_main, args=(str(sock_dir / f"worker-{i}.sock"), threads, cpus),
+                        name=f"inference-{i}", daemon=True)
+        p.start()
+        return p
+
+    procs = [spawn(i) for i in range(workers)]
+    try:
+        while True:
+            time.sleep(1)
+            for i, p in enumerate(procs):
+                if not p.is_alive():
+                    logger.warning("inference worker %d exited (code=%s), restarting", i, p.exitcode)
+                    procs[i] = spawn(i)
+    finally:
+        for p in procs:
+            p.terminate()
+
+
+# ---- クライアント側（Web ワーカーから使う） ----
+
+class _ConnectionPool:
+    """ワーカーのソケットごとに接続を使い回し、ラウンドロビンで振り分ける"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle: dict[str, list] = {}
+        self._addresses: list[str] = []
+        self._refreshed_at = 0.0
+        self._counter = itertools.count()
+
+    def _refresh(self) -> None:
+        self._addresses = sorted(str(p) for p in socket_dir().glob("worker-*.sock"))
+        if not self._addresses:
+            raise InferenceError(f"推論ワーカーが見つからない: {socket_dir()}（manage.py inference_server を起動する）")
+        self._refreshed_at = time.monotonic()
+
+    def acquire(self):
+        """(ソケット, 使い回せる接続) を返す。接続が無ければ None（connect() で接続する）"""
+        with self._lock:
+            if not self._addresses or time.monotonic() - self._refreshed_at > REFRESH_SECONDS:
+                self._refresh()
+            address = self._addresses[next(self._counter) % len(self._addresses)]
+            idle = self._idle.setdefault(address, [])
+            conn = idle.pop() if idle else None
+        return address, conn
+
+    @staticmethod
+    def connect(address: str):
+        return Client(address, family="AF_UNIX", authkey=_authkey())
+
+    def release(self, address: str, conn) -> None:
+        with self._lock:
+            self._idle.setdefault(address, []).append(conn)
+
+    def discard(self, address: str, conn) -> None:
+        """
+        接続できなかった・通信が切れたワーカーをローテーションから外す（全部外れたら次回ソケット一覧を取り直す）。
+        再起動したワーカーは REFRESH_SECONDS ごとの取り直しで戻る。
+        """
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+        with self._lock:
+            if address in self._addresses:
+                self._addresses.remove(address)
+
+
+_pool = _ConnectionPool()
+
+
+def _call(msg: tuple, on_partial=None):
+    timeout = _timeout()
+    for attempt in range(MAX_ATTEMPTS):
+        address, conn = _pool.acquire()
+        try:
+            if conn is None:
+                conn = _pool.connect(address)
+            conn.send(msg)
+            deadline = time.monotonic() + timeout if timeout else None
+            while True:
+                if deadline is not None and not conn.poll(max(deadline - time.monotonic(), 0)):
+                    # ワーカーが応答しない。遅れて届く返事と混ざらないよう接続を捨て、同じ依頼は再送しない
+                    _pool.discard(address, conn)
+                    raise InferenceError(f"推論ワーカーが {timeout} 秒以内に応答しなかった。")
+                reply = conn.recv()
+                if reply[0] == "partial":
+                    if on_partial:
+                        on_partial(*reply[1:])
+                    continue
+                break
+        except (EOFError, OSError, ConnectionError):
+            # ワーカーが再起動中・落ちたワーカーのソケットが残っている等。
+            # 接続を捨て、ソケット一覧を取り直して別のワーカーで試す
+            _pool.discard(address, conn)
+            if attempt == MAX_ATTEMPTS - 1:
+                raise InferenceError("推論ワーカーとの通信に失敗した。")
+            time.sleep(RETRY_DELAY)
+            continue
+        _pool.release(address, conn)
+        if reply[0] == "error":
+            raise InferenceError(reply[1])
+        return reply[1]
+
+
+def remote_summarize(text: str, mode: str, lang: str, on_partial=None, key: str | None = None) -> str:
+    return _call(("summarize", text, mode, lang, key, on_partial is not None), on_partial)
+
+
+def remote_summarize_batch(items: list[tuple[str, str]], lang: str, key: str | None = None) -> list[str]:
+    return _call(("summarize_batch", items, lang, key))
@@ -0,0 +1,154 @@
+# summarizer/services/jobs.py
+# 役割: 要約ジョブのキュー（既存の db.sqlite3 上の SummaryJob テーブル）
+#       登録・取得（リース付き）・実行・状態集計。ワーカーは manage.py summary_worker
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import metrics
+from .bulk import ItemError
+from .extraction import extract_article_text
+from .router import route_and_summarize
+from .translation import TranslationError
+from summarizer.models import SummaryJob
+
+logger = logging.getLogger(__name__)
+
+Status = SummaryJob.Status
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def lease_seconds() -> float:
+    return _setting("SUMMARIZER_JOB_LEASE_SECONDS", 120)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enable_wal() -> None:
+    """複数ワーカープロセスからの書き込みと Web 側の読み取りを並行させる（SQLite のみ）"""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode=WAL")
+
+
+def submit(text: str, url: str, target_lang: str | list[str], length: str) -> SummaryJob:
+    return SummaryJob.objects.create(text=text, url=url, target_lang=target_lang, length=length)
+
+
+def _claimable() -> Q:
+    """未着手、または実行中のままリースが切れた（ワーカーが落ちた）ジョブ"""
+    return Q(status=Status.QUEUED) | Q(status=Status.RUNNING, lease_expires_at__lt=timezone.now())
+
+
+def _fail_exhausted() -> None:
+    """リースが切れたまま試行回数の上限に達したジョブを失敗にする"""
+    SummaryJob.objects.filter(
+        status=Status.RUNNING,
+        lease_expires_at__lt=timezone.now(),
+        attempts__gte=_setting("SUMMARIZER_JOB_MAX_ATTEMPTS", 3),
+    ).update(status=Status.FAILED, error="worker stopped before finishing the job",
+             error_status=500, finished_at=timezone.now(), lease_expires_at=None)
+
+
+def claim(worker: str) -> SummaryJob | None:
+    """
+    次のジョブを 1 件取得して実行中にする。
+    候補を読んでから「まだ取得可能なら」という条件付き UPDATE で奪い合うので、
+    複数のワーカーが同じジョブを同時に取ることはない（更新件数 0 なら次の候補へ）。
+    """
+    _fail_exhausted()
+    candidates = SummaryJob.objects.filter(_claimable()).order_by("created_at").values_list("pk", flat=True)[:10]
+    for pk in candidates:
+        now = timezone.now()
+        updated = SummaryJob.objects.filter(_claimable(), pk=pk).update(
+            status=Status.RUNNING,
+            worker=worker,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds()),
+        )
+        if updated:
+            return SummaryJob.objects.get(pk=pk)
+    return None
+
+
+def _heartbeat(job: SummaryJob, worker: str, stop: threading.Event) -> None:
+    """実行中はリースを延長し続ける（ワーカーが生きている間は他のワーカーに取られない）"""
+    interval = lease_seconds() / 3
+    while not stop.wait(interval):
+        SummaryJob.objects.filter(pk=job.pk, worker=worker, status=Status.RUNNING).update(
+            lease_expires_at=timezone.now() + timedelta(seconds=lease_seconds()))
+    connection.close()
+
+
+def _finish(job: SummaryJob, worker: str, **fields) -> None:
+    # 自分のリースのままのときだけ書く（途中でリースを失い、別のワーカーが再実行している場合は捨てる）
+    SummaryJob.objects.filter(pk=job.pk, worker=worker, status=Status.RUNNING).update(
+        finished_at=timezone.now(), lease_expires_at=None, **fields)
+
+
+def _execute(job: SummaryJob) -> dict:
+    if job.url:
+        try:
+            raw = extract_article_text(job.url)
+        except Exception as e:
+            raise ItemError(f"記事抽出に失敗: {str(e)}", 400)
+    else:
+        raw = job.text.strip()
+    if not raw:
+        raise ItemError("Missing 'text' or 'url'", 400)
+    return route_and_summarize(raw, target_lang=job.target_lang, length_mode=job.length)
+
+
+def run(job: SummaryJob, worker: str) -> None:
+    """
+    ジョブを 1 件実行し、結果（または失敗）と工程ごとの所要時間を保存する。
+    入力不備・翻訳失敗などの例外はその場で失敗にする（再実行するのはワーカーが落ちた場合だけ）。
+    """
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job, worker, stop), daemon=True).start()
+    with metrics.collect_stages() as stages:
+        try:
+            fields = {"status": Status.DONE, "result": _execute(job)}
+        except ItemError as e:
+            fields = {"status": Status.FAILED, "error": str(e), "error_status": e.status}
+        except TranslationError as e:
+            fields = {"status": Status.FAILED, "error": f"翻訳失敗: {str(e)}", "error_status": 502}
+        except Exception as e:
+            logger.exception("job %s failed", job.pk)
+            fields = {"status": Status.FAILED, "error": str(e), "error_status": 500}
+        finally:
+            stop.set()
+    _finish(job, worker, timings={k: round(v, 4) for k, v in stages.items()}, **fields)
+
+
+def status_counts() -> dict:
+    rows = SummaryJob.objects.values("status").annotate(n=Count("pk"))
+    counts = dict.fromkeys(Status.values, 0)
+    counts.update({row["status"]: row["n"] for row in rows})
+    return counts
+
+
+def collect_metrics() -> list:
+    """metrics.register_collector 用: 状態ごとのジョブ数"""
+    try:
+        counts = status_counts()
+    except Exception:
+        return []   # マイグレーション前など
+    return [("summarizer_jobs", "gauge", {"status": status}, n) for status, n in counts.items()]
+
+
+metrics.register_collector(collect_metrics)
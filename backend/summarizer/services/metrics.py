@@ -0,0 +1,144 @@
+# summarizer/services/metrics.py
+# 役割: 工程ごとの所要時間（span）とカウンタを集計し、Prometheus のテキスト形式で出力する
+#       （プロセス内集計。外部ライブラリには依存しない）
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 所要時間ヒストグラムの境界（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 記事あたりチャンク数など、件数ヒストグラムの境界
+COUNT_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+
+_lock = threading.Lock()
+_counters: dict[tuple, float] = {}
+_histograms: dict[tuple, dict] = {}
+_help: dict[str, tuple[str, str]] = {}
+_collectors = []
+# collect_stages() の間だけ、そのコンテキストで計測した span の秒数を集める辞書
+_stage_totals: ContextVar[dict | None] = ContextVar("summarizer_stage_totals", default=None)
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def describe(name: str, kind: str, text: str) -> None:
+    _help[name] = (kind, text)
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """カウンタを value だけ増やす"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, buckets=BUCKETS, **labels) -> None:
+    """ヒストグラムに 1 件記録する"""
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        for i, le in enumerate(h["buckets"]):
+            if value <= le:
+                h["counts"][i] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """with span("generate", lang="en"): ... の所要時間を summarizer_stage_seconds に記録する"""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t
+        observe("summarizer_stage_seconds", elapsed, stage=stage, **labels)
+        totals = _stage_totals.get()
+        if totals is not None:
+            totals[stage] = totals.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_stages():
+    """
+    with collect_stages() as stages: ... の間に span() で計測した工程ごとの合計秒数を stages に集める。
+    （同じスレッド / タスク内の span だけが対象。マイクロバッチ等の別スレッドで動く工程は含まれない）
+    """
+    stages: dict[str, float] = {}
+    token = _stage_totals.set(stages)
+    try:
+        yield stages
+    finally:
+        _stage_totals.reset(token)
+
+
+def register_collector(fn) -> None:
+    """
+    出力時に呼ばれ、(name, kind, labels, value) のリストを返す関数を登録する。
+    キュー長などその時点の値（gauge）を出すのに使う。
+    """
+    _collectors.append(fn)
+
+
+def _escape(value: str) -> str:
+    """ラベル値のエスケープ（Prometheus のテキスト形式では \\ と " と改行をエスケープする）"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    lines = []
+    emitted = set()
+
+    def header(name: str, default_kind: str):
+        if name in emitted:
+            return
+        emitted.add(name)
+        kind, text = _help.get(name, (default_kind, ""))
+        if text:
+            lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, dict(v, counts=list(v["counts"]))) for k, v in _histograms.items())
+
+    for (name, labels), value in counters:
+        header(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+
+    for (name, labels), h in histograms:
+        header(name, "histogram")
+        for le, count in zip(h["buckets"], h["counts"]):
+            lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', f'{le:g}'),))} {count}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {h['count']}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {h['sum']:.6f}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {h['count']}")
+
+    for fn in _collectors:
+        for name, kind, labels, value in fn():
+            header(name, kind)
+            lines.append(f"{name}{_fmt_labels(tuple(sorted(labels.items())))} {value:g}")
+
+    return "\n".join(lines) + "\n"
+
+
+describe("summarizer_stage_seconds", "histogram", "Time spent in each pipeline stage.")
+describe("summarizer_cache_requests_total", "counter", "Cache lookups by cache and result (hit/miss).")
+describe("summarizer_chunks_per_article", "histogram", "Number of chunks a long article was split into.")
+describe("summarizer_deepl_characters_total", "counter", "Characters sent to the DeepL API.")
+describe("summarizer_deepl_characters_saved_total", "counter", "Characters not sent to DeepL thanks to the translation cache.")
+describe("summarizer_deepl_retries_total", "counter", "DeepL requests retried after a 429/503 response.")
+describe("summarizer_translation_segments", "histogram", "Number of segments a long text was split into for translation.")
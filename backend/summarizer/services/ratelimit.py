@@ -0,0 +1,112 @@
+# summarizer/services/ratelimit.py
+# 役割: 外部 API（DeepL）の呼び出しペースをプロセス全体で揃えるトークンバケットと、リトライ間隔の計算
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+from django.conf import settings
+
+
+class TokenBucket:
+    """
+    rate（単位/秒）で補充され、最大 burst まで貯まるトークンバケット（rate <= 0 なら無制限）。
+    reserve(n) はトークンを先に差し引き（足りなければ負になる）、使えるまでの待ち秒数を返すので、
+    同時に呼んだスレッド・コルーチンは到着順に rate どおりの間隔で並ぶ。
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, n: float = 1) -> float:
+        if self.rate <= 0:
+            return max(0.0, self._paused_until - time.monotonic())
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(n, self.burst)   # burst を超える要求は burst 分として扱う（永久に待たない）
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """サーバーから待てと言われた（429 + Retry-After）とき、以降の呼び出しもまとめて止める"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """リクエスト数と文字数の 2 つのバケットを同時に満たすまで待つ"""
+
+    def __init__(self, requests_per_second: float, chars_per_second: float):
+        self.requests = TokenBucket(requests_per_second, burst=max(requests_per_second, 1))
+        self.chars = TokenBucket(chars_per_second, burst=chars_per_second)
+
+    def _reserve(self, chars: int) -> float:
+        return max(self.requests.reserve(1), self.chars.reserve(chars))
+
+    def acquire(self, chars: int = 0) -> None:
+        wait = self._reserve(chars)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, chars: int = 0) -> None:
+        wait = self._reserve(chars)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        self.requests.pause(seconds)
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Retry-After ヘッダ（秒数 または HTTP 日付）を秒数にする。無い・読めない場合は None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, retry_after: str | None = None, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    attempt 回目（0 始まり）の失敗後に待つ秒数。
+    サーバーの Retry-After があればそれに従い（上限 cap）、無ければ上限付き指数バックオフの full jitter。
+    """
+    hinted = retry_after_seconds(retry_after)
+    if hinted is not None:
+        return min(hinted, cap) + random.uniform(0, base / 2)   # 同時に再開しないよう少しずらす
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """
+    名前ごとのプロセス共有リミッター。
+    上限は SUMMARIZER_<NAME>_REQUESTS_PER_SECOND / SUMMARIZER_<NAME>_CHARS_PER_SECOND（0 で無制限）。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            prefix = f"SUMMARIZER_{name.upper()}"
+            limiter = RateLimiter(
+                getattr(settings, f"{prefix}_REQUESTS_PER_SECOND", 0),
+                getattr(settings, f"{prefix}_CHARS_PER_SECOND", 0),
+            )
+            _limiters[name] = limiter
+        return limiter
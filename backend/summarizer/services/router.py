@@ -1,43 +1,200 @@
 # 入力言語に応じて要約前/後の翻訳ルートを決め、要約を実行する
-from .translation import deepl_translate, TranslationError
+import logging
+
+from . import dedup, metrics
+from .context import RequestContext
+from .translation import (deepl_translate, adeepl_translate, deepl_translate_many, adeepl_translate_many,
+                          TranslationError)
+from .executor import run_inference
 from summarizer.news_summarizer_model import run_summary, infer_lang  # 既存を利用
 
 PIVOT_DEFAULT = "en"   # 既定ピボットは英語
 PIVOT_FOR_KO  = "ja"   # 特例：韓国語は日本語にピボット
 
-def route_and_summarize(raw_text: str, target_lang: str, length_mode: str = "medium") -> dict:
+logger = logging.getLogger(__name__)
+
+
+def plan_route(detected: str) -> str | None:
+    """
+    要約に使う言語を決める。翻訳不要（en/ja）なら None、必要ならピボット先の言語を返す。
+    （ko だけ ja にピボット）
+    """
+    if detected in {"en", "ja"}:
+        return None
+    return PIVOT_FOR_KO if detected == "ko" else PIVOT_DEFAULT
+
+
+def _needs_final_translation(target_lang: str, summary_src: str) -> bool:
+    return bool(target_lang) and target_lang.lower() != summary_src.lower()
+
+
+def parse_target_lang(value, default: str = "ja") -> str | list[str]:
+    """
+    target_lang は言語コード 1 つ（"ja"）か、複数のリスト（["ja", "en"]）。
+    リストは小文字にして重複を除く（順序は保つ）。空なら default。
+    文字列・文字列のリスト以外（数値など）は ValueError（API では 400 にする）。
+    """
+    if isinstance(value, (list, tuple)):
+        if not all(isinstance(v, str) for v in value):
+            raise ValueError("'target_lang' must be a language code or a list of language codes")
+        langs = list(dict.fromkeys(v.strip().lower() for v in value if v.strip()))
+        return langs or default
+    if value is None or value == "":
+        return default
+    if not isinstance(value, str):
+        raise ValueError("'target_lang' must be a language code or a list of language codes")
+    return value.strip().lower() or default
+
+
+def build_context(raw_text: str, target_lang: str = "", length_mode: str = "medium") -> RequestContext:
+    """言語検出とルーティング決定をこのリクエストで 1 回だけ行う"""
+    with metrics.span("detect"):
+        detected = infer_lang(raw_text) or "en"
+    return RequestContext(raw_text, detected, plan_route(detected),
+                          target_lang=target_lang, length_mode=length_mode)
+
+
+def prepare_for_summary(raw_text: str, on_event=None) -> RequestContext:
+    """
+    言語を検出し、必要ならピボット言語に翻訳して要約の入力（ctx.text）を用意する。
+    """
+    return pivot_translate(build_context(raw_text), on_event)
+
+
+def pivot_translate(ctx: RequestContext, on_event=None) -> RequestContext:
+    """ctx のルートに従い、必要なら本文をピボット言語に翻訳して ctx.text に入れる"""
+    if on_event:
+        on_event("route", ctx.route())
+
+    if ctx.pivoted:
+        with metrics.span("pivot_translate"):
+            ctx.text = deepl_translate(ctx.raw_text, src=ctx.detected, tgt=ctx.pivot_lang)
+        logger.debug("Original text translated into %s", ctx.pivot_lang)
+    return ctx
+
+
+def translate_summary(summary_native: str, summary_src: str, target_lang: str) -> str:
+    """最終翻訳（ユーザー指定言語に合わせる）"""
+    if _needs_final_translation(target_lang, summary_src):
+        with metrics.span("final_translate"):
+            return deepl_translate(summary_native, src=summary_src, tgt=target_lang)
+    return summary_native
+
+
+def _split_targets(summary_native: str, summary_src: str, targets: list[str]) -> tuple[dict, list[str]]:
+    """翻訳不要な言語の結果と、翻訳が必要な言語のリスト"""
+    done = {t: summary_native for t in targets if not _needs_final_translation(t, summary_src)}
+    return done, [t for t in targets if t not in done]
+
+
+def final_summary(summary_native: str, summary_src: str, target_lang: str | list[str]) -> dict:
+    """
+    最終翻訳した結果を戻り値の形で返す。
+      target_lang が 1 つ … {"summary": str}
+      リスト          … {"summary": 先頭の言語の要約, "summaries": {言語: 要約}}（翻訳は言語ごとに並列）
+    """
+    if not isinstance(target_lang, list):
+        return {"summary": translate_summary(summary_native, summary_src, target_lang)}
+    summaries, rest = _split_targets(summary_native, summary_src, target_lang)
+    if rest:
+        with metrics.span("final_translate"):
+            summaries.update(deepl_translate_many(summary_native, src=summary_src, tgts=rest))
+    summaries = {t: summaries[t] for t in target_lang}
+    return {"summary": summaries[target_lang[0]], "summaries": summaries}
+
+
+async def afinal_summary(summary_native: str, summary_src: str, target_lang: str | list[str]) -> dict:
+    """final_summary() の非同期版"""
+    targets = target_lang if isinstance(target_lang, list) else [target_lang]
+    summaries, rest = _split_targets(summary_native, summary_src, targets)
+    if rest:
+        with metrics.span("final_translate"):
+            summaries.update(await adeepl_translate_many(summary_native, src=summary_src, tgts=rest))
+    if not isinstance(target_lang, list):
+        return {"summary": summaries[target_lang]}
+    summaries = {t: summaries[t] for t in target_lang}
+    return {"summary": summaries[target_lang[0]], "summaries": summaries}
+
+
+def _near_duplicate(raw_text: str, target_lang: str, length_mode: str):
+    """転載記事など、要約済みの記事とほぼ同じ本文なら (その結果, probe) を返す（無効時は (None, None)）"""
+    if not dedup.enabled():
+        return None, None
+    with metrics.span("near_duplicate"):
+        return dedup.lookup(raw_text, length_mode, target_lang)
+
+
+def route_and_summarize(raw_text: str, target_lang: str | list[str], length_mode: str = "medium",
+                        on_event=None) -> dict:
     """
     戻り値: {"detected": str, "pivoted": bool, "summary_src": str, "summary": str}
+    target_lang がリストなら、要約は 1 回だけ行い、各言語への翻訳を "summaries": {言語: 要約} に入れる
+    （"summary" は先頭の言語）。
+    on_event(name, data) を渡すと、処理の進行に合わせて途中経過を通知する:
+      "route"   … {"detected", "pivoted", "summary_src"}
+      "partial" … {"index", "total", "summary"}（長文のチャンク要約、要約言語のまま）
+    要約済みの記事の近似重複なら、翻訳・推論をせずにその結果を返す。
     """
-    detected = infer_lang(raw_text) or "en"
+    hit, probe = _near_duplicate(raw_text, target_lang, length_mode)
+    if hit is not None:
+        if on_event:
+            on_event("route", {k: hit[k] for k in ("detected", "pivoted", "summary_src")})
+        return dict(hit)
+    result = _route_and_summarize(raw_text, target_lang, length_mode, on_event)
+    dedup.remember(probe, result)
+    return result
 
-    # ルーティング決定（ko だけ ja にピボット）
-    if detected in {"en", "ja"}:
-        text_for_sum = raw_text
-        summary_src  = detected
-        pivoted = False
-    else:
-        pivot_lang = PIVOT_FOR_KO if detected == "ko" else PIVOT_DEFAULT
-        text_for_sum = deepl_translate(raw_text, src=detected, tgt=pivot_lang)
-        print(f"Original text translated into {pivot_lang}")
-        summary_src  = pivot_lang
-        pivoted = True
+
+def _route_and_summarize(raw_text: str, target_lang: str | list[str], length_mode: str, on_event=None) -> dict:
+    ctx = pivot_translate(build_context(raw_text, target_lang, length_mode), on_event)
+    summary_src = ctx.summary_src
 
     # 要約の実行（英/日モデルは news_summarizer_model.py 側で定義済み）
-    summary_native = run_summary(text_for_sum, mode=length_mode, lang_code=summary_src)
+    # 言語は ctx で確定済みなので、要約側では検出し直さない
+    on_partial = None
+    if on_event:
+        on_partial = lambda i, total, s: on_event("partial", {"index": i, "total": total, "summary": s})
+    with metrics.span("summarize", lang=summary_src):
+        summary_native = run_summary(ctx.text, mode=length_mode, lang_code=summary_src,
+                                     on_partial=on_partial)
 
     # デバッグ出力：pivot言語での要約結果を表示
-    print(f"[Pivot Summary - {summary_src}] {summary_native} ...")
-
-    # 最終翻訳（ユーザー指定言語に合わせる）
-    if target_lang and target_lang.lower() != summary_src.lower():
-        summary_out = deepl_translate(summary_native, src=summary_src, tgt=target_lang)
-    else:
-        summary_out = summary_native
+    logger.debug("[Pivot Summary - %s] %s ...", summary_src, summary_native)
 
     return {
-        "detected": detected,   # detected source lang
-        "pivoted": pivoted,     # whether it was pivoted: True/False
+        "detected": ctx.detected,   # detected source lang
+        "pivoted": ctx.pivoted,     # whether it was pivoted: True/False
         "summary_src": summary_src, # lang used for summarization: en/ja
-        "summary": summary_out, # summary result in the designated target lang
+        # summary result in the designated target lang (+ "summaries" for a list of target langs)
+        **final_summary(summary_native, summary_src, target_lang),
+    }
+
+
+async def aroute_and_summarize(raw_text: str, target_lang: str | list[str], length_mode: str = "medium") -> dict:
+    """
+    route_and_summarize() の非同期版（ASGI 用）。
+    翻訳はプール済み HTTP クライアントで await し、推論だけを上限付きのスレッドプールに渡す。
+    """
+    hit, probe = _near_duplicate(raw_text, target_lang, length_mode)
+    if hit is not None:
+        return dict(hit)
+    result = await _aroute_and_summarize(raw_text, target_lang, length_mode)
+    dedup.remember(probe, result)
+    return result
+
+
+async def _aroute_and_summarize(raw_text: str, target_lang: str | list[str], length_mode: str) -> dict:
+    ctx = build_context(raw_text, target_lang, length_mode)
+    if ctx.pivoted:
+        with metrics.span("pivot_translate"):
+            ctx.text = await adeepl_translate(raw_text, src=ctx.detected, tgt=ctx.pivot_lang)
+    summary_src = ctx.summary_src
+
+    summary_native = await run_inference(run_summary, ctx.text, mode=length_mode, lang_code=summary_src)
+
+    return {
+        "detected": ctx.detected,
+        "pivoted": ctx.pivoted,
+        "summary_src": summary_src,
+        **await afinal_summary(summary_native, summary_src, target_lang),
     }
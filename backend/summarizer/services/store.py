@@ -0,0 +1,132 @@
+# summarizer/services/store.py
+# 役割: プロセス内 LRU と、再起動後も残る SQLite の永続キャッシュ（キャッシュ各種の共通部品）
+
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+PRUNE_EVERY = 64   # SqliteStore: この回数の書き込みごとに期限切れ・件数超過の行を消す
+
+
+class LRUCache:
+    """スレッドセーフな件数上限付き LRU（ttl 秒を過ぎた値は無いものとして扱う。0 なら無期限）"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[object, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, stored_at = self._data[key]
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteStore:
+    """
+    key → 文字列値を保存する SQLite テーブル。
+    WAL モードで開くので、同じファイルを複数ワーカープロセスから共有できる。
+      ttl         … この秒数より古い行は無いものとして扱い、いずれ消す（0 なら無期限）
+      max_entries … 行数の上限。超えたら古い行から消す（0 なら無制限）
+      compress    … 値を zlib で圧縮して保存する（同じテーブルでは常に同じ指定で使う）
+    """
+
+    def __init__(self, path, table: str, ttl: float = 0, max_entries: int = 0, compress: bool = False):
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.compress = compress
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        if ttl or max_entries:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_idx ON {table} (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        return zlib.decompress(row[0]).decode() if self.compress else row[0]
+
+    def set(self, key: str, value: str) -> None:
+        stored = zlib.compress(value.encode()) if self.compress else value
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                (key, stored, time.time()),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self) -> None:
+        """期限切れの行と、上限を超えた分の古い行を消す（_lock を持った状態で呼ぶ）"""
+        if self.ttl:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class TieredCache:
+    """1 段目: プロセス内 LRU、2 段目: SQLite（persistent=None なら LRU のみ）"""
+
+    def __init__(self, memory: LRUCache, persistent: SqliteStore | None = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> str | None:
+        value = self.memory.get(key)
+        if value is None and self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            self.persistent.set(key, value)
@@ -1,17 +1,153 @@
 # summarizer/services/summarizers/__init__.py
 # 役割: 言語コード→既定サマライザーの割り当てを一元管理する
+#       モデルは import 時ではなく初回の get_summarizer() でロードする
 
-from .ja.mt5_summarizer import Mt5Summarizer         # 日本語: mt5 を採用
-from .en.bart_summarizer import BartSummarizer       # 英語: 既定は Bart
-# from .en.led_summarizer import LedSummarizer       # LED に切り替えるならこれを使う
+from django.conf import settings
 
-# 既定のインスタンス群（プロセス内で共有）
-_SUMMARIZERS = {
-    "ja": Mt5Summarizer(),
-    "en": BartSummarizer(),   # LED に切り替えるならここを LedSummarizer() に変更
-    # "fr": FrenchBartSummarizer(),  # 将来の追加例
+from .. import metrics
+from .registry import SummarizerRegistry, SummarizerSpec
+
+# 言語コード → バックエンド名 → 実装クラス
+# （est_memory_mb はロード前の見積もり。ロード後は実測値で置き換える。
+#   model_id 以降は実装クラスの属性と同じ値。Web プロセスが torch を import せずにキャッシュキーを作るために持つ）
+_BEAM = {"num_beams": 4, "repetition_penalty": 1.1}
+_BACKENDS = {
+    "ja": {   # 日本語: mt5 を採用
+        "torch": SummarizerSpec("ja.mt5_summarizer", "Mt5Summarizer", est_memory_mb=1300,
+                                model_id="tsmatz/mt5_summarize_japanese", generation_kwargs=_BEAM,
+                                supports_draft=True),
+        "int8":  SummarizerSpec("ja.mt5_optimized", "Mt5Int8Summarizer", est_memory_mb=700,
+                                model_id="tsmatz/mt5_summarize_japanese#int8", generation_kwargs=_BEAM,
+                                supports_draft=True),
+        "onnx":  SummarizerSpec("ja.mt5_optimized", "Mt5OnnxSummarizer", est_memory_mb=600,
+                                model_id="tsmatz/mt5_summarize_japanese#onnx-int8", generation_kwargs=_BEAM),
+        "stub":  SummarizerSpec("stub_summarizer", "StubSummarizer", est_memory_mb=0,
+                                model_id="stub"),   # 負荷試験・CI 用
+    },
+    "en": {   # 英語: 既定は Bart
+        "torch": SummarizerSpec("en.bart_summarizer", "BartSummarizer", est_memory_mb=1700,
+                                model_id="facebook/bart-large-cnn", generation_kwargs=_BEAM,
+                                supports_draft=True),
+        "int8":  SummarizerSpec("en.bart_optimized", "BartInt8Summarizer", est_memory_mb=900,
+                                model_id="facebook/bart-large-cnn#int8", generation_kwargs=_BEAM,
+                                supports_draft=True),
+        "onnx":  SummarizerSpec("en.bart_optimized", "BartOnnxSummarizer", est_memory_mb=800,
+                                model_id="facebook/bart-large-cnn#onnx-int8", generation_kwargs=_BEAM),
+        "stub":  SummarizerSpec("stub_summarizer", "StubSummarizer", est_memory_mb=0,
+                                model_id="stub"),   # 負荷試験・CI 用
+    },
+    # "fr": {"torch": SummarizerSpec("fr.bart_summarizer", "FrenchBartSummarizer", ...)},  # 将来の追加例
+}
+DEFAULT_BACKEND = "torch"
+
+# 言語コード → 長文用の単発モデル
+# 入力トークン数が settings.SUMMARIZER_LONG_DOC_TOKENS の範囲に入るときは、既定モデルの代わりにこちらを使う
+_LONG_DOC_BACKENDS = {
+    "en": SummarizerSpec("en.led_summarizer", "LedSummarizer", est_memory_mb=700,
+                         model_id="pszemraj/led-base-book-summary",
+                         generation_kwargs={"num_beams": 4, "repetition_penalty": 1.15}),
 }
+LONG_DOC_SUFFIX = ":long"   # レジストリ上のキーは "en:long" のようになる
+
+_registry = None
+
+
+def _selected_specs() -> dict:
+    """settings.SUMMARIZER_BACKENDS（例: {"en": "onnx"}）で言語ごとのバックエンドを選ぶ"""
+    chosen = getattr(settings, "SUMMARIZER_BACKENDS", {})
+    specs = {}
+    for lang, backends in _BACKENDS.items():
+        name = chosen.get(lang, DEFAULT_BACKEND)
+        if name not in backends:
+            raise ValueError(f"未対応のバックエンド: {lang}={name}（候補: {', '.join(backends)}）")
+        specs[lang] = backends[name]
+    for lang, spec in _LONG_DOC_BACKENDS.items():
+        specs[lang + LONG_DOC_SUFFIX] = spec
+    return specs
+
+
+def get_registry() -> SummarizerRegistry:
+    global _registry
+    if _registry is None:
+        _registry = SummarizerRegistry(
+            _selected_specs(),
+            budget_mb=getattr(settings, "SUMMARIZER_MEMORY_BUDGET_MB", 0),
+        )
+        metrics.register_collector(_registry.collect_metrics)
+    return _registry
+
+
+def resolve_lang(lang: str) -> str:
+    """未対応の言語コードは 'en' にフォールバックする。"""
+    return lang if lang in _BACKENDS else "en"
+
+
+def lang_of(key: str) -> str:
+    """モデルキー（"en" / "en:long"）から言語コードを取り出す"""
+    return key.split(":", 1)[0]
+
+
+def draft_model_id(lang: str) -> str | None:
+    """settings.SUMMARIZER_DRAFT_MODELS で言語ごとに指定した下書きモデル（未指定なら None）"""
+    return getattr(settings, "SUMMARIZER_DRAFT_MODELS", {}).get(lang) or None
+
+
+def long_doc_range(lang: str) -> tuple[int, int] | None:
+    """長文モデルに切り替える入力トークン数の範囲（対象外の言語・未設定なら None）"""
+    if lang not in _LONG_DOC_BACKENDS:
+        return None
+    return getattr(settings, "SUMMARIZER_LONG_DOC_TOKENS", {}).get(lang)
+
+
+_tokenizers: dict = {}
+
+
+def count_tokens(text: str, lang: str) -> int:
+    """ルーティング判定用のトークン数（長文モデルのトークナイザーだけを読み込んで数える）"""
+    tokenizer = _tokenizers.get(lang)
+    if tokenizer is None:
+        from transformers import AutoTokenizer
+
+        model_id = get_registry().model_id(lang + LONG_DOC_SUFFIX)
+        tokenizer = _tokenizers[lang] = AutoTokenizer.from_pretrained(model_id)
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def model_key(lang: str, text: str | None = None) -> str:
+    """
+    要約に使うモデルのキーを返す。
+    text の入力トークン数が長文モデルの範囲に入れば "<lang>:long"、それ以外は言語コードそのまま。
+    """
+    lang = resolve_lang(lang)
+    bounds = long_doc_range(lang)
+    if bounds is None or text is None:
+        return lang
+    lo, hi = bounds
+    # 1 トークンは 1 文字以上なので、文字数が下限未満なら数えるまでもない
+    if len(text) < lo:
+        return lang
+    n = count_tokens(text, lang)
+    return lang + LONG_DOC_SUFFIX if lo <= n <= hi else lang
+
+
+def get_summarizer(lang: str, text: str | None = None):
+    """
+    言語コードに対応するサマライザーを返す（初回呼び出し時にロード）。
+    text を渡すと入力長で既定モデル / 長文モデルを選ぶ。モデルキー（"en:long"）も直接受け付ける。
+    """
+    key = lang if LONG_DOC_SUFFIX in lang else model_key(lang, text)
+    return get_registry().get(key)
+
+
+def preload_keys(langs=("en", "ja")) -> list[str]:
+    """推論ワーカーを fork する前に読み込むモデルキー（長文モデルの範囲を設定した言語は "<lang>:long" も含める）"""
+    keys = list(langs)
+    keys += [lang + LONG_DOC_SUFFIX for lang in langs if long_doc_range(lang)]
+    return keys
+
 
-def get_summarizer(lang: str):
-    """言語コードに対応するサマライザーを返す。未対応は 'en' にフォールバックする。"""
-    return _SUMMARIZERS.get(lang, _SUMMARIZERS["en"])
+def warmup(langs=None) -> None:
+    """起動直後に先読みしておく言語（既定は settings.SUMMARIZER_WARMUP）"""
+    if langs is None:
+        langs = getattr(settings, "SUMMARIZER_WARMUP", [])
+    get_registry().warmup(langs)
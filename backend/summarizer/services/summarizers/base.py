@@ -1,15 +1,46 @@
 # summarizer/services/summarizers/base.py
+import logging
 from abc import ABC, abstractmethod
 
+logger = logging.getLogger(__name__)
+
 class BaseSummarizer(ABC):
+    model_id: str = ""   # キャッシュキーやログに使うモデル識別子
+    generation_kwargs: dict = {}  # dynamic_params() 以外で generate に渡す固定パラメータ
+    supports_draft: bool = False  # 下書きモデル（assisted decoding）を使える実装か（ロード前の判定用）
+
     @abstractmethod
     def summarize(self, text: str, **kwargs) -> str:
         """各モデルで必ず実装するインターフェース"""
         pass
 
+    def summarize_batch(self, items: list[tuple[str, str]], lang_code: str | None = None) -> list[str]:
+        """
+        (text, mode) のリストをまとめて要約する。
+        既定は 1 件ずつ summarize() を呼ぶだけなので、バッチ生成できる実装は上書きする。
+        """
+        return [self.summarize(text, mode=mode, lang_code=lang_code) for text, mode in items]
+
     def log_summary_info(self, lang: str, mode: str, n_in: int,
                          min_new: int, max_new: int) -> None:
         """サマライザー共通のログ出力"""
-        print(f"Summarizing with {lang} ...\n")
-        print(f"Applied mode: {mode}")
-        print(f"input token: {n_in} -> min_new_tokens:{min_new}/max_new_tokens:{max_new}")
+        logger.debug("Summarizing with %s (mode=%s): input token: %d -> min_new_tokens:%d/max_new_tokens:%d",
+                     lang, mode, n_in, min_new, max_new)
+
+    def needs_chunking(self, text: str) -> bool:
+        """
+        1 回の generate に収まらず、分割要約などで複数回生成する入力か（トークナイズしない安価な見積もり）。
+        そうした入力はマイクロバッチを通さない（同じモデルの短いリクエストを長く待たせないため）。
+        """
+        return False
+
+    def memory_mb(self) -> float:
+        """ロード済みモデルのパラメータが占めるメモリ量（MB）。不明なら 0。"""
+        model = getattr(self, "model", None)
+        if model is None and hasattr(self, "summarizer"):
+            model = getattr(self.summarizer, "model", None)
+        if model is None or not hasattr(model, "parameters"):
+            return 0
+        models = [model, getattr(self, "draft_model", None)]   # assisted decoding の下書きモデルも含める
+        n_bytes = sum(p.numel() * p.element_size() for m in models if m is not None for p in m.parameters())
+        return n_bytes / (1024 * 1024)
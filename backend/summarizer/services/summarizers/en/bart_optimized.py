@@ -0,0 +1,28 @@
+# summarizer/services/summarizers/en/bart_optimized.py
+# 役割: 英語サマライザー（Bart）の CPU 軽量版。分割・バッチ処理は BartSummarizer をそのまま使う
+
+from .bart_summarizer import BartSummarizer
+from ..optimized import onnx_memory_mb, onnx_pipeline, quantized_memory_mb, quantized_pipeline
+
+
+class BartInt8Summarizer(BartSummarizer):
+    """PyTorch 動的 int8 量子化版（追加の成果物は不要）"""
+    model_id = BartSummarizer.model_id + "#int8"
+
+    def _build_pipeline(self):
+        return quantized_pipeline(BartSummarizer.model_id)
+
+    def memory_mb(self) -> float:
+        return quantized_memory_mb(self.summarizer.model, self.draft_model)
+
+
+class BartOnnxSummarizer(BartSummarizer):
+    """ONNX Runtime 版（scripts/build_optimized_models.py で作成した int8 ONNX を使う）"""
+    model_id = BartSummarizer.model_id + "#onnx-int8"
+    supports_draft = False   # ONNX Runtime のモデルでは assisted decoding を使えない
+
+    def _build_pipeline(self):
+        return onnx_pipeline(BartSummarizer.model_id)
+
+    def memory_mb(self) -> float:
+        return onnx_memory_mb(BartSummarizer.model_id)
@@ -1,82 +1,268 @@
 # summarizer/services/summarizers/en/bart_summarizer.py
 # 役割: 英語の既定サマライザー（Bart, 長文は分割対応版）
 
+import logging
+from bisect import bisect_right
+
+from django.conf import settings
 from transformers import pipeline
 from ..base import BaseSummarizer
-from ...utils import clean_summary, infer_lang, dynamic_params
+from ..generation import draft_model_id, generate_batch_ids, length_buckets, load_draft_model, shared_params_key
+from ... import chunk_cache, metrics
+from ...extractive import compress
+from ...utils import clean_summary, dynamic_params
+
+logger = logging.getLogger(__name__)
 
 
 class BartSummarizer(BaseSummarizer):
+    model_id = "facebook/bart-large-cnn"
+    generation_kwargs = {"num_beams": 4, "repetition_penalty": 1.1}
+    supports_draft = True
+
     def __init__(self):
-        self.summarizer = pipeline(
-            "summarization",
-            model="facebook/bart-large-cnn",
-            tokenizer="facebook/bart-large-cnn",
-        )
+        self.summarizer = self._build_pipeline()
+        # SUMMARIZER_DRAFT_MODELS で下書きモデルを指定すると assisted decoding で生成する（無ければ None）
+        self.draft_model = load_draft_model("en", self.summarizer.model)
         self.max_input_tokens = 1000  # 安全のため 1024 より少し下げる
         self.window_chars = 80        # 文末探索の許容範囲（文字数単位）
+        self.max_chars_per_token = 6  # needs_chunking() の文字数判定に使う 1 トークンあたりの文字数の上限の目安
+        # 段落の切れ目を優先して探す範囲（窓の末尾からのトークン数）。段落で切っておくと、
+        # 記事の途中が編集されても後続のチャンク境界が変わりにくく、チャンク要約のキャッシュが効く
+        self.paragraph_window_tokens = 250
+        self.batch_size = getattr(settings, "SUMMARIZER_BART_BATCH_SIZE", 4)  # map 段で同時に generate するチャンク数
+        # reduce 段: 1 回にまとめる部分要約の最大数（0 ならトークン数の上限だけで区切る）と最大段数
+        self.reduce_fan_in = getattr(settings, "SUMMARIZER_REDUCE_FAN_IN", 8)
+        self.reduce_max_depth = getattr(settings, "SUMMARIZER_REDUCE_MAX_DEPTH", 4)
+        # 窓の何倍までの入力を、抽出で窓に収めて 1 回で要約するか（0 なら常に分割要約）
+        self.extractive_max_ratio = getattr(settings, "SUMMARIZER_EXTRACTIVE_MAX_RATIO", 3.0)
+
+    def _build_pipeline(self):
+        """モデルの読み込み（量子化版・ONNX 版はここを差し替える）"""
+        return pipeline(
+            "summarization",
+            model=self.model_id,
+            tokenizer=self.model_id,
+        )
+
+    def _tokenize(self, text: str) -> tuple[list[int], list[tuple[int, int]]]:
+        """本文を 1 回だけトークナイズし、ID 列と各トークンの文字オフセットを返す"""
+        with metrics.span("tokenize", lang="en"):
+            enc = self.summarizer.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return enc["input_ids"], enc["offset_mapping"]
 
-    def _smart_split(self, text: str):
+    def _count_tokens(self, sentences: list[str]) -> list[int]:
+        enc = self.summarizer.tokenizer(sentences, add_special_tokens=False)
+        return [len(ids) for ids in enc["input_ids"]]
+
+    def needs_chunking(self, text: str) -> bool:
+        # トークナイズせず文字数だけで判定する（summarize() で改めてトークナイズするため）。
+        # 英語の BPE は 1 トークンあたり高々 6 文字程度なので、これを超える長さならほぼ確実に窓に収まらない
+        return len(text) > self.max_input_tokens * self.max_chars_per_token
+
+    def _smart_split(self, text: str, ids: list[int] | None = None,
+                     offsets: list[tuple[int, int]] | None = None) -> list[tuple[list[int], str]]:
         """
-        長文を BART の許容長以下に分割。
+        長文を BART の許容長以下に分割し、(ID 列, チャンク本文) のリストを返す。
         なるべく文の途中で切らない（.優先, なければ,）。
+        文末の探索はトークンの文字オフセット上で行い、decode → 再 encode はしない。
         """
-        tokens = self.summarizer.tokenizer.encode(text, add_special_tokens=False)
+        if ids is None or offsets is None:
+            ids, offsets = self._tokenize(text)
+        ends = [e for _, e in offsets]
         chunks = []
         start = 0
-        while start < len(tokens):
-            end = min(start + self.max_input_tokens, len(tokens))
-            sub_text = self.summarizer.tokenizer.decode(tokens[start:end])
+        while start < len(ids):
+            end = min(start + self.max_input_tokens, len(ids))
+            if end < len(ids):
+                hi = offsets[end - 1][1]
+                # 段落の切れ目（改行）を探し、無ければ "." 、それも無ければ "," の位置を探す
+                cut_char = text.rfind("\n", offsets[max(start, end - self.paragraph_window_tokens)][0], hi)
+                lo = max(offsets[start][0], hi - self.window_chars)
+                if cut_char == -1:
+                    cut_char = text.rfind(".", lo, hi)
+                if cut_char == -1:
+                    cut_char = text.rfind(",", lo, hi)
+                if cut_char != -1:
+                    # 区切り文字までを含むトークンの直後で切る
+                    cut = bisect_right(ends, cut_char + 1, start, end)
+                    if cut > start:
+                        end = cut
 
-            # "." の位置を探す
-            cut_idx = sub_text.rfind(".")
-            if cut_idx == -1 or (len(sub_text) - cut_idx) > self.window_chars:
-                # "," の位置を探す
-                cut_idx = sub_text.rfind(",")
+            chunks.append((ids[start:end], text[offsets[start][0]:offsets[end - 1][1]]))
+            start = end
 
-            if cut_idx == -1 or (len(sub_text) - cut_idx) > self.window_chars:
-                cut_idx = len(sub_text)
-
-            chunk = sub_text[: cut_idx + 1]
-            chunks.append(chunk)
+        return chunks
 
-            # 次の開始位置を更新
-            start = start + len(self.summarizer.tokenizer.encode(chunk, add_special_tokens=False))
+    def _summarize_chunk(self, text: str, mode: str, lang: str, memo: bool = False):
+        ids, _ = self._tokenize(text)
+        return self._summarize_chunks([(ids, text)], mode, lang, memo=memo)[0]
 
-        return chunks
+    def _memo_key(self, text: str, params: dict, lang: str) -> str:
+        draft = draft_model_id(lang) if self.draft_model is not None else None
+        return chunk_cache.chunk_key(text, params, lang, self.model_id, self.generation_kwargs, draft)
 
-    def _summarize_chunk(self, text: str, mode: str, lang: str):
-        n_in = len(self.summarizer.tokenizer.encode(text, add_special_tokens=False))
-        params = dynamic_params(n_in, mode, lang_code=lang, text=text)
+    def _summarize_chunks(self, chunks: list[tuple[list[int], str]], mode: str | list[str],
+                          lang: str, on_result=None, memo: bool = False) -> list[str]:
+        """
+        (ID 列, 本文) のチャンクを長さ順のバケットに分け、バケットごとに 1 回の generate で要約する。
+        min/max_new_tokens はチャンクごとに dynamic_params() で算出した値を適用する。
+        mode はチャンク共通の文字列か、チャンクごとのリストを受け付ける。
+        on_result(i, summary) を渡すと、バッチが終わるたびに各チャンクの要約を通知する。
+        memo=True なら、同じ本文・生成パラメータのチャンクは以前の要約を使い、残りだけを generate する。
+        """
+        tokenizer = self.summarizer.tokenizer
+        modes = [mode] * len(chunks) if isinstance(mode, str) else mode
+        lengths, params_list = [], []
+        for (ids, text), mode in zip(chunks, modes):
+            n_in = len(ids)
+            params = dynamic_params(n_in, mode, lang_code=lang, text=text)
+            logger.debug("[Chunk] input=%d, min_new=%d, max_new=%d",
+                         n_in, params["min_new_tokens"], params["max_new_tokens"])
+            lengths.append(n_in)
+            params_list.append(params)
 
-        print(f"[Chunk] input={n_in}, min_new={params['min_new_tokens']}, max_new={params['max_new_tokens']}")
+        results = [""] * len(chunks)
+        todo = list(range(len(chunks)))
+        memo_keys = []
+        if memo:
+            memo_keys = [self._memo_key(text, p, lang) for (_, text), p in zip(chunks, params_list)]
+            todo = []
+            for i, key in enumerate(memo_keys):
+                hit = chunk_cache.lookup(key)
+                if hit is None:
+                    todo.append(i)
+                    continue
+                results[i] = hit
+                if on_result:
+                    on_result(i, hit)
+            logger.debug("[Chunk memo] %d/%d chunks reused", len(chunks) - len(todo), len(chunks))
 
-        out = self.summarizer(
-            text,
-            do_sample=False,
-            num_beams=4,
-            truncation=True,
-            repetition_penalty=1.1,
-            **params,
-        )
-        return clean_summary(out[0]["summary_text"])
+        keys = [shared_params_key(params_list[i]) for i in todo]
+        for bucket in length_buckets([lengths[i] for i in todo], self.batch_size, keys):
+            idxs = [todo[j] for j in bucket]
+            with metrics.span("generate", lang=lang, model=self.model_id):
+                outs = generate_batch_ids(
+                    self.summarizer.model,
+                    tokenizer,
+                    [chunks[i][0] for i in idxs],
+                    [params_list[i] for i in idxs],
+                    max_input_tokens=tokenizer.model_max_length,
+                    assistant_model=self.draft_model,
+                    **self.generation_kwargs,
+                )
+            for i, out in zip(idxs, outs):
+                results[i] = clean_summary(out)
+                if memo:
+                    chunk_cache.store(memo_keys[i], results[i])
+                if on_result:
+                    on_result(i, results[i])
+        return results
 
-    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None) -> str:
+    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None,
+                  on_partial=None) -> str:
+        """on_partial(index, total, summary) を渡すと、長文の各チャンク要約を出来た順に通知する。"""
         lang = lang_code or "en"
-        n_in = len(self.summarizer.tokenizer.encode(text, add_special_tokens=False))
+        ids, offsets = self._tokenize(text)
+        return self._summarize_tokenized(text, ids, offsets, mode, lang, on_partial)
+
+    def _summarize_tokenized(self, text: str, ids: list[int], offsets: list[tuple[int, int]],
+                             mode: str, lang: str, on_partial=None) -> str:
+        n_in = len(ids)
 
         if n_in <= self.max_input_tokens:
             # ログ出力
             params = dynamic_params(n_in, mode, lang_code=lang, text=text)
             self.log_summary_info(lang, mode, n_in,
                                 params["min_new_tokens"], params["max_new_tokens"])
-            return self._summarize_chunk(text, mode, lang)
-        
+            return self._summarize_chunks([(ids, text)], mode, lang)[0]
+
+        elif n_in <= self.extractive_max_ratio * self.max_input_tokens:
+            # 窓の数倍程度の記事は、重要な文だけを残して窓に収め、分割せず 1 回で要約する
+            with metrics.span("extractive", lang=lang):
+                text = compress(text, lang, self.max_input_tokens, self._count_tokens)
+            ids, _ = self._tokenize(text)
+            params = dynamic_params(len(ids), mode, lang_code=lang, text=text)
+            self.log_summary_info(lang, mode, len(ids),
+                                params["min_new_tokens"], params["max_new_tokens"])
+            # 更新された記事でも残す文が前回と同じなら、前回の要約を使う（キーは抽出後の本文）
+            return self._summarize_chunks([(ids, text)], mode, lang, memo=True)[0]
+
         else:
             # 1. チャンクごとに要約
-            chunks = self._smart_split(text)
-            partial_summaries = [self._summarize_chunk(ch, mode, lang) for ch in chunks]
+            with metrics.span("chunk", lang=lang):
+                chunks = self._smart_split(text, ids, offsets)
+            metrics.observe("summarizer_chunks_per_article", len(chunks), buckets=metrics.COUNT_BUCKETS)
+            on_result = (lambda i, summary: on_partial(i, len(chunks), summary)) if on_partial else None
+            # 更新された記事の再要約では、変わっていないチャンクは前回の要約を使う
+            partial_summaries = self._summarize_chunks(chunks, mode, lang, on_result, memo=True)
+
+            # 2. 部分要約を段階的にまとめて再要約（shortモードでまとめ）
+            return self._reduce(partial_summaries, lang)
+
+    def _reduce_windows(self, lengths: list[int]) -> list[list[int]]:
+        """
+        部分要約（トークン数 lengths）を先頭から順に、max_input_tokens と reduce_fan_in に
+        収まる窓へまとめる。1 件で上限を超えるものは単独の窓にする（generate 側で切り詰め）。
+        """
+        windows, cur, total = [], [], 0
+        for i, n in enumerate(lengths):
+            n += 1  # 結合時の空白ぶん
+            full = self.reduce_fan_in and len(cur) >= self.reduce_fan_in
+            if cur and (total + n > self.max_input_tokens or full):
+                windows.append(cur)
+                cur, total = [], 0
+            cur.append(i)
+            total += n
+        if cur:
+            windows.append(cur)
+        return windows
+
+    def _reduce(self, summaries: list[str], lang: str) -> str:
+        """
+        部分要約を 1 つになるまで段ごとに再要約する（階層的 reduce）。
+        各段は窓ごとの入力を max_input_tokens 以内に保ち、_summarize_chunks() でバッチ実行するため、
+        記事がどれだけ長くても 1 回の generate の入力長とメモリは一定に収まる。
+        reduce_max_depth 段目では残りをまとめて 1 回で要約する（入力上限を超えた分は切り詰め）。
+        """
+        depth = 0
+        while True:
+            depth += 1
+            lengths = [len(self._tokenize(s)[0]) for s in summaries]
+            windows = self._reduce_windows(lengths)
+            if len(windows) == 1 or depth >= self.reduce_max_depth:
+                if len(windows) > 1:
+                    logger.warning("reduce depth limit (%d) reached with %d windows; input will be truncated",
+                                   self.reduce_max_depth, len(windows))
+                with metrics.span("reduce", lang=lang):
+                    return self._summarize_chunk(" ".join(summaries), "short", lang, memo=True)
+
+            logger.debug("[Reduce] level=%d, inputs=%d, windows=%d", depth, len(summaries), len(windows))
+            with metrics.span("reduce", lang=lang):
+                groups = []
+                for idxs in windows:
+                    combined = " ".join(summaries[i] for i in idxs)
+                    groups.append((self._tokenize(combined)[0], combined))
+                summaries = self._summarize_chunks(groups, "short", lang, memo=True)
+
+    def summarize_batch(self, items: list[tuple[str, str]], lang_code: str | None = None) -> list[str]:
+        """
+        複数リクエストの (text, mode) をまとめて要約する。
+        1 チャンクに収まる入力は 1 回の generate にまとめ、長文は従来どおり分割要約する。
+        """
+        lang = lang_code or "en"
+        results = [""] * len(items)
+        short_idxs, short_chunks = [], []
+        for i, (text, mode) in enumerate(items):
+            ids, offsets = self._tokenize(text)
+            if len(ids) <= self.max_input_tokens:
+                short_idxs.append(i)
+                short_chunks.append((ids, text))
+            else:
+                results[i] = self._summarize_tokenized(text, ids, offsets, mode, lang)
 
-            # 2. 部分要約を結合して再要約（shortモードでまとめ）
-            combined = " ".join(partial_summaries)
-            return self._summarize_chunk(combined, "short", lang)
+        if short_idxs:
+            outs = self._summarize_chunks(short_chunks, [items[i][1] for i in short_idxs], lang)
+            for i, out in zip(short_idxs, outs):
+                results[i] = out
+        return results
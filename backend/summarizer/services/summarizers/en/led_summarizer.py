@@ -1,35 +1,48 @@
-# summarizer/services/summarizers/led_summarizer.py
-from transformers import LEDForConditionalGeneration, LEDTokenizerFast
+# summarizer/services/summarizers/en/led_summarizer.py
+# 役割: 英語の長文用サマライザー（LED, 最大 16k トークンを分割せず 1 回で要約）
+
 import torch
-from .base import BaseSummarizer
-from ..utils import clean_summary
+from transformers import LEDForConditionalGeneration, LEDTokenizerFast
+from ..base import BaseSummarizer
+from ... import metrics
+from ...utils import clean_summary, dynamic_params
+
+
+class LedSummarizer(BaseSummarizer):
+    # 要約用に fine-tune 済みの LED（allenai/led-base-16384 は事前学習のみで、そのままでは要約にならない）
+    model_id = "pszemraj/led-base-book-summary"
+    generation_kwargs = {"num_beams": 4, "repetition_penalty": 1.15}
 
-class LEDSummarizer(BaseSummarizer):
     def __init__(self):
-        self.model = LEDForConditionalGeneration.from_pretrained("allenai/led-base-16384")
-        self.tokenizer = LEDTokenizerFast.from_pretrained("allenai/led-base-16384")
+        self.model = LEDForConditionalGeneration.from_pretrained(self.model_id)
+        self.model.eval()
+        self.tokenizer = LEDTokenizerFast.from_pretrained(self.model_id)
+        self.max_input_tokens = 16384
+
+    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None,
+                  on_partial=None) -> str:
+        # 分割せず 1 回で要約するため、on_partial で通知する途中結果は無い
+        lang = lang_code or "en"
+        with metrics.span("tokenize", lang=lang):
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True,
+                                    max_length=self.max_input_tokens)
+        n_in = inputs["input_ids"].shape[-1]
+        params = dynamic_params(n_in, mode, lang_code=lang, text=text)
 
-    def summarize(self, text: str, min_new_tokens=120, max_new_tokens=320,
-                  no_repeat_ngram_size=4, length_penalty=1.05, repetition_penalty=1.15,
-                  num_beams=4) -> str:
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, max_length=16384)
-        global_attention_mask = torch.zeros_like(inputs["attention_mask"])
-        global_attention_mask[:, 0] = 1
-        
         # ログ出力（BaseSummarizer共通メソッド）
         self.log_summary_info(lang, mode, n_in,
-                        params["min_new_tokens"], params["max_new_tokens"])
-
-
-        summary_ids = self.model.generate(
-            inputs["input_ids"],
-            attention_mask=inputs["attention_mask"],
-            global_attention_mask=global_attention_mask,
-            min_new_tokens=min_new_tokens,
-            max_new_tokens=max_new_tokens,
-            num_beams=num_beams,
-            no_repeat_ngram_size=no_repeat_ngram_size,
-            length_penalty=length_penalty,
-            repetition_penalty=repetition_penalty,
-        )
+                              params["min_new_tokens"], params["max_new_tokens"])
+
+        # 先頭トークン（<s>）だけ global attention にする
+        global_attention_mask = torch.zeros_like(inputs["attention_mask"])
+        global_attention_mask[:, 0] = 1
+
+        with metrics.span("generate", lang=lang, model=self.model_id), torch.no_grad():
+            summary_ids = self.model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                global_attention_mask=global_attention_mask,
+                **params,
+                **self.generation_kwargs,
+            )
         return clean_summary(self.tokenizer.decode(summary_ids[0], skip_special_tokens=True))
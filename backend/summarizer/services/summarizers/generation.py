@@ -0,0 +1,179 @@
+# summarizer/services/summarizers/generation.py
+# 役割: 複数入力をまとめて generate する際の共通部品（行ごとの出力長制御、長さ別バケット化）
+
+import logging
+
+import torch
+from transformers import AutoModelForSeq2SeqLM, LogitsProcessor, LogitsProcessorList
+
+from . import draft_model_id
+
+logger = logging.getLogger(__name__)
+
+
+class PerRowLengthLogitsProcessor(LogitsProcessor):
+    """
+    generate() の min/max_new_tokens はバッチ全体で共通になるため、
+    バッチ内の各行に個別の min/max_new_tokens を適用する。
+      - min 未満: EOS を禁止
+      - max 到達: EOS を強制
+    ビームサーチ時は input_ids が (batch * num_beams, len) で並ぶ前提。
+    """
+
+    def __init__(self, min_new: list[int], max_new: list[int], eos_token_id: int, num_beams: int = 1):
+        self.min_new = torch.tensor(min_new).repeat_interleave(num_beams)
+        self.max_new = torch.tensor(max_new).repeat_interleave(num_beams)
+        self.eos_token_id = eos_token_id
+        self._start_len = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if self._start_len is None:
+            self._start_len = input_ids.shape[-1]
+        n_new = input_ids.shape[-1] - self._start_len
+
+        too_short = self.min_new.to(scores.device) > n_new
+        scores[too_short, self.eos_token_id] = -float("inf")
+
+        too_long = self.max_new.to(scores.device) <= n_new + 1
+        if too_long.any():
+            scores[too_long] = -float("inf")
+            scores[too_long, self.eos_token_id] = 0
+        return scores
+
+
+def length_buckets(lengths: list[int], batch_size: int, keys: list | None = None) -> list[list[int]]:
+    """
+    長さ順に並べた添字を batch_size ごとに区切る（パディングの無駄を減らす）。
+    keys を渡した場合は、同じキー（バッチ共通にしかできない生成パラメータ）同士だけを同じバッチにする。
+    """
+    keys = keys or [None] * len(lengths)
+    groups: dict = {}
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        groups.setdefault(keys[i], []).append(i)
+    step = max(1, batch_size)
+    return [idxs[i:i + step] for idxs in groups.values() for i in range(0, len(idxs), step)]
+
+
+def shared_params_key(params: dict) -> tuple:
+    """generate_batch() でバッチ共通になる生成パラメータ"""
+    return (params["length_penalty"], params["no_repeat_ngram_size"])
+
+
+def generate_batch(model, tokenizer, texts: list[str], params_list: list[dict],
+                   max_input_tokens: int, num_beams: int = 4, **gen_kwargs) -> list[str]:
+    """
+    texts を 1 回の generate でまとめて要約する。
+    params_list は各テキストの dynamic_params() の結果で、
+    min/max_new_tokens は行ごと、length_penalty / no_repeat_ngram_size はバッチ共通（先頭の値）とする。
+    assistant_model（load_draft_model() の戻り値）を渡すと、ビームサーチの代わりに assisted decoding で生成する。
+    """
+    enc = tokenizer(texts, padding=True, truncation=True, max_length=max_input_tokens,
+                    return_tensors="pt")
+    return _generate(model, tokenizer, enc, params_list, num_beams, **gen_kwargs)
+
+
+def special_tokens(tokenizer) -> tuple[list[int], list[int]]:
+    """
+    1 文の入力の前後に付く特殊トークン（BART なら <s> と </s>、T5 系なら </s> だけ）。
+    transformers 5 系のトークナイザーには build_inputs_with_special_tokens が無いので、短い文字列で調べる。
+    """
+    with_special = tokenizer("a")["input_ids"]
+    body = tokenizer("a", add_special_tokens=False)["input_ids"]
+    for i in range(len(with_special) - len(body) + 1):
+        if with_special[i:i + len(body)] == body:
+            return with_special[:i], with_special[i + len(body):]
+    return [], []
+
+
+def generate_batch_ids(model, tokenizer, ids_list: list[list[int]], params_list: list[dict],
+                       max_input_tokens: int, num_beams: int = 4, **gen_kwargs) -> list[str]:
+    """
+    generate_batch() のトークン ID 版。
+    分割時に得た ID 列（特殊トークンなし）をそのまま使い、テキストへの再トークナイズを省く。
+    """
+    prefix, suffix = special_tokens(tokenizer)
+    n_body = max_input_tokens - len(prefix) - len(suffix)
+    rows = [prefix + ids[:n_body] + suffix for ids in ids_list]
+    enc = tokenizer.pad({"input_ids": rows}, padding=True, return_tensors="pt")
+    return _generate(model, tokenizer, enc, params_list, num_beams, **gen_kwargs)
+
+
+def load_draft_model(lang: str, model):
+    """
+    assisted decoding 用の下書きモデルを読み込む。
+    未指定・読み込み失敗・語彙が本体と合わない・本体が PyTorch モデルでない（ONNX 等）場合は None を返し、
+    通常のビームサーチで生成する。
+    """
+    model_id = draft_model_id(lang)
+    if model_id is None:
+        return None
+    if not isinstance(model, torch.nn.Module):
+        logger.warning("draft model '%s' ignored: assisted decoding needs a PyTorch main model", model_id)
+        return None
+    try:
+        draft = AutoModelForSeq2SeqLM.from_pretrained(model_id)
+    except Exception as e:
+        logger.warning("draft model '%s' unavailable (%s); using beam search", model_id, e)
+        return None
+    if draft.config.vocab_size != model.config.vocab_size:
+        logger.warning("draft model '%s' ignored: vocabulary does not match the main model", model_id)
+        return None
+    draft.eval()
+    logger.info("assisted decoding enabled for %s with draft model '%s'", lang, model_id)
+    return draft
+
+
+def _generate_assisted(model, tokenizer, enc, params_list: list[dict], assistant_model,
+                       repetition_penalty: float | None = None, **_) -> list[str]:
+    """
+    下書きモデルで先読みしたトークンを本体が検証する assisted decoding（貪欲法）。
+    transformers の制約でバッチサイズ 1 しか扱えないため、1 行ずつ生成する。
+    """
+    outs = []
+    with torch.no_grad():
+        for i, params in enumerate(params_list):
+            mask = enc["attention_mask"][i].bool()
+            out_ids = model.generate(
+                input_ids=enc["input_ids"][i][mask].unsqueeze(0),
+                assistant_model=assistant_model,
+                do_sample=False,
+                num_beams=1,
+                min_length=0,   # チェックポイントの generation_config.min_length を無効にする
+                min_new_tokens=params["min_new_tokens"],
+                max_new_tokens=params["max_new_tokens"],
+                no_repeat_ngram_size=params["no_repeat_ngram_size"],
+                repetition_penalty=repetition_penalty,
+            )
+            outs.append(tokenizer.decode(out_ids[0], skip_special_tokens=True))
+    return outs
+
+
+def _generate(model, tokenizer, enc, params_list: list[dict], num_beams: int,
+              assistant_model=None, **gen_kwargs) -> list[str]:
+    enc = {k: v.to(model.device) for k, v in enc.items()}
+    if assistant_model is not None:
+        try:
+            return _generate_assisted(model, tokenizer, enc, params_list, assistant_model, **gen_kwargs)
+        except Exception as e:
+            # transformers の版や設定の組み合わせで未対応の場合は、通常のビームサーチでやり直す
+            logger.warning("assisted decoding failed (%s); falling back to beam search", e)
+    min_new = [p["min_new_tokens"] for p in params_list]
+    max_new = [p["max_new_tokens"] for p in params_list]
+    processor = PerRowLengthLogitsProcessor(min_new, max_new, tokenizer.eos_token_id, num_beams)
+
+    with torch.no_grad():
+        out_ids = model.generate(
+            **enc,
+            do_sample=False,
+            num_beams=num_beams,
+            # チェックポイントの generation_config.min_length（bart-large-cnn は 56）が残ると、
+            # それより短い max_new の行が EOS を強制されて文の途中で切れる。長さは processor で行ごとに制御する
+            min_length=0,
+            min_new_tokens=min(min_new),
+            max_new_tokens=max(max_new),
+            length_penalty=params_list[0]["length_penalty"],
+            no_repeat_ngram_size=params_list[0]["no_repeat_ngram_size"],
+            logits_processor=LogitsProcessorList([processor]),
+            **gen_kwargs,
+        )
+    return tokenizer.batch_decode(out_ids, skip_special_tokens=True)
@@ -0,0 +1,28 @@
+# summarizer/services/summarizers/ja/mt5_optimized.py
+# 役割: 日本語サマライザー（mt5）の CPU 軽量版。要約処理は Mt5Summarizer をそのまま使う
+
+from .mt5_summarizer import Mt5Summarizer
+from ..optimized import onnx_memory_mb, onnx_pipeline, quantized_memory_mb, quantized_pipeline
+
+
+class Mt5Int8Summarizer(Mt5Summarizer):
+    """PyTorch 動的 int8 量子化版（追加の成果物は不要）"""
+    model_id = Mt5Summarizer.model_id + "#int8"
+
+    def _build_pipeline(self):
+        return quantized_pipeline(Mt5Summarizer.model_id)
+
+    def memory_mb(self) -> float:
+        return quantized_memory_mb(self.summarizer.model, self.draft_model)
+
+
+class Mt5OnnxSummarizer(Mt5Summarizer):
+    """ONNX Runtime 版（scripts/build_optimized_models.py で作成した int8 ONNX を使う）"""
+    model_id = Mt5Summarizer.model_id + "#onnx-int8"
+    supports_draft = False   # ONNX Runtime のモデルでは assisted decoding を使えない
+
+    def _build_pipeline(self):
+        return onnx_pipeline(Mt5Summarizer.model_id)
+
+    def memory_mb(self) -> float:
+        return onnx_memory_mb(Mt5Summarizer.model_id)
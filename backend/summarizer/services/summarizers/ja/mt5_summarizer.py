@@ -1,33 +1,103 @@
 # summarizer/services/summarizers/ja/mt5_summarizer.py
 # 役割: 日本語の既定サマライザー（mt5）を提供する
 
+from django.conf import settings
 from transformers import pipeline
 from ..base import BaseSummarizer
-from ...utils import clean_summary, infer_lang, dynamic_params
+from ..generation import draft_model_id, generate_batch, length_buckets, load_draft_model, shared_params_key
+from ... import chunk_cache, metrics
+from ...extractive import compress
+from ...utils import clean_summary, dynamic_params
 
 class Mt5Summarizer(BaseSummarizer):
+    model_id = "tsmatz/mt5_summarize_japanese"
+    generation_kwargs = {"num_beams": 4, "repetition_penalty": 1.1}
+    supports_draft = True
+
     def __init__(self):
-        self.summarizer = pipeline(
+        self.summarizer = self._build_pipeline()
+        # SUMMARIZER_DRAFT_MODELS で下書きモデルを指定すると assisted decoding で生成する（無ければ None）
+        self.draft_model = load_draft_model("ja", self.summarizer.model)
+        self.batch_size = getattr(settings, "SUMMARIZER_MT5_BATCH_SIZE", 8)  # 1 回の generate にまとめる最大件数
+        # モデルに渡す最大トークン数。超える入力は切り捨てず、重要な文だけを残してこの長さに収める
+        self.max_input_tokens = min(self.summarizer.tokenizer.model_max_length,
+                                    getattr(settings, "SUMMARIZER_MT5_MAX_INPUT_TOKENS", 512))
+
+    def _build_pipeline(self):
+        """モデルの読み込み（量子化版・ONNX 版はここを差し替える）"""
+        return pipeline(
             "summarization",
-            model="tsmatz/mt5_summarize_japanese",
-            tokenizer="tsmatz/mt5_summarize_japanese",
+            model=self.model_id,
+            tokenizer=self.model_id,
         )
 
-    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None) -> str:
-        lang = lang_code or infer_lang(text) or "ja"
-        n_in = len(self.summarizer.tokenizer.encode(text, add_special_tokens=False))
-        params = dynamic_params(n_in, mode, lang_code=lang, text=text)
-        
-        # ログ出力（BaseSummarizer共通メソッド）
-        self.log_summary_info(lang, mode, n_in,
-                        params["min_new_tokens"], params["max_new_tokens"])
-
-        out = self.summarizer(
-            text,
-            do_sample=False,
-            num_beams=4,
-            truncation=True,
-            repetition_penalty=1.1,
-            **params
-        )
-        return clean_summary(out[0]["summary_text"])
+    def _count_tokens(self, sentences: list[str]) -> list[int]:
+        enc = self.summarizer.tokenizer(sentences, add_special_tokens=False)
+        return [len(ids) for ids in enc["input_ids"]]
+
+    def _memo_key(self, text: str, params: dict, lang: str) -> str:
+        draft = draft_model_id(lang) if self.draft_model is not None else None
+        return chunk_cache.chunk_key(text, params, lang, self.model_id, self.generation_kwargs, draft)
+
+    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None,
+                  on_partial=None) -> str:
+        # 分割せず 1 回で要約するため、on_partial で通知する途中結果は無い
+        # 言語は呼び出し側（router の RequestContext）で確定済み。このモデルは日本語専用
+        lang = lang_code or "ja"
+        return self.summarize_batch([(text, mode)], lang_code=lang)[0]
+
+    def summarize_batch(self, items: list[tuple[str, str]], lang_code: str | None = None) -> list[str]:
+        """
+        (text, mode) のリストを長さ順のバケットに分け、バケットごとに 1 回の generate で要約する。
+        max_input_tokens を超える入力は、抽出で重要な文だけに絞ってから要約する。
+        絞り込んだ本文の要約はチャンク要約のキャッシュに覚えておき、更新された記事でも
+        残す文が前回と同じなら generate しない。
+        """
+        tokenizer = self.summarizer.tokenizer
+        lang = lang_code or "ja"
+        texts, lengths, params_list, memo_keys = [], [], [], {}
+        for i, (text, mode) in enumerate(items):
+            with metrics.span("tokenize", lang="ja"):
+                n_in = len(tokenizer.encode(text, add_special_tokens=False))
+            compressed = n_in > self.max_input_tokens
+            if compressed:
+                with metrics.span("extractive", lang="ja"):
+                    text = compress(text, lang, self.max_input_tokens, self._count_tokens)
+                n_in = len(tokenizer.encode(text, add_special_tokens=False))
+            params = dynamic_params(n_in, mode, lang_code=lang, text=text)
+            if compressed:
+                memo_keys[i] = self._memo_key(text, params, lang)
+
+            # ログ出力（BaseSummarizer共通メソッド）
+            self.log_summary_info(lang, mode, n_in,
+                            params["min_new_tokens"], params["max_new_tokens"])
+            texts.append(text)
+            lengths.append(n_in)
+            params_list.append(params)
+
+        results = [""] * len(items)
+        todo = []
+        for i in range(len(items)):
+            hit = chunk_cache.lookup(memo_keys[i]) if i in memo_keys else None
+            if hit is None:
+                todo.append(i)
+            else:
+                results[i] = hit
+        keys = [shared_params_key(params_list[i]) for i in todo]
+        for bucket in length_buckets([lengths[i] for i in todo], self.batch_size, keys):
+            idxs = [todo[j] for j in bucket]
+            with metrics.span("generate", lang="ja", model=self.model_id):
+                outs = generate_batch(
+                    self.summarizer.model,
+                    tokenizer,
+                    [texts[i] for i in idxs],
+                    [params_list[i] for i in idxs],
+                    max_input_tokens=self.max_input_tokens,
+                    assistant_model=self.draft_model,
+                    **self.generation_kwargs,
+                )
+            for i, out in zip(idxs, outs):
+                results[i] = clean_summary(out)
+                if i in memo_keys:
+                    chunk_cache.store(memo_keys[i], results[i])
+        return results
@@ -0,0 +1,64 @@
+# summarizer/services/summarizers/optimized.py
+# 役割: CPU 向けの軽量化モデル（動的 int8 量子化 / ONNX Runtime）の読み込み共通処理
+
+from pathlib import Path
+
+import torch
+from django.conf import settings
+from torch.ao.nn.quantized.modules.linear import LinearPackedParams
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+
+def onnx_artifact_dir(model_name: str) -> Path:
+    """scripts/build_optimized_models.py が出力する ONNX 一式の置き場所"""
+    root = Path(getattr(settings, "SUMMARIZER_ONNX_DIR", Path(settings.BASE_DIR) / "artifacts" / "onnx"))
+    return root / model_name.replace("/", "__")
+
+
+def quantized_memory_mb(*models) -> float:
+    """
+    動的 int8 量子化したモデル（と下書きモデル）のメモリ量（MB）。
+    量子化した Linear の重みは packed params として持たれ parameters() に出ないので、
+    parameters() / buffers() に加えて各量子化 Linear の int8 の重みと bias を数える。
+    """
+    n_bytes = 0
+    for model in models:
+        if model is None:
+            continue
+        tensors = list(model.parameters()) + list(model.buffers())
+        for module in model.modules():
+            if isinstance(module, LinearPackedParams):
+                tensors += [t for t in module._weight_bias() if t is not None]
+        n_bytes += sum(t.numel() * t.element_size() for t in tensors)
+    return n_bytes / (1024 * 1024)
+
+
+def quantized_pipeline(model_name: str):
+    """PyTorch のまま Linear 層を動的 int8 量子化したパイプライン"""
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+
+
+def onnx_pipeline(model_name: str):
+    """
+    事前にエクスポート済みの ONNX（encoder / decoder / decoder_with_past）を ONNX Runtime で動かすパイプライン。
+    decoder_with_past により、生成時は過去の key/value を再計算せずに使い回す。
+    """
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+    path = onnx_artifact_dir(model_name)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"ONNX モデルが見つからない: {path}（scripts/build_optimized_models.py で作成する）"
+        )
+    model = ORTModelForSeq2SeqLM.from_pretrained(path, use_cache=True, provider="CPUExecutionProvider")
+    return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+def onnx_memory_mb(model_name: str) -> float:
+    """ONNX モデルは parameters() を持たないので、重みファイルのサイズで見積もる"""
+    path = onnx_artifact_dir(model_name)
+    n_bytes = sum(f.stat().st_size for f in path.glob("*.onnx*"))
+    return n_bytes / (1024 * 1024)
@@ -0,0 +1,122 @@
+# summarizer/services/summarizers/registry.py
+# 役割: サマライザーを初回利用時にロードし、メモリ予算内で LRU 管理するレジストリ
+
+import gc
+import logging
+import threading
+from collections import OrderedDict
+from importlib import import_module
+
+logger = logging.getLogger(__name__)
+
+
+class SummarizerSpec:
+    """
+    ロード前に分かっている情報（実装クラスの場所と想定メモリ量、キャッシュキーに使うモデルの属性）。
+    model_id / generation_kwargs / supports_draft は実装クラスの同名の属性と同じ値を持つ。
+    Web プロセスが実装クラス（torch / transformers）を import せずにキャッシュキーを作るため。
+    """
+
+    def __init__(self, module: str, cls_name: str, est_memory_mb: int, model_id: str = "",
+                 generation_kwargs: dict | None = None, supports_draft: bool = False):
+        self.module = module          # summarizers パッケージからの相対モジュール名
+        self.cls_name = cls_name
+        self.est_memory_mb = est_memory_mb
+        self.model_id = model_id
+        self.generation_kwargs = generation_kwargs or {}
+        self.supports_draft = supports_draft
+
+    def load_class(self):
+        mod = import_module(f".{self.module}", package=__package__)
+        return getattr(mod, self.cls_name)
+
+
+class SummarizerRegistry:
+    """
+    キー（言語コード等）→ サマライザーの遅延ロード付きレジストリ。
+      - get() で初めてモデルをロードする
+      - budget_mb を超える場合は最も長く使われていないモデルを解放する
+      - budget_mb <= 0 なら無制限
+    """
+
+    def __init__(self, specs: dict, budget_mb: int = 0):
+        self.specs = specs
+        self.budget_mb = budget_mb
+        self._loaded: "OrderedDict[str, object]" = OrderedDict()
+        self._sizes: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+
+    def _resident_mb(self) -> float:
+        return sum(self._sizes.values())
+
+    def _evict_for(self, need_mb: float, keep: str | None = None) -> None:
+        """need_mb を載せられるまで LRU 順に解放する（keep は対象外）"""
+        if self.budget_mb <= 0:
+            return
+        for key in list(self._loaded):
+            if self._resident_mb() + need_mb <= self.budget_mb:
+                break
+            if key == keep:
+                continue
+            self._loaded.pop(key)
+            freed = self._sizes.pop(key, 0)
+            logger.info("evicted '%s' (%.0f MB)", key, freed)
+        gc.collect()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 同じモデルの二重ロードを防ぎつつ、別モデルのロードはブロックしない
+        with key_lock:
+            with self._lock:
+                if key in self._loaded:
+                    self._loaded.move_to_end(key)
+                    return self._loaded[key]
+                spec = self.specs[key]
+                self._evict_for(spec.est_memory_mb)
+
+            logger.info("loading '%s' ...", key)
+            instance = spec.load_class()()
+            size = instance.memory_mb() or spec.est_memory_mb
+
+            with self._lock:
+                self._loaded[key] = instance
+                self._sizes[key] = size
+                # 実測値が見積もりより大きかった場合に備えて再調整
+                self._evict_for(0, keep=key)
+            logger.info("loaded '%s' (%.0f MB, resident %.0f MB)", key, size, self._resident_mb())
+            return instance
+
+    def peek(self, key: str):
+        """ロード済みならそのサマライザー、未ロードなら None（ロードも LRU の更新もしない）"""
+        with self._lock:
+            return self._loaded.get(key)
+
+    def spec(self, key: str) -> SummarizerSpec:
+        """モデルも実装クラスも読み込まずに、キーの SummarizerSpec を返す"""
+        return self.specs[key]
+
+    def model_id(self, key: str) -> str:
+        """モデルをロードせずにモデル ID を返す"""
+        return self.specs[key].model_id
+
+    def warmup(self, keys) -> None:
+        for key in keys:
+            if key in self.specs:
+                self.get(key)
+
+    def collect_metrics(self) -> list:
+        """metrics.register_collector 用: ロード済みモデルと常駐メモリ見積もり"""
+        with self._lock:
+            rows = [("summarizer_model_loaded", "gauge", {"key": k}, 1) for k in self._loaded]
+            rows.append(("summarizer_model_resident_mb", "gauge", {}, self._resident_mb()))
+        return rows
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._loaded)
@@ -0,0 +1,34 @@
+# summarizer/services/summarizers/stub_summarizer.py
+# 役割: 負荷試験・CI 用の代替サマライザー（モデルを読み込まない）。SUMMARIZER_BACKENDS で "stub" を選ぶと使われる
+
+import time
+
+from django.conf import settings
+
+from .base import BaseSummarizer
+from .. import metrics
+from ..extractive import extract_summary
+
+
+class StubSummarizer(BaseSummarizer):
+    """
+    抽出型要約（重要な文の抜き出し）を返し、generate の代わりに SUMMARIZER_STUB_LATENCY_MS だけ待つ。
+    summarize_batch() は何件でも 1 回分だけ待つので、マイクロバッチの効果も実モデルと同じ向きに現れる。
+    """
+    model_id = "stub"
+
+    def __init__(self):
+        self.latency_ms = getattr(settings, "SUMMARIZER_STUB_LATENCY_MS", 50)
+
+    def _generate(self, texts: list[str], lang: str) -> list[str]:
+        with metrics.span("generate", lang=lang, model=self.model_id):
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            return [extract_summary(text, lang) for text in texts]
+
+    def summarize(self, text: str, mode: str = "medium", lang_code: str | None = None,
+                  on_partial=None) -> str:
+        return self._generate([text], lang_code or "en")[0]
+
+    def summarize_batch(self, items: list[tuple[str, str]], lang_code: str | None = None) -> list[str]:
+        return self._generate([text for text, _ in items], lang_code or "en")
@@ -0,0 +1,114 @@
+# summarizer/services/summary_cache.py
+# 役割: 要約結果のコンテンツアドレス型キャッシュ（LRU + SQLite）と、同一リクエストの同時実行の集約
+
+import hashlib
+import json
+import re
+import unicodedata
+
+from django.conf import settings
+
+from . import metrics
+from .concurrency import SingleFlight
+from .store import LRUCache, SqliteStore, TieredCache
+from .summarizers import draft_model_id, get_registry, resolve_lang
+from .utils import SPECIAL_LANG_PROFILES, DEFAULT_PROFILE
+
+CACHE_VERSION = 3   # 後処理（clean_summary 等）を変えてキャッシュを無効化したい場合に上げる
+
+_cache = None
+_flight = SingleFlight()
+
+
+def normalize_text(text: str) -> str:
+    """表記ゆれ（全角/半角、空白・改行の差）を吸収してからハッシュする"""
+    s = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def summary_key(text: str, mode: str, lang: str, model_key: str | None = None) -> str:
+    """
+    本文ハッシュ + モード + 要約言語 + モデル ID + 生成パラメータから決まるキー
+    （model_key は長さで選んだモデルのキー。省略時は言語の既定モデル）
+    """
+    lang = resolve_lang(lang)
+    key = model_key or lang
+    spec = get_registry().spec(key)   # 実装クラスは import しない（Web プロセスに torch を読み込まない）
+    signature = {
+        "v": CACHE_VERSION,
+        "text": hashlib.sha256(normalize_text(text).encode()).hexdigest(),
+        "mode": mode,
+        "lang": lang,
+        "model": spec.model_id,
+        "generation": spec.generation_kwargs,
+        "draft": draft_in_use(key, lang),   # assisted decoding は貪欲法なので出力が変わる
+        "profile": SPECIAL_LANG_PROFILES.get(lang, DEFAULT_PROFILE),
+    }
+    blob = json.dumps(signature, sort_keys=True, ensure_ascii=False)
+    return "summary:" + hashlib.sha256(blob.encode()).hexdigest()
+
+
+def draft_in_use(key: str, lang: str) -> str | None:
+    """
+    モデルキー key のサマライザーが実際に使う下書きモデル。
+    このプロセスにロード済みなら、その draft_model の有無で決める（指定しても読み込み失敗・語彙の不一致等で
+    ビームサーチになったものは None）。未ロード（推論ワーカー側にある等）なら、実装クラスが
+    assisted decoding に対応していて下書きモデルが指定されているかで決める。
+    """
+    registry = get_registry()
+    instance = registry.peek(key)
+    if instance is not None:
+        uses_draft = getattr(instance, "draft_model", None) is not None
+    else:
+        uses_draft = registry.spec(key).supports_draft
+    return draft_model_id(lang) if uses_draft else None
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        path = getattr(settings, "SUMMARIZER_CACHE_PATH", None)
+        ttl = getattr(settings, "SUMMARIZER_CACHE_TTL", 60 * 60 * 24 * 30)
+        _cache = TieredCache(
+            LRUCache(getattr(settings, "SUMMARIZER_CACHE_MAX_ENTRIES", 1024), ttl=ttl),
+            SqliteStore(path, "summaries", ttl=ttl,
+                        max_entries=getattr(settings, "SUMMARIZER_CACHE_STORE_MAX_ENTRIES", 100000))
+            if path else None,
+        )
+    return _cache
+
+
+def cached_summary(text: str, mode: str, lang: str, compute, model_key: str | None = None) -> str:
+    """
+    キャッシュにあればそれを返し、無ければ compute() を実行して保存する。
+    同じキーの計算が実行中なら、その結果を待って共有する（モデル実行は 1 回だけ）。
+    """
+    key = summary_key(text, mode, lang, model_key)
+    cache = get_cache()
+    hit = cache.get(key)
+    if hit is not None:
+        metrics.inc("summarizer_cache_requests_total", cache="summary", result="hit")
+        return hit
+    metrics.inc("summarizer_cache_requests_total", cache="summary", result="miss")
+
+    def _compute():
+        # 先行リクエストが保存し終えた直後に入ってきた場合に備えて再確認
+        again = cache.get(key)
+        if again is not None:
+            return again
+        out = compute()
+        # ロード前に決めたキーと、ロードしたモデルが実際に下書きモデルを使ったかが食い違う場合は後者で保存する
+        cache.set(summary_key(text, mode, lang, model_key), out)
+        return out
+
+    return _flight.do(key, _compute)
+
+
+def lookup(text: str, mode: str, lang: str, model_key: str | None = None) -> str | None:
+    hit = get_cache().get(summary_key(text, mode, lang, model_key))
+    metrics.inc("summarizer_cache_requests_total", cache="summary", result="hit" if hit is not None else "miss")
+    return hit
+
+
+def store(text: str, mode: str, lang: str, summary: str, model_key: str | None = None) -> None:
+    get_cache().set(summary_key(text, mode, lang, model_key), summary)
@@ -1,35 +1,324 @@
 # 何をするか：DeepL API（Free）で翻訳する安全なラッパー
-import os, time, hashlib, requests
-from django.core.cache import cache
+#   - 長い本文は文の境界で区切った segment 単位で翻訳する（複数 segment を 1 リクエストの text にまとめ、
+#     そのリクエストを並列に送る。複数の出力言語を指定した場合も言語ごとのリクエストを並列に送る）。キャッシュも segment 単位なので、一部だけ変わった記事は差分だけ翻訳する
+#   - 呼び出しペースはプロセス共有のトークンバケット（リクエスト数・文字数）で揃え、
+#     429/503 ではサーバーの Retry-After に従って（無ければジッター付きの指数バックオフで）再試行する
+#   - 接続はキープアライブの共有セッション（同期）/ 共有 AsyncClient（非同期）で使い回す
+#   - 翻訳結果はプロセス内 LRU + SQLite（圧縮・TTL・件数上限付き）にキャッシュし、全ワーカーで共有する
+import os, re, time, asyncio, hashlib, threading, requests
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+from .http import get_async_client
+from .ratelimit import backoff_seconds, get_limiter, retry_after_seconds
+from .store import LRUCache, SqliteStore, TieredCache
 
 DEEPL_API_KEY = os.environ.get("DEEPL_API_KEY", "")
-DEEPL_BASE = "https://api-free.deepl.com/v2"
+DEEPL_BASE = os.environ.get("DEEPL_BASE", "https://api-free.deepl.com/v2")   # 負荷試験では代替サーバーを指す
 
 class TranslationError(Exception): pass
 
-def deepl_translate(text: str, src: str | None, tgt: str) -> str:
-    if not DEEPL_API_KEY:
-        raise TranslationError("DEEPL_API_KEY が未設定である。")
+MAX_ATTEMPTS = 4
+RETRY_STATUS = (429, 503, 529)
+MAX_TEXTS_PER_REQUEST = 50   # DeepL の 1 リクエストあたりの text 数の上限
+_CJK_TARGETS = {"ja", "zh"}
+
+# segment の区切り: 改行、日本語・中国語の 。！？ の直後（閉じ括弧の前は除く）、.!? + 空白
+_BOUNDARY_RE = re.compile(r"\s*\n\s*|(?<=[。！？])(?![」』）)\]])\s*|(?<=[.!?])\s+")
+
+_cache = None
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+_stats = {"hits": 0, "misses": 0, "chars_saved": 0, "chars_sent": 0}
+_stats_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def get_cache() -> TieredCache:
+    global _cache
+    if _cache is None:
+        path = _setting("SUMMARIZER_TRANSLATION_CACHE_PATH", None)
+        ttl = _setting("SUMMARIZER_TRANSLATION_CACHE_TTL", 60 * 60 * 24)
+        _cache = TieredCache(
+            LRUCache(_setting("SUMMARIZER_TRANSLATION_CACHE_MEMORY_ENTRIES", 1024), ttl=ttl),
+            SqliteStore(path, "translations", ttl=ttl, compress=True,
+                        max_entries=_setting("SUMMARIZER_TRANSLATION_CACHE_MAX_ENTRIES", 100000))
+            if path else None,
+        )
+    return _cache
+
+
+def get_session() -> requests.Session:
+    """DeepL 用のキープアライブ共有セッション（同時接続数は SUMMARIZER_DEEPL_POOL_SIZE）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool = _setting("SUMMARIZER_DEEPL_POOL_SIZE", 10)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool, pool_block=True)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """segment をまとめたリクエストを並列に送るスレッドプール（同時数は接続数と同じ）"""
+    global _executor
+    with _session_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_setting("SUMMARIZER_DEEPL_POOL_SIZE", 10),
+                                           thread_name_prefix="deepl")
+        return _executor
+
+
+def split_segments(text: str, max_chars: int) -> tuple[list[str], list[str]]:
+    """
+    text を文の境界で max_chars 文字以下の segment に分ける（1 文が max_chars を超える場合はその文だけで 1 つ）。
+    戻り値は (segments, separators)。separators[i] は segments[i] と segments[i+1] の間の元の空白・改行。
+    max_chars <= 0 なら分けない。
+    """
+    text = text.strip()
+    if not text:
+        return [], []
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text], []
+
+    pieces, pos = [], 0   # 文の (開始, 終了) 位置
+    for m in _BOUNDARY_RE.finditer(text):
+        if m.start() > pos:
+            pieces.append((pos, m.start()))
+        pos = max(pos, m.end())
+    if pos < len(text):
+        pieces.append((pos, len(text)))
+
+    segments, separators = [], []
+    start, end = pieces[0]
+    for p_start, p_end in pieces[1:]:
+        if p_end - start > max_chars:
+            segments.append(text[start:end])
+            separators.append(text[end:p_start])
+            start = p_start
+        end = p_end
+    segments.append(text[start:end])
+    return segments, separators
+
+
+def _assemble(outs: list[str], separators: list[str], tgt: str) -> str:
+    """翻訳した segment を、元の段落の区切りを保って繋ぐ（文の間の空白は出力言語に合わせる）"""
+    joiner = "" if tgt.lower() in _CJK_TARGETS else " "
+    parts = [outs[0]]
+    for sep, out in zip(separators, outs[1:]):
+        parts.append(sep if "\n" in sep else joiner)
+        parts.append(out)
+    return "".join(parts)
+
+
+def _batches(missing: list[int], segments: list[str]) -> list[list[int]]:
+    """未翻訳の segment を、1 リクエストあたり SUMMARIZER_DEEPL_BATCH_CHARS 文字程度ずつにまとめる"""
+    limit = _setting("SUMMARIZER_DEEPL_BATCH_CHARS", 5000)
+    batches, current, size = [], [], 0
+    for i in missing:
+        if current and (size + len(segments[i]) > limit or len(current) >= MAX_TEXTS_PER_REQUEST):
+            batches.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(segments[i])
+    if current:
+        batches.append(current)
+    return batches
+
+
+class _Plan:
+    """1 つの本文を複数の言語に訳すときの作業内容（segment は全言語で共通、キャッシュと送信は言語ごと）"""
+
+    def __init__(self, text: str, src: str | None, tgts: list[str]):
+        self.src = src
+        self.segments, self.separators = split_segments(text, _setting("SUMMARIZER_DEEPL_SEGMENT_CHARS", 1500))
+        if len(self.segments) > 1:
+            metrics.observe("summarizer_translation_segments", len(self.segments), buckets=metrics.COUNT_BUCKETS)
+        self.keys = {tgt: [_cache_key(seg, src, tgt) for seg in self.segments] for tgt in tgts}
+        self.outs: dict[str, list] = {}
+        self.sends: list[tuple[str, list[int]]] = []   # (出力言語, segment の番号) = 1 リクエスト
+
+    def lookup(self) -> None:
+        """キャッシュに無い segment を、言語ごとにリクエスト単位へまとめる"""
+        for tgt, keys in self.keys.items():
+            outs = [_cached(key, seg) for key, seg in zip(keys, self.segments)]
+            self.outs[tgt] = outs
+            missing = [i for i, out in enumerate(outs) if out is None]
+            self.sends.extend((tgt, batch) for batch in _batches(missing, self.segments))
+
+    def texts(self, batch: list[int]) -> list[str]:
+        return [self.segments[i] for i in batch]
+
+    def store(self, results: list[list[str]]) -> None:
+        cache = get_cache()
+        for (tgt, batch), translated in zip(self.sends, results):
+            if len(translated) != len(batch):
+                raise TranslationError("DeepL の応答件数がリクエストと一致しない。")
+            for i, out in zip(batch, translated):
+                self.outs[tgt][i] = out
+                cache.set(self.keys[tgt][i], out)
+
+    def assemble(self) -> dict[str, str]:
+        return {tgt: _assemble(outs, self.separators, tgt) for tgt, outs in self.outs.items()}
+
+
+def _cache_key(text: str, src: str | None, tgt: str) -> str:
+    blob = "\0".join(((src or "").lower(), tgt.lower(), text))
+    return f"deepl:{hashlib.sha256(blob.encode()).hexdigest()}"
+
+
+def _count(**deltas) -> None:
+    with _stats_lock:
+        for k, v in deltas.items():
+            _stats[k] += v
+
+
+def _cached(key: str, text: str) -> str | None:
+    hit = get_cache().get(key)
+    if hit is not None:
+        _count(hits=1, chars_saved=len(text))
+        metrics.inc("summarizer_cache_requests_total", cache="deepl", result="hit")
+        metrics.inc("summarizer_deepl_characters_saved_total", len(text))
+    else:
+        _count(misses=1)
+        metrics.inc("summarizer_cache_requests_total", cache="deepl", result="miss")
+    return hit
+
 
-    # シンプルなキャッシュ（24h）
-    key = f"deepl:{hashlib.md5((src or '').encode()+tgt.encode()+text.encode()).hexdigest()}"
-    cached = cache.get(key)
-    if cached: 
-        return cached
+def _sent(chars: int) -> None:
+    _count(chars_sent=chars)
+    metrics.inc("summarizer_deepl_characters_total", chars)
 
-    data = {"auth_key": DEEPL_API_KEY, "text": text, "target_lang": tgt.upper()}
+
+def _retry_wait(r, attempt: int) -> float:
+    """再試行までの秒数。Retry-After があればプロセス全体の呼び出しも同じだけ止める"""
+    metrics.inc("summarizer_deepl_retries_total", status=str(r.status_code))
+    wait = backoff_seconds(attempt, r.headers.get("Retry-After"),
+                           cap=_setting("SUMMARIZER_DEEPL_MAX_BACKOFF", 30))
+    if retry_after_seconds(r.headers.get("Retry-After")) is not None:
+        get_limiter("deepl").pause(wait)
+        return 0.0   # 待ちは次の acquire() で行う
+    return wait
+
+
+def stats() -> dict:
+    """翻訳キャッシュのヒット率と、キャッシュで DeepL に送らずに済んだ文字数（このプロセスの起動後）"""
+    with _stats_lock:
+        out = dict(_stats)
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0
+    persistent = get_cache().persistent
+    out["entries"] = len(persistent) if persistent is not None else len(get_cache().memory)
+    return out
+
+
+def _request_data(texts: list[str], src: str | None, tgt: str) -> dict:
+    data = {"auth_key": DEEPL_API_KEY, "text": texts, "target_lang": tgt.upper()}
     if src:
         data["source_lang"] = src.upper()
+    return data
+
+
+def _translations(r) -> list[str]:
+    return [t["text"] for t in r.json()["translations"]]
+
+
+def _post(texts: list[str], src: str | None, tgt: str) -> list[str]:
+    data = _request_data(texts, src, tgt)
+    chars = sum(len(t) for t in texts)
+    limiter = get_limiter("deepl")
+    session = get_session()
 
-    for attempt in range(3):
-        r = requests.post(f"{DEEPL_BASE}/translate", data=data, timeout=60)
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire(chars)
+        _sent(chars)
+        r = session.post(f"{DEEPL_BASE}/translate", data=data, timeout=60)
         if r.status_code == 200:
-            out = r.json()["translations"][0]["text"]
-            cache.set(key, out, 60*60*24)
-            return out
-        if r.status_code in (429, 503):
-            time.sleep(2 * (attempt + 1))
+            return _translations(r)
+        if r.status_code in RETRY_STATUS and attempt < MAX_ATTEMPTS - 1:
+            time.sleep(_retry_wait(r, attempt))
             continue
+        if r.status_code in RETRY_STATUS:
+            break
         raise TranslationError(f"DeepL API エラー: {r.status_code} {r.text}")
 
     raise TranslationError("DeepL リトライ上限に到達した。")
+
+
+async def _apost(texts: list[str], src: str | None, tgt: str) -> list[str]:
+    data = _request_data(texts, src, tgt)
+    chars = sum(len(t) for t in texts)
+    limiter = get_limiter("deepl")
+    client = get_async_client()
+
+    for attempt in range(MAX_ATTEMPTS):
+        await limiter.aacquire(chars)
+        _sent(chars)
+        r = await client.post(f"{DEEPL_BASE}/translate", data=data)
+        if r.status_code == 200:
+            return _translations(r)
+        if r.status_code in RETRY_STATUS and attempt < MAX_ATTEMPTS - 1:
+            await asyncio.sleep(_retry_wait(r, attempt))
+            continue
+        if r.status_code in RETRY_STATUS:
+            break
+        raise TranslationError(f"DeepL API エラー: {r.status_code} {r.text}")
+
+    raise TranslationError("DeepL リトライ上限に到達した。")
+
+
+def deepl_translate_many(text: str, src: str | None, tgts: list[str]) -> dict[str, str]:
+    """
+    text を複数の言語に翻訳し、{言語: 訳文} を返す。
+    DeepL は 1 リクエストに出力言語 1 つなので、言語ごと（長文は segment のまとまりごと）のリクエストを並列に送る。
+    """
+    if not DEEPL_API_KEY:
+        raise TranslationError("DEEPL_API_KEY が未設定である。")
+
+    plan = _Plan(text, src, list(dict.fromkeys(tgts)))
+    if not plan.segments:
+        return {tgt: text for tgt in tgts}
+    plan.lookup()
+
+    def send(job):
+        tgt, batch = job
+        return _post(plan.texts(batch), src, tgt)
+
+    if len(plan.sends) <= 1:
+        results = [send(job) for job in plan.sends]
+    else:
+        results = list(get_executor().map(send, plan.sends))
+    plan.store(results)
+    return plan.assemble()
+
+
+def deepl_translate(text: str, src: str | None, tgt: str) -> str:
+    return deepl_translate_many(text, src, [tgt])[tgt]
+
+
+async def adeepl_translate_many(text: str, src: str | None, tgts: list[str]) -> dict[str, str]:
+    """deepl_translate_many() の非同期版。キャッシュは同期版と共有し、共有の AsyncClient で接続を使い回す。"""
+    if not DEEPL_API_KEY:
+        raise TranslationError("DEEPL_API_KEY が未設定である。")
+
+    plan = _Plan(text, src, list(dict.fromkeys(tgts)))
+    if not plan.segments:
+        return {tgt: text for tgt in tgts}
+    await asyncio.to_thread(plan.lookup)   # SQLite の読み書きでイベントループを塞がない
+
+    results = await asyncio.gather(*(_apost(plan.texts(batch), src, tgt) for tgt, batch in plan.sends))
+    await asyncio.to_thread(plan.store, list(results))
+    return plan.assemble()
+
+
+async def adeepl_translate(text: str, src: str | None, tgt: str) -> str:
+    """deepl_translate() の非同期版"""
+    return (await adeepl_translate_many(text, src, [tgt]))[tgt]
@@ -3,6 +3,7 @@
 
 import re
 import unicodedata
+from bisect import bisect_right
 from math import ceil
 
 # ---- 出力のクリーンアップ（既存実装を移植）----
@@ -24,26 +25,94 @@ def clean_summary(text: str) -> str:
     s = re.sub(r"\n{3,}", "\n\n", s)
     return s.strip()
 
-# ---- 文字スクリプトからの言語推定（既存実装を移植）----
-_CJK_RE = re.compile(r"[\u4E00-\u9FFF\u3040-\u30FF\uAC00-\uD7AF]")
-_ZH_RE  = re.compile(r"[\u4E00-\u9FFF]")
-_JA_RE  = re.compile(r"[\u3040-\u30FF]")
-_KO_RE  = re.compile(r"[\uAC00-\uD7AF]")
-_TH_RE  = re.compile(r"[\u0E00-\u0E7F]")
-_LO_RE  = re.compile(r"[\u0E80-\u0EFF]")
-_KM_RE  = re.compile(r"[\u1780-\u17FF]")
-_MY_RE  = re.compile(r"[\u1000-\u109F]")
+# ---- 言語推定（文字スクリプトの出現数 + ラテン文字言語の機能語）----
+DETECT_SAMPLE_CHARS = 4000   # 判定に使う最大文字数（長文でも先頭・中央・末尾から抜き出した分だけ見る）
+
+# (開始, 終了, スクリプト名)。コードポイント順に並べておく
+_SCRIPT_RANGES = (
+    (0x0041, 0x005A, "latin"), (0x0061, 0x007A, "latin"), (0x00C0, 0x024F, "latin"),
+    (0x0E00, 0x0E7F, "th"), (0x0E80, 0x0EFF, "lo"), (0x1000, 0x109F, "my"), (0x1780, 0x17FF, "km"),
+    (0x3040, 0x30FF, "kana"), (0x4E00, 0x9FFF, "han"), (0xAC00, 0xD7AF, "ko"),
+)
+_SCRIPT_STARTS = [lo for lo, _, _ in _SCRIPT_RANGES]
+
+# ラテン文字の言語判定に使う機能語。どの 2 言語の集合も重ならず、他の言語でもよく使われる語
+# （es/fr/it の "en"、es/pt の "que"・"con"・"para"、it の "il"・fr の "le"、pt/en の "as"・"do" 等）と
+# 1 文字の語（"y"・"e"・"a" 等）は入れない。各言語に固有の語だけで数える
+_LATIN_STOPWORDS = {
+    "en": {"the", "and", "of", "that", "with", "for", "was", "were", "are", "have", "has", "this", "from",
+           "which", "would", "been", "they", "their"},
+    "fr": {"les", "des", "est", "une", "dans", "pour", "qui", "avec", "sur", "du", "pas", "au", "aux", "ont",
+           "cette", "ces", "leur", "été", "était"},
+    "de": {"der", "und", "das", "ist", "nicht", "mit", "den", "ein", "eine", "auch", "sich", "auf", "dem",
+           "wird", "werden", "wurde", "sind", "nach", "für", "über"},
+    "es": {"el", "los", "las", "es", "pero", "fue", "muy", "también", "sus", "hay", "cuando", "sin", "año",
+           "puede", "donde", "ya"},
+    "it": {"di", "che", "gli", "della", "delle", "dei", "degli", "sono", "nel", "nella", "alla", "dalla",
+           "anche", "questo", "essere", "stato", "più", "per", "non"},
+    "pt": {"os", "não", "uma", "com", "em", "foi", "pelo", "pela", "são", "ao", "seu", "sua", "muito", "isso",
+           "mas", "ainda", "já", "também", "pode", "anos"},
+    "nl": {"het", "een", "van", "niet", "zijn", "met", "voor", "op", "ook", "dat", "maar", "wordt", "bij",
+           "naar", "deze", "hebben", "werd", "worden", "nog", "hij", "heeft", "uit", "door"},
+}
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_MIN_STOPWORD_HITS = 3   # これ未満なら判断材料不足として英語扱い
+
+
+def _sample(text: str, limit: int = DETECT_SAMPLE_CHARS) -> str:
+    if len(text) <= limit:
+        return text
+    third = limit // 3
+    mid = len(text) // 2
+    return text[:third] + text[mid - third // 2: mid + third // 2] + text[-third:]
+
+
+def _script_histogram(sample: str) -> dict[str, int]:
+    """1 回の走査で、文字ごとのスクリプト出現数を数える"""
+    counts: dict[str, int] = {}
+    for ch in sample:
+        cp = ord(ch)
+        if cp < 0x41:
+            continue
+        i = bisect_right(_SCRIPT_STARTS, cp) - 1
+        if i >= 0 and cp <= _SCRIPT_RANGES[i][1]:
+            name = _SCRIPT_RANGES[i][2]
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+def classify_latin(sample: str) -> str:
+    """ラテン文字の本文を、機能語の出現数で en / fr / de / es / it / pt / nl に分類する"""
+    scores = dict.fromkeys(_LATIN_STOPWORDS, 0)
+    for word in _WORD_RE.findall(sample.lower()):
+        for lang, words in _LATIN_STOPWORDS.items():
+            if word in words:
+                scores[lang] += 1
+    best = max(scores, key=scores.get)
+    return best if scores[best] >= _MIN_STOPWORD_HITS else "en"
+
 
 def infer_lang(text: str) -> str | None:
-    if _JA_RE.search(text): return "ja"
-    if _KO_RE.search(text): return "ko"
-    if _ZH_RE.search(text): return "zh"
-    if _TH_RE.search(text): return "th"
-    if _LO_RE.search(text): return "lo"
-    if _KM_RE.search(text): return "km"
-    if _MY_RE.search(text): return "my"
-    if _CJK_RE.search(text): return "zh"
-    return None
+    """
+    本文の言語コードを推定する（文字が無ければ None）。
+    先頭・中央・末尾から抜き出した最大 DETECT_SAMPLE_CHARS 文字を 1 回だけ走査し、
+    最も多いスクリプトで判定する。漢字とかなは合わせて数え、かなが一定以上あれば ja、無ければ zh。
+    ラテン文字は機能語で言語を判別する。
+    """
+    sample = _sample(text)
+    counts = _script_histogram(sample)
+    if not counts:
+        return None
+    groups = dict(counts)
+    cjk = groups.pop("kana", 0) + groups.pop("han", 0)
+    if cjk:
+        groups["cjk"] = cjk
+    script = max(groups, key=groups.get)
+    if script == "cjk":
+        return "ja" if counts.get("kana", 0) >= 0.05 * cjk else "zh"
+    if script == "latin":
+        return classify_latin(sample)
+    return script
 
 # ---- 言語別プロファイル（既存実装を要約）----
 DEFAULT_PROFILE = {
@@ -75,11 +144,9 @@ SPECIAL_LANG_PROFILES = {
 }
 
 def _pick_profile(lang_code: str | None = None, text: str | None = None):
-    code = (lang_code or "").lower()
-    if code in SPECIAL_LANG_PROFILES:
-        return SPECIAL_LANG_PROFILES[code]
-    if text:
-        from .utils import infer_lang as _infer  # 循環回避のための遅延参照ではなく実体は同一
+    """言語コードが分かっていればそれで決める（本文からの再推定は言語コードが無いときだけ）"""
+    if lang_code:
+        return SPECIAL_LANG_PROFILES.get(lang_code.lower(), DEFAULT_PROFILE)
     return SPECIAL_LANG_PROFILES.get(infer_lang(text), DEFAULT_PROFILE) if text else DEFAULT_PROFILE
 
 def _target_len_by_ratio(n_in: int, mode: str, prof: dict) -> int:
@@ -90,7 +157,7 @@ def _target_len_by_ratio(n_in: int, mode: str, prof: dict) -> int:
 
 def dynamic_params(n_in_tokens: int, mode: str, lang_code: str | None = None, text: str | None = None):
     """入力長・言語・モードから min/max_new_tokens 等を算出する。"""
-    prof = SPECIAL_LANG_PROFILES.get(lang_code, _pick_profile(lang_code, text))
+    prof = _pick_profile(lang_code, text)
     target = _target_len_by_ratio(n_in_tokens, mode, prof)
     min_new = max(10, int(target * 0.8))
     max_new = max(min_new + 10, target)
@@ -1,3 +1,1104 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import torch
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+
+from . import news_summarizer_model
+from .services import (batching, bulk, chunk_cache, dedup, executor, extraction, inference_pool, jobs, ratelimit,
+                       router, summary_cache, translation)
+from .services.concurrency import SingleFlight
+from .services.context import RequestContext
+from .services import summarizers
+from .services.dedup import NearDuplicateIndex, _band_rows, _shingles
+from .services.extractive import compress, score_sentences, split_sentences
+from .services.metrics import _fmt_labels
+from .services.router import TranslationError, parse_target_lang
+from .services.utils import _LATIN_STOPWORDS, classify_latin, infer_lang
+from .services.summarizers import generation
+from .services.summarizers.registry import SummarizerRegistry, SummarizerSpec
+from .services.summarizers.en import bart_summarizer
+from .services.summarizers.en.bart_summarizer import BartSummarizer
+
+
+class _WordTokenizer:
+    """空白区切りの単語を 1 トークンとみなすトークナイザー（モデルを読み込まずに分割要約を動かす）"""
+    model_max_length = 1024
+
+    def __init__(self):
+        self.words: dict[int, str] = {}
+
+    def _encode(self, text: str):
+        ids, offsets = [], []
+        for m in re.finditer(r"\S+", text):
+            token = zlib.crc32(m.group().encode())
+            self.words[token] = m.group()
+            ids.append(token)
+            offsets.append(m.span())
+        return ids, offsets
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        if isinstance(text, list):
+            return {"input_ids": [self._encode(t)[0] for t in text]}
+        ids, offsets = self._encode(text)
+        return {"input_ids": ids, "offset_mapping": offsets}
+
+    def decode(self, ids: list[int]) -> str:
+        return " ".join(self.words[i] for i in ids)
+
+
+def _article(n_paragraphs: int, words: int = 120, offset: int = 0) -> str:
+    return "\n".join(
+        " ".join(f"p{p}w{w}" for w in range(words - 1)) + f" p{p}end."
+        for p in range(offset, offset + n_paragraphs)
+    )
+
+
+@override_settings(SUMMARIZER_CACHE_PATH="", SUMMARIZER_DRAFT_MODELS={})
+class ChunkMemoTests(SimpleTestCase):
+    def setUp(self):
+        chunk_cache._cache = None
+        self.addCleanup(setattr, chunk_cache, "_cache", None)
+        tokenizer = _WordTokenizer()
+        pipeline = SimpleNamespace(tokenizer=tokenizer, model=None)
+        with mock.patch.object(BartSummarizer, "_build_pipeline", return_value=pipeline):
+            self.summarizer = BartSummarizer()
+        self.summarizer.extractive_max_ratio = 3
+        self.generated: list[str] = []
+
+        def generate(model, tok, ids_list, params_list, **kwargs):
+            texts = [tok.decode(ids) for ids in ids_list]
+            self.generated.extend(texts)
+            return [f"Summary of {t.split()[0]} to {t.split()[-1]}" for t in texts]
+
+        patcher = mock.patch.object(bart_summarizer, "generate_batch_ids", side_effect=generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_appended_paragraph_only_regenerates_last_chunk(self):
+        article = _article(30)   # 3600 トークン: 抽出で 1 回に収める範囲を超えるので分割要約になる
+        self.summarizer.summarize(article)
+        first = list(self.generated)
+        chunks = [t for t in first if not t.startswith("Summary")]
+        self.assertGreater(len(chunks), 2)
+
+        self.generated.clear()
+        self.summarizer.summarize(article + "\n" + _article(1, words=40, offset=30))
+
+        map_calls = [t for t in self.generated if not t.startswith("Summary")]
+        reduce_calls = [t for t in self.generated if t.startswith("Summary")]
+        self.assertEqual(len(map_calls), 1)
+        self.assertTrue(map_calls[0].endswith("p30end."))
+        self.assertEqual(len(reduce_calls), 1)
+
+    def test_needs_chunking_does_not_tokenize(self):
+        with mock.patch.object(self.summarizer, "_count_tokens") as count, \
+                mock.patch.object(self.summarizer, "_tokenize") as tokenize:
+            self.assertFalse(self.summarizer.needs_chunking(_article(8)))    # 960 トークン
+            self.assertTrue(self.summarizer.needs_chunking(_article(30)))    # 3600 トークン
+        count.assert_not_called()
+        tokenize.assert_not_called()
+
+    def test_unchanged_article_generates_nothing(self):
+        article = _article(30)
+        self.summarizer.summarize(article)
+        self.generated.clear()
+        self.summarizer.summarize(article)
+        self.assertEqual(self.generated, [])
+
+
+class GenerateLengthTests(SimpleTestCase):
+    def test_special_tokens(self):
+        def tokenizer(text, add_special_tokens=True):
+            ids = [ord(c) for c in text]
+            return {"input_ids": [0] + ids + [2] if add_special_tokens else ids}
+
+        self.assertEqual(generation.special_tokens(tokenizer), ([0], [2]))
+
+    def test_short_row_ends_before_checkpoint_min_length(self):
+        from transformers import BartConfig, BartForConditionalGeneration
+
+        torch.manual_seed(0)
+        config = BartConfig(vocab_size=64, d_model=16, encoder_layers=1, decoder_layers=1,
+                            encoder_attention_heads=2, decoder_attention_heads=2,
+                            encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=128)
+        model = BartForConditionalGeneration(config).eval()
+        model.generation_config.min_length = 56   # bart-large-cnn と同じ
+        with torch.no_grad():
+            model.final_logits_bias[0, config.eos_token_id] = 100   # 最小長を過ぎたらすぐ EOS を選ぶモデル
+        tokenizer = SimpleNamespace(eos_token_id=config.eos_token_id,
+                                    batch_decode=lambda ids, skip_special_tokens: [row.tolist() for row in ids])
+        enc = {"input_ids": torch.tensor([[0, 5, 6, 7, 2]]), "attention_mask": torch.ones(1, 5, dtype=torch.long)}
+        params = {"min_new_tokens": 4, "max_new_tokens": 40, "length_penalty": 1.0, "no_repeat_ngram_size": 0}
+
+        out = generation._generate(model, tokenizer, enc, [params], num_beams=2)[0]
+        n_new = out.index(config.eos_token_id, 1)   # 先頭は decoder 開始トークン
+        self.assertGreaterEqual(n_new, 4)
+        self.assertLess(n_new, 40)
+
+
+def _words(n: int, seed: int) -> list[str]:
+    rng = np.random.default_rng(seed)
+    return [f"w{i}" for i in rng.integers(0, 5000, n)]
+
+
+class NearDuplicateIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = NearDuplicateIndex(threshold=0.85)
+        self.words = _words(300, seed=0)
+        self.text = " ".join(self.words)
+
+    def _add(self, text: str, variant=("medium", "ja"), result=None) -> int | None:
+        sig = self.index.signature(text)
+        doc_id, _ = self.index.query(sig)
+        self.index.put(sig, doc_id, variant, result or {"summary": text[:10]})
+        return self.index.query(sig)[0]
+
+    def test_short_text_has_no_signature(self):
+        self.assertIsNone(self.index.signature("too short"))
+
+    def test_identical_text_is_found(self):
+        doc_id = self._add(self.text, result={"summary": "s"})
+        found, similarity = self.index.query(self.index.signature(self.text))
+        self.assertEqual(found, doc_id)
+        self.assertEqual(similarity, 1.0)
+        self.assertEqual(self.index.get(found, ("medium", "ja")), {"summary": "s"})
+        self.assertIsNone(self.index.get(found, ("short", "ja")))
+
+    def test_small_edit_is_near_duplicate(self):
+        doc_id = self._add(self.text)
+        edited = self.words[:150] + ["changed"] + self.words[151:]
+        found, similarity = self.index.query(self.index.signature(" ".join(edited)))
+        self.assertEqual(found, doc_id)
+        self.assertGreaterEqual(similarity, 0.85)
+        self.assertLess(similarity, 1.0)
+
+    def test_unrelated_text_is_not_found(self):
+        self._add(self.text)
+        found, similarity = self.index.query(self.index.signature(" ".join(_words(300, seed=1))))
+        self.assertIsNone(found)
+        self.assertLess(similarity, 0.85)
+
+    def test_put_with_new_text_replaces_signature(self):
+        doc_id = self._add(self.text, variant=("short", "ja"))
+        updated = " ".join(self.words + _words(10, seed=2))
+        sig = self.index.signature(updated)
+        found, _ = self.index.query(sig)
+        self.assertEqual(found, doc_id)
+
+        self.index.put(sig, found, ("medium", "ja"), {"summary": "new"})
+        self.assertEqual(len(self.index), 1)
+        new_id, similarity = self.index.query(sig)
+        self.assertEqual(similarity, 1.0)
+        self.assertEqual(self.index.get(new_id, ("medium", "ja")), {"summary": "new"})
+        # 古い本文の要約は新しい本文には使わない
+        self.assertIsNone(self.index.get(new_id, ("short", "ja")))
+
+    def test_oldest_entry_is_evicted(self):
+        index = NearDuplicateIndex(threshold=0.85, max_entries=2)
+        sigs = [index.signature(" ".join(_words(300, seed=s))) for s in range(3)]
+        for sig in sigs:
+            index.put(sig, None, ("medium", "ja"), {})
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.query(sigs[0])[0])
+        self.assertIsNotNone(index.query(sigs[2])[0])
+
+    def test_chunked_signature_matches_full_matrix(self):
+        hashes = _shingles(self.text)
+        self.assertGreater(len(hashes), 3 * 64)
+        full = ((np.outer(self.index._a, hashes) + self.index._b[:, None]) % dedup._PRIME).min(axis=1)
+        with mock.patch.object(dedup, "SIGNATURE_CHUNK", 64):
+            np.testing.assert_array_equal(self.index.signature(self.text), full)
+
+    def test_band_rows_stay_below_threshold(self):
+        for threshold in (0.5, 0.7, 0.85, 0.95):
+            r = _band_rows(threshold, 128)
+            self.assertEqual(128 % r, 0)
+            self.assertLessEqual((r / 128) ** (1 / r), threshold - 0.05)
+
+
+class ExtractiveTests(SimpleTestCase):
+    def test_split_keeps_abbreviations(self):
+        self.assertEqual(
+            split_sentences("Mr. Smith went to Washington. He met Dr. Jones at 3 p.m. Friday.", "en"),
+            ["Mr. Smith went to Washington.", "He met Dr. Jones at 3 p.m. Friday."],
+        )
+        self.assertEqual(
+            split_sentences("The U.S. economy grew. John F. Kennedy spoke.", "en"),
+            ["The U.S. economy grew.", "John F. Kennedy spoke."],
+        )
+
+    def test_split_on_punctuation_quotes_and_newlines(self):
+        self.assertEqual(
+            split_sentences('It rained. "Stop!" she said.\nNext paragraph', "en"),
+            ["It rained.", '"Stop!" she said.', "Next paragraph"],
+        )
+        self.assertEqual(
+            split_sentences("政府は発表した。「本当か？」と聞いた。\n次の段落", "ja"),
+            ["政府は発表した。", "「本当か？」と聞いた。", "次の段落"],
+        )
+
+    def test_score_sentences(self):
+        self.assertEqual(list(score_sentences(["One.", "Two."], "en")), [1.0, 1.0])
+        sentences = [
+            "The central bank raised interest rates to fight inflation.",
+            "Inflation pushed the central bank to raise interest rates again.",
+            "Economists expect interest rates and inflation to stay high.",
+            "The weather was sunny on the coast.",
+        ]
+        scores = score_sentences(sentences, "en")
+        self.assertEqual(scores.shape, (4,))
+        self.assertEqual(int(scores.argmin()), 3)
+
+    def test_compress(self):
+        count = lambda sentences: [len(s.split()) for s in sentences]
+        short = "Rates rose. Markets fell."
+        self.assertEqual(compress(short, "en", 100, count), short)
+
+        text = " ".join([
+            "The central bank raised interest rates to fight inflation.",
+            "The weather was sunny on the coast.",
+            "Inflation pushed the central bank to raise interest rates again.",
+            "Economists expect interest rates and inflation to stay high.",
+        ])
+        out = compress(text, "en", 22, count)
+        kept = split_sentences(out, "en")
+        self.assertLessEqual(sum(n + 1 for n in count(kept)), 22)
+        self.assertNotIn("The weather was sunny on the coast.", kept)
+        # 残した文は元の順序のまま
+        self.assertEqual(kept, [s for s in split_sentences(text, "en") if s in kept])
+
+
+class TargetLangTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(parse_target_lang(None), "ja")
+        self.assertEqual(parse_target_lang("EN"), "en")
+        self.assertEqual(parse_target_lang(["ja"]), ["ja"])
+        self.assertEqual(parse_target_lang(["ja", "JA", "en", ""]), ["ja", "en"])
+        self.assertEqual(parse_target_lang([]), "ja")
+
+    def test_parse_rejects_non_strings(self):
+        for value in (1, True, [1], {"ja": 1}):
+            with self.assertRaises(ValueError):
+                parse_target_lang(value)
+
+
+class SummaryJobTests(TestCase):
+    def test_target_lang_keeps_its_shape(self):
+        for target_lang in ("ja", ["ja"], ["ja", "en"]):
+            job = jobs.submit(text="text", url="", target_lang=target_lang, length="medium")
+            job.refresh_from_db()
+            self.assertEqual(job.target_lang, target_lang)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_label_values_are_escaped(self):
+        self.assertEqual(_fmt_labels(()), "")
+        self.assertEqual(
+            _fmt_labels((("lang", "ja"), ("error", 'bad "x"\\path\nnext'))),
+            '{lang="ja",error="bad \\"x\\"\\\\path\\nnext"}',
+        )
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.batches: list[list[str]] = []
+
+        def summarize_batch(items, lang_code):
+            self.batches.append([t for t, _ in items])
+            self.release.wait(5)
+            return [f"summary of {t}" for t, _ in items]
+
+        self.summarizer = SimpleNamespace(summarize_batch=summarize_batch)
+        patcher = mock.patch.object(batching, "get_summarizer", return_value=self.summarizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+
+    def test_timed_out_request_is_cancelled(self):
+        batcher = batching.MicroBatcher("en", "model", max_batch=1, max_wait_ms=0)
+        first = threading.Thread(target=batcher.submit, args=("long", "medium"))
+        first.start()
+        with self.assertRaises(TimeoutError):
+            batcher.submit("short", "medium", timeout=0.05)
+        self.release.set()
+        first.join()
+        self.assertEqual(batcher.submit("next", "medium", timeout=5), "summary of next")
+        # 取り消した "short" は推論しない
+        self.assertEqual(self.batches, [["long"], ["next"]])
+
+
+class RunLocalTests(SimpleTestCase):
+    def test_chunked_input_bypasses_batcher(self):
+        for chunked, batched in ((True, 0), (False, 1)):
+            summarizer = mock.Mock(needs_chunking=mock.Mock(return_value=chunked))
+            batcher = mock.Mock()
+            with mock.patch.object(news_summarizer_model, "get_summarizer", return_value=summarizer), \
+                    mock.patch.object(batching, "enabled", return_value=True), \
+                    mock.patch.object(batching, "get_batcher", return_value=batcher):
+                news_summarizer_model.run_local("text", "medium", "en")
+            self.assertEqual(batcher.submit.call_count, batched)
+            self.assertEqual(summarizer.summarize.call_count, 1 - batched)
+
+
+class SummarizerSpecTests(SimpleTestCase):
+    def test_spec_matches_class(self):
+        specs = [spec for backends in summarizers._BACKENDS.values() for spec in backends.values()]
+        specs += list(summarizers._LONG_DOC_BACKENDS.values())
+        for spec in specs:
+            cls = spec.load_class()
+            with self.subTest(cls=spec.cls_name):
+                self.assertEqual(spec.model_id, cls.model_id)
+                self.assertEqual(spec.generation_kwargs, cls.generation_kwargs)
+                self.assertEqual(spec.supports_draft, cls.supports_draft)
+
+    def test_cache_key_does_not_import_torch(self):
+        code = (
+            "import django, sys; django.setup()\n"
+            "import summarizer.views\n"
+            "from summarizer.services.summary_cache import summary_key\n"
+            "summary_key('text', 'medium', 'en')\n"
+            "summary_key('text', 'medium', 'ja')\n"
+            "print(sorted({'torch', 'transformers'} & set(sys.modules)))\n"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+        self.assertEqual(out.stdout.strip(), "[]")
+
+
+class InferencePoolTests(SimpleTestCase):
+    def test_hung_worker_times_out_without_retry(self):
+        from multiprocessing.connection import Listener
+
+        sock_dir = tempfile.mkdtemp()
+        received = []
+
+        with override_settings(SUMMARIZER_INFERENCE_SOCKET_DIR=sock_dir, SUMMARIZER_INFERENCE_TIMEOUT_S=0.2):
+            listener = Listener(os.path.join(sock_dir, "worker-0.sock"), family="AF_UNIX",
+                                authkey=inference_pool._authkey())
+            self.addCleanup(listener.close)
+
+            def serve():
+                conn = listener.accept()
+                received.append(conn.recv())   # 受け取るだけで返事をしない
+                self.addCleanup(conn.close)
+
+            threading.Thread(target=serve, daemon=True).start()
+            pool = inference_pool._ConnectionPool()
+            with mock.patch.object(inference_pool, "_pool", pool):
+                with self.assertRaisesRegex(inference_pool.InferenceError, "応答しなかった"):
+                    inference_pool.remote_summarize("text", "medium", "en")
+        self.assertEqual(len(received), 1)
+
+
+class QuantizedMemoryTests(SimpleTestCase):
+    def test_counts_packed_int8_weights(self):
+        from .services.summarizers.optimized import quantized_memory_mb
+
+        model = torch.nn.Sequential(torch.nn.Embedding(10, 100), torch.nn.Linear(100, 200))
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        expected = 10 * 100 * 4 + 100 * 200 * 1 + 200 * 4   # fp32 の埋め込み + int8 の重み + fp32 の bias
+        self.assertEqual(quantized_memory_mb(quantized, None) * 1024 * 1024, expected)
+
+
+class LongDocRoutingTests(SimpleTestCase):
+    def test_long_doc_model_is_opt_in(self):
+        text = "word " * 5000
+        with mock.patch.object(summarizers, "count_tokens", return_value=5000) as count:
+            self.assertEqual(summarizers.model_key("en", text), "en")
+            count.assert_not_called()
+            self.assertEqual(summarizers.preload_keys(), ["en", "ja"])
+            with override_settings(SUMMARIZER_LONG_DOC_TOKENS={"en": (2500, 16000)}):
+                self.assertEqual(summarizers.model_key("en", text), "en:long")
+                self.assertEqual(summarizers.model_key("en", "short text"), "en")
+                self.assertEqual(summarizers.preload_keys(), ["en", "ja", "en:long"])
+
+
+class DraftModelTests(SimpleTestCase):
+    def test_draft_model_is_opt_in(self):
+        model = torch.nn.Linear(1, 1)
+        with mock.patch.object(generation.AutoModelForSeq2SeqLM, "from_pretrained") as load:
+            self.assertIsNone(generation.load_draft_model("en", model))
+            load.assert_not_called()
+        self.assertIsNone(summary_cache.draft_in_use("en", "en"))
+        with override_settings(SUMMARIZER_DRAFT_MODELS={"en": "draft"}):
+            self.assertEqual(summary_cache.draft_in_use("en", "en"), "draft")
+
+
+class BulkTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()     # "slow" の本文取得を待たせる
+        self.first_started = threading.Event()   # "first" のバッチが始まるまで他の記事の準備を終わらせない
+        self.addCleanup(self.release.set)
+        self.batches: list[list[str]] = []
+        self.n_items = 0
+        self.ready: dict = {}
+
+        def ready_dict(factory):
+            # summarize_many の「準備済み・バッチ待ち」の dict を覗けるようにする
+            self.ready = defaultdict(factory)
+            return self.ready
+
+        def prepare(item):
+            if item.get("slow"):
+                self.release.wait(5)
+            if item["text"] in ("a", "b", "bad"):
+                self.first_started.wait(5)
+            return RequestContext(raw_text=item["text"], detected="en")
+
+        def run_batch(batch, lang):
+            texts = [t for t, _ in batch]
+            self.batches.append(texts)
+            if "first" in texts:
+                # 他の記事が「準備済み・バッチ待ち」に入るまで、このバッチを終わらせない
+                self.first_started.set()
+                deadline = time.monotonic() + 5
+                while sum(map(len, self.ready.values())) < self.n_items - 1 and time.monotonic() < deadline:
+                    time.sleep(0.005)
+            if "bad" in texts:
+                raise RuntimeError("batch failed")
+            return [f"summary of {t}" for t in texts]
+
+        def run_one(text, mode, lang):
+            if text == "bad":
+                raise RuntimeError("bad input")
+            return f"single summary of {text}"
+
+        for name, fn in (("_prepare", prepare), ("run_summary_batch", run_batch), ("run_summary", run_one),
+                         ("final_summary", lambda summary, src, target: {"summary": summary}),
+                         ("defaultdict", ready_dict)):
+            patcher = mock.patch.object(bulk, name, side_effect=fn)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _run(self, items):
+        self.n_items = len(items)
+        return bulk.summarize_many(items)
+
+    def test_slow_item_does_not_hold_back_others(self):
+        self.first_started.set()
+        lines = self._run([{"text": "slow", "slow": True}, {"text": "a"}, {"text": "b"}])
+        first = [next(lines), next(lines)]
+        self.assertFalse(self.release.is_set())
+        self.assertEqual(sorted(line["index"] for line in first), [1, 2])
+        self.release.set()
+        rest = list(lines)
+        self.assertEqual([line["index"] for line in rest], [0])
+        self.assertEqual(rest[0]["summary"], "summary of slow")
+
+    def test_items_ready_during_a_batch_share_the_next_batch(self):
+        lines = {line["index"]: line for line in self._run([{"text": "first"}, {"text": "a"}, {"text": "b"}])}
+        self.assertEqual([sorted(b) for b in self.batches], [["first"], ["a", "b"]])
+        self.assertEqual(lines[2]["summary"], "summary of b")
+
+    def test_failed_batch_falls_back_to_single_items(self):
+        lines = {line["index"]: line for line in self._run([{"text": "first"}, {"text": "a"}, {"text": "bad"}])}
+        self.assertEqual([sorted(b) for b in self.batches], [["first"], ["a", "bad"]])
+        self.assertEqual(lines[0]["summary"], "summary of first")
+        self.assertEqual(lines[1]["summary"], "single summary of a")
+        self.assertEqual((lines[2]["status"], lines[2]["error"]), (500, "bad input"))
+
+
+class InferLangTests(SimpleTestCase):
+    def test_stopword_sets_are_disjoint(self):
+        langs = list(_LATIN_STOPWORDS)
+        for i, a in enumerate(langs):
+            self.assertTrue(all(len(w) > 1 for w in _LATIN_STOPWORDS[a]), a)
+            for b in langs[i + 1:]:
+                self.assertEqual(_LATIN_STOPWORDS[a] & _LATIN_STOPWORDS[b], set(), (a, b))
+
+    def test_short_latin_samples(self):
+        samples = {
+            "en": "The government said on Monday that the new measures were approved and that prices would fall.",
+            "es": "Los precios en España subieron en marzo, pero el gobierno espera que bajen en verano.",
+            "pt": "O governo anunciou que não vai aumentar os impostos, mas a oposição diz que ainda é muito pouco.",
+            "it": "Il governo ha detto che le nuove misure sono state approvate e che i prezzi non aumenteranno "
+                  "anche nel prossimo anno.",
+            "nl": "De regering heeft vandaag gezegd dat de belastingen niet omhoog gaan, maar het plan komt te laat.",
+            "fr": "Le gouvernement a annoncé que les prix vont baisser, mais cette mesure est insuffisante pour "
+                  "les ménages.",
+            "de": "Die Regierung hat am Montag mitgeteilt, dass die Steuern nicht steigen und der Plan auch "
+                  "für Familien gilt.",
+        }
+        for lang, text in samples.items():
+            with self.subTest(lang=lang):
+                self.assertEqual(classify_latin(text), lang)
+                self.assertEqual(infer_lang(text), lang)
+
+    def test_too_few_stopwords_falls_back_to_english(self):
+        self.assertEqual(classify_latin("Madrid, Lisboa, Roma"), "en")
+
+    def test_cjk_only_samples(self):
+        self.assertEqual(infer_lang("政府は新しい経済対策を発表した。"), "ja")
+        self.assertEqual(infer_lang("政府今天宣布了新的经济措施。"), "zh")
+        self.assertEqual(infer_lang("정부는 오늘 새로운 경제 대책을 발표했다."), "ko")
+        self.assertIsNone(infer_lang("2024 - 12 / 31"))
+
+
+class PersistentCacheLimitTests(SimpleTestCase):
+    def test_article_and_summary_caches_are_bounded(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for module, path_setting, prefix in (
+            (extraction, "SUMMARIZER_ARTICLE_CACHE_PATH", "SUMMARIZER_ARTICLE_CACHE"),
+            (summary_cache, "SUMMARIZER_CACHE_PATH", "SUMMARIZER_CACHE"),
+        ):
+            with self.subTest(module=module.__name__), override_settings(**{
+                path_setting: os.path.join(tmp.name, f"{prefix.lower()}.sqlite3"),
+                f"{prefix}_TTL": 60,
+                f"{prefix}_STORE_MAX_ENTRIES": 10,
+            }):
+                module._cache = None
+                self.addCleanup(setattr, module, "_cache", None)
+                cache = module.get_cache()
+                self.assertEqual(cache.memory.ttl, 60)
+                self.assertEqual(cache.persistent.ttl, 60)
+                self.assertEqual(cache.persistent.max_entries, 10)
+                cache.persistent._conn.close()
+
+
+class _FakeSpec(SummarizerSpec):
+    """実装クラスを import せず、memory_mb() が actual_mb を返すダミーを作る SummarizerSpec"""
+
+    def __init__(self, est_memory_mb: int, actual_mb: float | None = None, loads: list | None = None):
+        super().__init__("", "", est_memory_mb)
+        self.actual_mb = actual_mb
+        self.loads = loads if loads is not None else []
+
+    def load_class(self):
+        spec = self
+
+        class _Fake:
+            def __init__(self):
+                spec.loads.append(self)
+
+            def memory_mb(self):
+                return spec.actual_mb
+
+        return _Fake
+
+
+class RegistryTests(SimpleTestCase):
+    def test_loads_lazily_and_reuses_instance(self):
+        spec = _FakeSpec(100)
+        registry = SummarizerRegistry({"en": spec})
+        self.assertEqual(registry.loaded(), [])
+        self.assertIsNone(registry.peek("en"))
+        first = registry.get("en")
+        self.assertIs(registry.get("en"), first)
+        self.assertEqual(len(spec.loads), 1)
+
+    def test_evicts_least_recently_used_within_budget(self):
+        registry = SummarizerRegistry({k: _FakeSpec(100) for k in ("en", "ja", "zh")}, budget_mb=250)
+        registry.get("en")
+        registry.get("ja")
+        registry.get("en")   # en を最近使ったことにする
+        registry.get("zh")
+        self.assertEqual(registry.loaded(), ["en", "zh"])
+
+    def test_measured_size_over_estimate_evicts_others_but_keeps_new_model(self):
+        registry = SummarizerRegistry({"en": _FakeSpec(100), "ja": _FakeSpec(100, actual_mb=300)}, budget_mb=250)
+        registry.get("en")
+        registry.get("ja")
+        self.assertEqual(registry.loaded(), ["ja"])
+
+    def test_no_budget_keeps_everything(self):
+        registry = SummarizerRegistry({k: _FakeSpec(1000) for k in ("en", "ja", "zh")}, budget_mb=0)
+        for key in ("en", "ja", "zh"):
+            registry.get(key)
+        self.assertEqual(registry.loaded(), ["en", "ja", "zh"])
+
+    def test_concurrent_gets_load_once(self):
+        spec = _FakeSpec(100)
+        real_load = spec.load_class
+
+        def slow_load():
+            time.sleep(0.05)
+            return real_load()
+
+        spec.load_class = slow_load
+        registry = SummarizerRegistry({"en": spec})
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("en"))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(spec.loads), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def _run_together(self, flight: SingleFlight, fn, n: int = 4):
+        """n スレッドから同じキーで do() を呼び始め、(スレッド, 結果を入れるリスト) を返す"""
+        results = []
+
+        def call():
+            try:
+                results.append(flight.do("k", fn))
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for t in threads:
+            t.start()
+        return threads, results
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "done"
+
+        threads, results = self._run_together(flight, fn)
+        while not calls:
+            time.sleep(0.001)
+        time.sleep(0.02)   # 残りのスレッドが相乗りするのを待つ
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["done"] * 4)
+        self.assertEqual(flight._inflight, {})
+
+    def test_exception_is_shared_and_key_released(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait(5)
+            raise ValueError("boom")
+
+        threads, results = self._run_together(flight, fn, n=3)
+        time.sleep(0.02)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.do("k", lambda: "retried"), "retried")
+
+    def test_async_caller_joins_thread_leader(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "done"
+
+        threads, results = self._run_together(flight, fn, n=1)
+        while not calls:
+            time.sleep(0.001)
+
+        async def follower():
+            async def never():
+                raise AssertionError("leader が実行中なので呼ばれない")
+            asyncio.get_running_loop().call_later(0.02, release.set)
+            return await flight.ado("k", never)
+
+        self.assertEqual(asyncio.run(follower()), "done")
+        threads[0].join()
+        self.assertEqual(calls, [1])
+
+
+@override_settings(SUMMARIZER_CACHE_PATH="", SUMMARIZER_DRAFT_MODELS={})
+class SummaryCacheTests(SimpleTestCase):
+    def setUp(self):
+        summary_cache._cache = None
+        self.addCleanup(setattr, summary_cache, "_cache", None)
+
+    def test_normalized_text_hits_cache(self):
+        compute = mock.Mock(return_value="summary")
+        self.assertEqual(summary_cache.cached_summary("Ａ  b\nc", "short", "en", compute), "summary")
+        self.assertEqual(summary_cache.cached_summary("A b c", "short", "en", compute), "summary")
+        compute.assert_called_once()
+        self.assertIsNone(summary_cache.lookup("A b c", "long", "en"))
+
+    def test_concurrent_requests_compute_once(self):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return "summary"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            summary_cache.cached_summary("same text", "medium", "en", compute))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.02)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ["summary"] * 4)
+
+
+@override_settings(SUMMARIZER_NEAR_DUP_THRESHOLD=0, SUMMARIZER_INFERENCE_WORKERS=2)
+class AsyncSummarizeTests(SimpleTestCase):
+    url = "/summarizer/summarize/async/"
+
+    def setUp(self):
+        executor._executor = None
+        self.addCleanup(setattr, executor, "_executor", None)
+        self.addCleanup(lambda: executor._executor and executor._executor.shutdown())
+
+    async def test_translates_with_await_and_runs_model_in_inference_pool(self):
+        threads = []
+
+        def run_summary(text, mode, lang_code):
+            threads.append(threading.current_thread().name)
+            return f"{lang_code}:{mode}:{text}"
+
+        translate = mock.AsyncMock(return_value={"ja": "要約"})
+        with mock.patch.object(router, "run_summary", run_summary), \
+                mock.patch.object(router, "adeepl_translate_many", translate):
+            r = await AsyncClient().post(self.url, {"text": "The market rose today.", "target_lang": "ja",
+                                                    "length": "short"}, content_type="application/json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["summary"], "要約")
+        self.assertEqual(r.json()["summary_src_lang"], "en")
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("inference"))
+        translate.assert_awaited_once_with("en:short:The market rose today.", src="en", tgts=["ja"])
+
+    async def test_url_is_fetched_asynchronously(self):
+        fetch = mock.AsyncMock(side_effect=ValueError("404"))
+        with mock.patch("summarizer.views.aextract_article_text", fetch):
+            r = await AsyncClient().post(self.url, {"url": "https://example.com/a"},
+                                         content_type="application/json")
+        self.assertEqual(r.status_code, 400)
+        fetch.assert_awaited_once_with("https://example.com/a")
+
+    async def test_inference_concurrency_is_bounded(self):
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        await asyncio.gather(*(executor.run_inference(work) for _ in range(6)))
+        self.assertEqual(peak[0], 2)
+
+
+class SummarizeStreamTests(SimpleTestCase):
+    url = "/summarizer/summarize/stream/"
+
+    def _events(self, response) -> list[tuple[str, dict]]:
+        body = b"".join(response.streaming_content).decode()
+        events = []
+        for block in body.strip().split("\n\n"):
+            name, data = block.split("\n")
+            events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return events
+
+    def test_streams_route_partials_and_summary_in_order(self):
+        def route_and_summarize(raw, target_lang, length_mode, on_event):
+            on_event("route", {"detected": "en", "pivoted": False, "summary_src": "en"})
+            for i in range(2):
+                on_event("partial", {"index": i, "total": 2, "summary": f"part {i}"})
+            return {"detected": "en", "pivoted": False, "summary_src": "en", "summary": "final"}
+
+        with mock.patch("summarizer.views.route_and_summarize", side_effect=route_and_summarize):
+            r = self.client.post(self.url, {"text": "Long article.", "target_lang": "en"},
+                                 content_type="application/json")
+            self.assertEqual(r["Content-Type"], "text/event-stream")
+            self.assertEqual(r["Cache-Control"], "no-cache")
+            events = self._events(r)
+        self.assertEqual([name for name, _ in events], ["route", "partial", "partial", "summary"])
+        self.assertEqual(events[2][1]["summary"], "part 1")
+        self.assertEqual(events[-1][1]["summary"], "final")
+        self.assertEqual(events[-1][1]["target_lang"], "en")
+
+    def test_translation_failure_is_an_error_event(self):
+        with mock.patch("summarizer.views.route_and_summarize", side_effect=TranslationError("quota")):
+            events = self._events(self.client.post(self.url, {"text": "Article."},
+                                                   content_type="application/json"))
+        self.assertEqual(events, [("error", {"error": "翻訳失敗: quota", "status": 502})])
+
+    def test_missing_input_is_rejected_before_streaming(self):
+        r = self.client.post(self.url, {"text": "  "}, content_type="application/json")
+        self.assertEqual(r.status_code, 400)
+
+
+@override_settings(SUMMARIZER_CACHE_PATH="", SUMMARIZER_DRAFT_MODELS={})
+class HierarchicalReduceTests(SimpleTestCase):
+    def setUp(self):
+        chunk_cache._cache = None
+        self.addCleanup(setattr, chunk_cache, "_cache", None)
+        pipeline = SimpleNamespace(tokenizer=_WordTokenizer(), model=None)
+        with mock.patch.object(BartSummarizer, "_build_pipeline", return_value=pipeline):
+            self.summarizer = BartSummarizer()
+        self.summarizer.extractive_max_ratio = 1
+        self.summarizer.reduce_fan_in = 3
+        self.rows: list[list[str]] = []   # generate の各行の入力（単語列）
+
+        def generate(model, tok, ids_list, params_list, **kwargs):
+            words = [tok.decode(ids).split() for ids in ids_list]
+            self.rows.extend(words)
+            return [f"Summary of {w[0]} to {w[-1]}" for w in words]
+
+        patcher = mock.patch.object(bart_summarizer, "generate_batch_ids", side_effect=generate)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _reduce_rows(self) -> list[list[str]]:
+        return [w for w in self.rows if w[0] == "Summary"]
+
+    def test_reduce_windows_respect_fan_in_and_token_limit(self):
+        self.summarizer.max_input_tokens = 10
+        self.assertEqual(self.summarizer._reduce_windows([2, 2, 2, 2, 2]), [[0, 1, 2], [3, 4]])
+        self.assertEqual(self.summarizer._reduce_windows([4, 4, 4, 20, 1]), [[0, 1], [2], [3], [4]])
+
+    def test_long_article_reduces_in_levels_with_bounded_input(self):
+        self.summarizer.summarize(_article(90))   # 8 段落（960 トークン）ずつ 12 チャンク
+        reduce_rows = self._reduce_rows()
+        self.assertEqual(len(self.rows) - len(reduce_rows), 12)
+        # 部分要約（5 語）を 3 件ずつまとめて 12 → 4 → 2 → 1
+        self.assertEqual(len(reduce_rows), 4 + 2 + 1)
+        self.assertTrue(all(len(w) <= 3 * 5 for w in reduce_rows))
+        self.assertTrue(all(len(w) <= self.summarizer.max_input_tokens for w in self.rows))
+
+    def test_depth_limit_reduces_remaining_summaries_at_once(self):
+        self.summarizer.reduce_max_depth = 1
+        with self.assertLogs(bart_summarizer.logger, "WARNING"):
+            self.summarizer.summarize(_article(90))
+        reduce_rows = self._reduce_rows()
+        self.assertEqual(len(reduce_rows), 1)
+        self.assertEqual(len(reduce_rows[0]), 12 * 5)
+
+
+def _deepl_response(status: int = 200, texts: list[str] | None = None, headers: dict | None = None):
+    return SimpleNamespace(status_code=status, headers=headers or {}, text="",
+                           json=lambda: {"translations": [{"text": t} for t in texts or []]})
+
+
+class _DeeplTestMixin:
+    """DeepL の API キー・リミッター・キャッシュをテストごとに用意し直す（送信は self.post で差し替える）"""
+
+    def setUp(self):
+        for name in ("_cache", "_session"):
+            setattr(translation, name, None)
+            self.addCleanup(setattr, translation, name, None)
+        ratelimit._limiters.clear()
+        self.addCleanup(ratelimit._limiters.clear)
+        for patcher in (mock.patch.object(translation, "DEEPL_API_KEY", "test-key"),
+                        mock.patch.object(translation, "_stats", dict.fromkeys(translation._stats, 0))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.post = mock.Mock(side_effect=self._translate)
+        patcher = mock.patch.object(translation.get_session(), "post", self.post)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _translate(url, data, timeout):
+        return _deepl_response(texts=[f"[{data['target_lang']}] {t}" for t in data["text"]])
+
+
+@override_settings(SUMMARIZER_DEEPL_REQUESTS_PER_SECOND=0, SUMMARIZER_DEEPL_CHARS_PER_SECOND=0)
+class TranslationCacheTests(_DeeplTestMixin, SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_patch = override_settings(SUMMARIZER_TRANSLATION_CACHE_PATH=os.path.join(tmp.name, "t.sqlite3"))
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        super().setUp()
+        self.addCleanup(lambda: translation._cache and translation._cache.persistent._conn.close())
+
+    def test_persistent_cache_survives_a_new_process(self):
+        self.assertEqual(translation.deepl_translate("Hello.", "en", "ja"), "[JA] Hello.")
+        translation._cache.persistent._conn.close()
+        translation._cache = None   # 別プロセス（LRU は空）から同じ SQLite を開く
+        self.assertEqual(translation.deepl_translate("Hello.", "en", "ja"), "[JA] Hello.")
+        self.post.assert_called_once()
+        self.assertEqual(translation.stats()["chars_saved"], len("Hello."))
+
+    def test_values_are_compressed_on_disk(self):
+        translation.deepl_translate("Hello.", "en", "ja")
+        store = translation.get_cache().persistent
+        (raw,) = store._conn.execute(f"SELECT value FROM {store.table}").fetchone()
+        self.assertEqual(zlib.decompress(raw).decode(), "[JA] Hello.")
+
+    def test_expired_entries_are_translated_again(self):
+        with override_settings(SUMMARIZER_TRANSLATION_CACHE_TTL=60):
+            translation._cache = None
+            translation.deepl_translate("Hello.", "en", "ja")
+            translation.get_cache().memory.clear()
+            with mock.patch.object(time, "time", return_value=time.time() + 120):
+                translation.deepl_translate("Hello.", "en", "ja")
+        self.assertEqual(self.post.call_count, 2)
+
+    def test_keys_depend_on_source_and_target(self):
+        translation.deepl_translate("Hello.", "en", "ja")
+        translation.deepl_translate("Hello.", "en", "fr")
+        translation.deepl_translate("Hello.", None, "ja")
+        self.assertEqual(self.post.call_count, 3)
+
+    def test_session_is_shared(self):
+        self.assertIs(translation.get_session(), translation.get_session())
+
+
+class SplitSegmentsTests(SimpleTestCase):
+    def test_short_text_or_no_limit_is_one_segment(self):
+        self.assertEqual(translation.split_segments("  One. Two.  ", 100), (["One. Two."], []))
+        self.assertEqual(translation.split_segments("One. Two.", 0), (["One. Two."], []))
+        self.assertEqual(translation.split_segments("   ", 10), ([], []))
+
+    def test_splits_on_sentence_boundaries_and_keeps_separators(self):
+        segments, separators = translation.split_segments("First one. Second one.\n\nThird one.", 12)
+        self.assertEqual(segments, ["First one.", "Second one.", "Third one."])
+        self.assertEqual(separators, [" ", "\n\n"])
+        self.assertEqual(translation._assemble(segments, separators, "en"), "First one. Second one.\n\nThird one.")
+
+    def test_packs_sentences_up_to_the_limit(self):
+        segments, _ = translation.split_segments("A a. B b. C c. D d.", 10)
+        self.assertEqual(segments, ["A a. B b.", "C c. D d."])
+
+    def test_cjk_boundaries_and_joiner(self):
+        segments, separators = translation.split_segments("今日は晴れ。「明日は雨？」と言った。", 8)
+        self.assertEqual(segments, ["今日は晴れ。", "「明日は雨？」と言った。"])
+        self.assertEqual(translation._assemble(segments, separators, "ja"), "今日は晴れ。「明日は雨？」と言った。")
+
+
+@override_settings(SUMMARIZER_TRANSLATION_CACHE_PATH="", SUMMARIZER_DEEPL_REQUESTS_PER_SECOND=0,
+                   SUMMARIZER_DEEPL_CHARS_PER_SECOND=0, SUMMARIZER_DEEPL_SEGMENT_CHARS=12,
+                   SUMMARIZER_DEEPL_BATCH_CHARS=25)
+class SegmentedTranslationTests(_DeeplTestMixin, SimpleTestCase):
+    text = "First one. Second one. Third one. Fourth one."
+
+    def test_segments_are_packed_into_batches(self):
+        plan = translation._Plan(self.text, "en", ["ja"])
+        plan.lookup()
+        self.assertEqual(plan.segments, ["First one.", "Second one.", "Third one.", "Fourth one."])
+        self.assertEqual(plan.sends, [("ja", [0, 1]), ("ja", [2, 3])])
+
+    def test_only_changed_segments_are_sent_again(self):
+        translation.deepl_translate_many(self.text, "en", ["ja", "fr"])
+        self.assertEqual(self.post.call_count, 4)   # 2 言語 × 2 リクエスト
+        self.post.reset_mock()
+        out = translation.deepl_translate(self.text.replace("Third", "New third"), "en", "fr")
+        self.assertEqual([call.kwargs["data"]["text"] for call in self.post.call_args_list], [["New third one."]])
+        self.assertEqual(out, "[FR] First one. [FR] Second one. [FR] New third one. [FR] Fourth one.")
+
+    def test_async_version_shares_the_plan(self):
+        sent = []
+
+        async def apost(texts, src, tgt):
+            sent.append((tgt, texts))
+            return [f"[{tgt.upper()}] {t}" for t in texts]
+
+        with mock.patch.object(translation, "_apost", apost):
+            out = asyncio.run(translation.adeepl_translate_many(self.text, "en", ["fr", "ja"]))
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(out["fr"], "[FR] First one. [FR] Second one. [FR] Third one. [FR] Fourth one.")
+        self.assertEqual(out["ja"], "[JA] First one.[JA] Second one.[JA] Third one.[JA] Fourth one.")
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_reservations_queue_at_the_refill_rate(self):
+        with mock.patch.object(ratelimit.time, "monotonic", return_value=100.0):
+            bucket = ratelimit.TokenBucket(rate=10, burst=2)
+            waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits, [0.0, 0.0, 0.1, 0.2])
+
+    def test_refills_over_time_up_to_burst(self):
+        now = [100.0]
+        with mock.patch.object(ratelimit.time, "monotonic", side_effect=lambda: now[0]):
+            bucket = ratelimit.TokenBucket(rate=10, burst=2)
+            bucket.reserve(2)
+            now[0] += 10
+            self.assertEqual([bucket.reserve(), bucket.reserve()], [0.0, 0.0])
+            self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    def test_oversized_request_waits_for_burst_only(self):
+        with mock.patch.object(ratelimit.time, "monotonic", return_value=100.0):
+            bucket = ratelimit.TokenBucket(rate=100, burst=100)
+            self.assertEqual(bucket.reserve(1000), 0.0)
+            self.assertAlmostEqual(bucket.reserve(1000), 1.0)
+
+    def test_pause_applies_even_without_rate_limit(self):
+        with mock.patch.object(ratelimit.time, "monotonic", return_value=100.0):
+            bucket = ratelimit.TokenBucket(rate=0, burst=1)
+            bucket.pause(5)
+            self.assertEqual(bucket.reserve(), 5.0)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(ratelimit.retry_after_seconds("3"), 3.0)
+        self.assertIsNone(ratelimit.retry_after_seconds(None))
+        self.assertIsNone(ratelimit.retry_after_seconds("soon"))
+        with mock.patch.object(ratelimit.time, "time", return_value=1_000_000_000.0):
+            self.assertEqual(ratelimit.retry_after_seconds("Sun, 09 Sep 2001 01:46:50 GMT"), 10.0)
+
+    def test_backoff_follows_retry_after_or_jitters_within_cap(self):
+        with mock.patch.object(ratelimit.random, "uniform", side_effect=lambda lo, hi: hi):
+            self.assertEqual(ratelimit.backoff_seconds(0, "2", base=1, cap=30), 2.5)
+            self.assertEqual(ratelimit.backoff_seconds(0, "120", base=1, cap=30), 30.5)
+            self.assertEqual([ratelimit.backoff_seconds(a, base=1, cap=5) for a in range(4)], [1, 2, 4, 5])
+        for _ in range(20):
+            self.assertTrue(0 <= ratelimit.backoff_seconds(3, base=1, cap=30) <= 8)
+
+
+@override_settings(SUMMARIZER_TRANSLATION_CACHE_PATH="", SUMMARIZER_DEEPL_REQUESTS_PER_SECOND=0,
+                   SUMMARIZER_DEEPL_CHARS_PER_SECOND=0)
+class DeeplRetryTests(_DeeplTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(translation.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_after_pauses_the_shared_limiter(self):
+        self.post.side_effect = [_deepl_response(429, headers={"Retry-After": "2"}),
+                                 _deepl_response(texts=["こんにちは"])]
+        with mock.patch.object(ratelimit.random, "uniform", return_value=0.0), \
+                mock.patch.object(ratelimit.RateLimiter, "acquire") as acquire, \
+                mock.patch.object(ratelimit.RateLimiter, "pause") as pause:
+            self.assertEqual(translation.deepl_translate("Hello.", "en", "ja"), "こんにちは")
+        pause.assert_called_once_with(2.0)
+        self.assertEqual(acquire.call_count, 2)
+        self.sleep.assert_called_once_with(0.0)
+
+    def test_without_retry_after_uses_jittered_backoff(self):
+        self.post.side_effect = [_deepl_response(503), _deepl_response(503), _deepl_response(texts=["ok"])]
+        with mock.patch.object(ratelimit.random, "uniform", side_effect=lambda lo, hi: hi / 2):
+            self.assertEqual(translation.deepl_translate("Hello.", "en", "ja"), "ok")
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0])
+
+    def test_gives_up_after_max_attempts(self):
+        self.post.side_effect = lambda *a, **kw: _deepl_response(503)
+        with self.assertRaises(translation.TranslationError):
+            translation.deepl_translate("Hello.", "en", "ja")
+        self.assertEqual(self.post.call_count, translation.MAX_ATTEMPTS)
+
+    def test_other_errors_are_not_retried(self):
+        self.post.side_effect = [_deepl_response(403)]
+        with self.assertRaises(translation.TranslationError):
+            translation.deepl_translate("Hello.", "en", "ja")
+        self.sleep.assert_not_called()
@@ -1,6 +1,15 @@
 from django.urls import path
-from .views import summarize
+from .views import (summarize, summarize_async, summarize_stream, summarize_bulk, extract_article, stats,
+                    submit_job, job_status, job_results)
 
 urlpatterns = [
     path("summarize/", summarize),
+    path("summarize/async/", summarize_async),
+    path("summarize/stream/", summarize_stream),
+    path("summarize/bulk/", summarize_bulk),
+    path("extract_article/", extract_article),
+    path("jobs/", submit_job),
+    path("jobs/results/", job_results),
+    path("jobs/<uuid:job_id>/", job_status),
+    path("stats/", stats),
 ]
@@ -1,9 +1,21 @@
-from django.http import JsonResponse, HttpResponseNotAllowed, HttpResponseBadRequest
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, HttpResponseNotAllowed, HttpResponseBadRequest, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
+import logging
+import queue
+import threading
+import uuid
 from .news_summarizer_model import run_summary
-from newspaper import Article
-from .services.router import route_and_summarize, TranslationError
+from .services.extraction import extract_article_text, aextract_article_text
+from .services.router import route_and_summarize, aroute_and_summarize, parse_target_lang, TranslationError
+from .services.batching import batcher_stats
+from .services.bulk import summarize_many
+from .services.summarizers import get_registry
+from .services import chunk_cache, dedup, jobs, translation
+from .services import metrics as metrics_service
+
+logger = logging.getLogger(__name__)
 
 
 @csrf_exempt
@@ -13,11 +25,13 @@ def summarize(request):
       - text でも url でも受け付ける統合版エンドポイント
       - ko 入力は ja にピボット、それ以外の非英日言語は en にピボット
       - 要約（英/日モデル）→ target_lang に最終翻訳
-      - 長さは short|medium|long で指定
+      - target_lang はリストも可。要約は 1 回だけ行い、各言語への翻訳を並列に行って "summaries" で返す
+      - 長さは short|medium|long で指定（extractive ならモデルを使わず重要な文の抜き出しだけを返す）
 
     受信JSON例：
       { "text": "...", "target_lang": "ja", "length": "medium" }
       { "url": "https://...", "target_lang": "fr", "length": "short" }
+      { "text": "...", "target_lang": ["ja", "en", "ko", "zh"] }
     戻り値：
       {
         "detected_lang": "ko",
@@ -27,31 +41,27 @@ def summarize(request):
         "length": "medium",
         "summary": "..."
       }
+      target_lang がリストの場合は "target_lang" もリストになり、
+      "summaries": { "ja": "...", "en": "...", ... } が加わる（"summary" は先頭の言語）
     """
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"], "Use POST method instead")
 
     try:
-        data = json.loads(request.body or "{}")
+        data, target_lang, length_mode = _parse_summarize_request(request)
     except json.JSONDecodeError:
         return HttpResponseBadRequest("Invalid JSON body")
-
-    target_lang = (data.get("target_lang") or "ja").lower()
-    length_mode = (data.get("length") or "medium").lower()
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
 
     # 入力の取り出し：url優先、無ければtext
     raw = ""
     if data.get("url"):
         try:
-            art = Article(data["url"])
-            art.download()
-            art.parse()
-            raw = (art.text or "").strip()
+            raw = extract_article_text(data["url"])
 
             # 任意：デバッグ出力（先頭末尾のみ）
-            print("\n=== Extracted Article Text ===")
-            print(raw[:30], "...", raw[-30:])
-            print("=== End of Article ===\n")
+            logger.debug("Extracted article text: %s ... %s", raw[:30], raw[-30:])
         except Exception as e:
             return JsonResponse({"error": f"記事抽出に失敗: {str(e)}"}, status=400)
     else:
@@ -62,15 +72,343 @@ def summarize(request):
 
     try:
         result = route_and_summarize(raw, target_lang=target_lang, length_mode=length_mode)
-        return JsonResponse({
-            "detected_lang": result["detected"],
-            "pivoted": result["pivoted"],
-            "summary_src_lang": result["summary_src"],
-            "target_lang": target_lang,
-            "length": length_mode,
-            "summary": result["summary"],
-        })
+        return JsonResponse(_summary_response(result, target_lang, length_mode))
     except TranslationError as te:
         return JsonResponse({"error": f"翻訳失敗: {str(te)}"}, status=502)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+def extract_article(request):
+    """
+    URL から記事本文だけを抽出して返す（要約はしない）。
+    受信JSON例： { "url": "https://..." }
+    戻り値：    { "article": "..." }
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+
+    try:
+        data = json.loads(request.body or "{}")
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON body")
+
+    url = (data.get("url") or "").strip()
+    if not url:
+        return HttpResponseBadRequest("Missing 'url'")
+
+    try:
+        return JsonResponse({"article": extract_article_text(url)})
+    except Exception as e:
+        return JsonResponse({"error": f"記事抽出に失敗: {str(e)}"}, status=400)
+
+
+def _parse_summarize_request(request):
+    """
+    受信 JSON を読み、(data, target_lang, length_mode) を返す。
+    JSON 不正時は JSONDecodeError、target_lang の型が不正なら ValueError。
+    """
+    data = json.loads(request.body or "{}")
+    target_lang = parse_target_lang(data.get("target_lang"))
+    length_mode = (data.get("length") or "medium").lower()
+    return data, target_lang, length_mode
+
+
+def _summary_response(result: dict, target_lang: str | list[str], length_mode: str) -> dict:
+    out = {
+        "detected_lang": result["detected"],
+        "pivoted": result["pivoted"],
+        "summary_src_lang": result["summary_src"],
+        "target_lang": target_lang,
+        "length": length_mode,
+        "summary": result["summary"],
+    }
+    if "summaries" in result:
+        out["summaries"] = result["summaries"]
+    return out
+
+
+@csrf_exempt
+async def summarize_async(request):
+    """
+    summarize の非同期版（ASGI サーバー上で使う）。入出力の形式は summarize と同じ。
+      - 記事取得と DeepL 呼び出しは共有の HTTP クライアント（キープアライブ）で await する
+      - モデル推論だけを上限付きスレッドプールに渡すので、
+        通信待ちのリクエストを多数抱えても推論の同時実行数は一定に保たれる
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+
+    try:
+        data, target_lang, length_mode = _parse_summarize_request(request)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON body")
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if data.get("url"):
+        try:
+            raw = await aextract_article_text(data["url"])
+        except Exception as e:
+            return JsonResponse({"error": f"記事抽出に失敗: {str(e)}"}, status=400)
+    else:
+        raw = (data.get("text") or "").strip()
+
+    if not raw:
+        return HttpResponseBadRequest("Missing 'text' or 'url'")
+
+    try:
+        result = await aroute_and_summarize(raw, target_lang=target_lang, length_mode=length_mode)
+        return JsonResponse(_summary_response(result, target_lang, length_mode))
+    except TranslationError as te:
+        return JsonResponse({"error": f"翻訳失敗: {str(te)}"}, status=502)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@csrf_exempt
+def summarize_stream(request):
+    """
+    summarize のストリーミング版（Server-Sent Events）。受信 JSON は summarize と同じ。
+    処理の進行に合わせて次のイベントを順に送る:
+      route   … 検出言語とピボットの有無
+      partial … 長文のチャンク要約（出来た順、要約言語のまま）
+      summary … 最終結果（summarize の戻り値と同じ形）
+      error   … 失敗時 {"error": "...", "status": 400|502|500}
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+
+    try:
+        data, target_lang, length_mode = _parse_summarize_request(request)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON body")
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    if not (data.get("url") or (data.get("text") or "").strip()):
+        return HttpResponseBadRequest("Missing 'text' or 'url'")
+
+    events: "queue.Queue[tuple[str, dict] | None]" = queue.Queue()
+
+    def work():
+        try:
+            if data.get("url"):
+                try:
+                    raw = extract_article_text(data["url"])
+                except Exception as e:
+                    events.put(("error", {"error": f"記事抽出に失敗: {str(e)}", "status": 400}))
+                    return
+            else:
+                raw = data["text"].strip()
+            if not raw:
+                events.put(("error", {"error": "Missing 'text' or 'url'", "status": 400}))
+                return
+
+            result = route_and_summarize(raw, target_lang=target_lang, length_mode=length_mode,
+                                         on_event=lambda name, payload: events.put((name, payload)))
+            events.put(("summary", _summary_response(result, target_lang, length_mode)))
+        except TranslationError as te:
+            events.put(("error", {"error": f"翻訳失敗: {str(te)}", "status": 502}))
+        except Exception as e:
+            events.put(("error", {"error": str(e), "status": 500}))
+        finally:
+            events.put(None)
+
+    def stream():
+        threading.Thread(target=work, daemon=True).start()
+        while (item := events.get()) is not None:
+            yield _sse(*item)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"   # nginx 等のプロキシでバッファさせない
+    return response
+
+
+@csrf_exempt
+def summarize_bulk(request):
+    """
+    複数記事の一括要約。結果は NDJSON（1 行 1 件）で、完了した順に返す。
+
+    受信JSON例：
+      {
+        "items": [
+          { "id": "a1", "url": "https://...", "target_lang": "ja", "length": "short" },
+          { "text": "...", "target_lang": "en" }
+        ],
+        "target_lang": "ja",   # 各 item で省略した場合の既定値（リストなら各言語の "summaries" も返す）
+        "length": "medium"
+      }
+    各行：
+      成功 … summarize の戻り値 + "index"（items 内の位置）, "id"
+      失敗 … { "index": 1, "id": ..., "error": "...", "status": 400|502|500 }
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+
+    try:
+        data, target_lang, length_mode = _parse_summarize_request(request)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON body")
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    items = data.get("items")
+    if not isinstance(items, list) or not items or not all(isinstance(it, dict) for it in items):
+        return HttpResponseBadRequest("'items' must be a non-empty list of objects")
+    max_items = getattr(settings, "SUMMARIZER_BULK_MAX_ITEMS", 100)
+    if len(items) > max_items:
+        return HttpResponseBadRequest(f"Too many items (max {max_items})")
+    try:
+        for it in items:
+            parse_target_lang(it.get("target_lang") or target_lang)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    lines = (json.dumps(line, ensure_ascii=False) + "\n"
+             for line in summarize_many(items, target_lang=target_lang, length_mode=length_mode))
+    response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+def submit_job(request):
+    """
+    要約ジョブを登録してすぐに返す（処理は manage.py summary_worker のワーカーが行う）。
+    ジョブは db.sqlite3 に保存されるので、Web サーバーやワーカーが再起動しても失われない。
+
+    受信JSON例：
+      { "text": "...", "target_lang": "ja", "length": "medium" }
+      { "items": [ { "url": "https://..." }, { "text": "...", "target_lang": "en" } ],
+        "target_lang": "ja", "length": "medium" }   # 各 item で省略した場合の既定値
+    戻り値（202）：
+      { "job_id": "...", "status": "queued" }
+      { "jobs": [ { "job_id": "...", "status": "queued" }, ... ] }   # items 指定時
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+
+    try:
+        data, target_lang, length_mode = _parse_summarize_request(request)
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest("Invalid JSON body")
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    items = data.get("items")
+    if items is None:
+        items = [data]
+    elif not isinstance(items, list) or not items or not all(isinstance(it, dict) for it in items):
+        return HttpResponseBadRequest("'items' must be a non-empty list of objects")
+    max_items = getattr(settings, "SUMMARIZER_BULK_MAX_ITEMS", 100)
+    if len(items) > max_items:
+        return HttpResponseBadRequest(f"Too many items (max {max_items})")
+    if not all((it.get("url") or "").strip() or (it.get("text") or "").strip() for it in items):
+        return HttpResponseBadRequest("Missing 'text' or 'url'")
+    try:
+        targets = [parse_target_lang(it.get("target_lang") or target_lang) for it in items]
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    created = [
+        jobs.submit(
+            text=(it.get("text") or "").strip(),
+            url=(it.get("url") or "").strip(),
+            target_lang=targets[i],
+            length=(it.get("length") or length_mode).lower(),
+        )
+        for i, it in enumerate(items)
+    ]
+    body = [{"job_id": str(job.pk), "status": job.status} for job in created]
+    return JsonResponse(body[0] if "items" not in data else {"jobs": body}, status=202)
+
+
+def _job_response(job) -> dict:
+    out = {
+        "job_id": str(job.pk),
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "timings": job.timings,
+    }
+    if job.status == jobs.Status.DONE:
+        out["result"] = _summary_response(job.result, job.target_lang, job.length)
+    elif job.status == jobs.Status.FAILED:
+        out["error"] = job.error
+        out["error_status"] = job.error_status
+    return out
+
+
+def job_status(request, job_id):
+    """
+    ジョブ 1 件の状態を返す。
+    戻り値：
+      { "job_id": "...", "status": "queued|running|done|failed", "attempts": 1,
+        "timings": { "extract": 0.4, "summarize": 2.1, ... },   # 工程ごとの所要時間（秒）
+        "result": { summarize の戻り値 } | "error": "...", "error_status": 502 }
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"], "Use GET method instead")
+    job = jobs.SummaryJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({"error": "job not found"}, status=404)
+    return JsonResponse(_job_response(job))
+
+
+@csrf_exempt
+def job_results(request):
+    """
+    複数ジョブの状態をまとめて返す。
+    受信JSON例： { "ids": ["...", "..."] }
+    戻り値：    { "jobs": [ job_status と同じ形, ... ], "missing": [ 見つからなかった ID ] }
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"], "Use POST method instead")
+    try:
+        ids = json.loads(request.body or "{}").get("ids")
+    except (json.JSONDecodeError, AttributeError):
+        return HttpResponseBadRequest("Invalid JSON body")
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return HttpResponseBadRequest("'ids' must be a list of job IDs")
+    max_items = getattr(settings, "SUMMARIZER_BULK_MAX_ITEMS", 100)
+    if len(ids) > max_items:
+        return HttpResponseBadRequest(f"Too many ids (max {max_items})")
+
+    valid = []
+    for i in ids:
+        try:
+            valid.append(str(uuid.UUID(i)))
+        except ValueError:
+            pass
+    found = {str(job.pk): job for job in jobs.SummaryJob.objects.filter(pk__in=valid)}
+    return JsonResponse({
+        "jobs": [_job_response(found[i]) for i in valid if i in found],
+        "missing": [i for i in ids if i not in found],
+    })
+
+
+def metrics(request):
+    """Prometheus 形式のメトリクス（工程別の所要時間、キャッシュヒット、DeepL 文字数、キュー長など）"""
+    return HttpResponse(metrics_service.render_prometheus(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def stats(request):
+    """
+    推論スケジューラの状態を返す（キュー長・バッチサイズ分布・ロード済みモデル・近似重複のヒット数・ジョブ数・翻訳とチャンク要約のキャッシュのヒット率）。
+    """
+    return JsonResponse({
+        "loaded_models": get_registry().loaded(),
+        "schedulers": batcher_stats(),
+        "near_duplicate": dedup.stats(),
+        "jobs": jobs.status_counts(),
+        "translation_cache": translation.stats(),
+        "chunk_cache": chunk_cache.stats(),
+    })
@@ -19,6 +19,11 @@ export async function POST(req: Request) {    // このAPIルートに対するP
     return NextResponse.json({ error: "invalid JSON" }, { status: 400 });
   }
 
+  // stream: true の場合は Django のストリーミング版（SSE）にそのまま中継する
+  if (parsed.stream) {
+    return proxyStream(bodyText);
+  }
+
   const { text, mode } = parsed;
 
   try {
@@ -51,3 +56,32 @@ export async function POST(req: Request) {    // このAPIルートに対するP
 
   }
 }
+
+// Django の SSE レスポンスをバッファせずにフロントへ流す
+async function proxyStream(bodyText: string) {
+  try {
+    const res = await fetch("http://localhost:8000/summarizer/summarize/stream/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: bodyText,   // text / url / target_lang / length をそのまま転送
+    });
+
+    if (!res.ok || !res.body) {
+      const errorText = await res.text();
+      return NextResponse.json({ error: errorText }, { status: res.status });
+    }
+
+    // res.body（ReadableStream）をそのまま返すことで、届いたイベントから順にフロントへ送られる
+    return new Response(res.body, {
+      status: 200,
+      headers: {
+        "Content-Type": "text/event-stream; charset=utf-8",
+        "Cache-Control": "no-cache, no-transform",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no",
+      },
+    });
+  } catch (err) {
+    return NextResponse.json({ error: String(err) }, { status: 500 });
+  }
+}